@@ -0,0 +1,390 @@
+# 성능 측정 스크립트
+#   python benchmark.py keypoints [--persons 1 5 20 50] [--iters 2000]
+#   python benchmark.py blur [--persons 1 5 10 20] [--iters 50]
+#   python benchmark.py events [--count 1000000]
+#   python benchmark.py retention [--days 30] [--per-day 20000] [--retention 100000] [--hourly-days 7]
+#   python benchmark.py pipeline videos/a.mp4 [--pace max] [--min-fps 10] [--max-p95 inference=80] [--workers 4] [--frame-pool 0]
+#   python benchmark.py tracker [--persons 5] [--strides 1 2 3 5] [--frames 600]
+#   python benchmark.py backends videos/a.mp4 [--backends torch onnx onnx-int8] [--imgsz 640 480] [--threads 4]
+#   python benchmark.py scene videos/a.mp4 [--backend onnx] [--object-model yolov8n.pt] [--batch 4] [--stride 3]
+import argparse
+import datetime
+import itertools
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+import real_server as rs
+
+W, H = 1280, 720
+
+def timeit(fn, iters):
+    fn() # 워밍업
+    t = time.perf_counter()
+    for _ in range(iters): fn()
+    return (time.perf_counter() - t) / iters * 1000
+
+def random_keypoints(n, w=W, h=H, seed=0, missing=0.1):
+    # 가짜 포즈: 일부 키포인트는 미검출(0), 마지막 사람은 손목이 코 근처(흡연 자세)
+    rng = np.random.default_rng(seed)
+    kps = rng.uniform([0, 0], [w, h], size=(n, 17, 2)).astype(np.float32)
+    kps[rng.random((n, 17)) < missing] = 0
+    if n: kps[-1, 9] = kps[-1, 0] + [30, 40]
+    return kps
+
+# === [1] 키포인트 후처리 ===
+def legacy_keypoints(kps_batch, w, h, threshold=160):
+    # 기존 run_ai_loop 의 사람별 파이썬 루프 (그리기 제외)
+    offender_idx = -1
+    for i, kps in enumerate(kps_batch):
+        if len(kps) > 10:
+            nose = kps[0]; l_wrist = kps[9]; r_wrist = kps[10]
+            dist_l = math.dist(nose, l_wrist) if nose[0]!=0 and l_wrist[0]!=0 else 999
+            dist_r = math.dist(nose, r_wrist) if nose[0]!=0 and r_wrist[0]!=0 else 999
+            if dist_l < threshold or dist_r < threshold:
+                offender_idx = i
+                break
+
+    boxes = {}
+    for i, kps in enumerate(kps_batch):
+        if len(kps) > 10:
+            head_x = [p[0] for p in kps[0:5] if p[0]!=0]
+            head_y = [p[1] for p in kps[0:5] if p[1]!=0]
+            if head_x and head_y:
+                min_x, max_x = int(min(head_x))-40, int(max(head_x))+40
+                min_y, max_y = int(min(head_y))-60, int(max(head_y))+30
+                min_x=max(0, min_x); min_y=max(0, min_y); max_x=min(w, max_x); max_y=min(h, max_y)
+                boxes[i] = (min_x, min_y, max_x, max_y)
+    return offender_idx, boxes
+
+def bench_keypoints(args):
+    print(f"{'persons':>8} {'loop(ms)':>10} {'numpy(ms)':>10} {'speedup':>8}")
+    for n in args.persons:
+        kps = random_keypoints(n)
+        # 두 구현의 결과가 같은지 먼저 확인
+        offender, boxes = legacy_keypoints(kps, W, H)
+        result = rs.analyze_keypoints(kps, W, H)
+        vec_boxes = {int(i): tuple(result["boxes"][i].tolist()) for i in np.flatnonzero(result["has_box"])}
+        assert offender == result["offender"] and boxes == vec_boxes, f"결과 불일치 (persons={n})"
+
+        t_loop = timeit(lambda: legacy_keypoints(kps, W, H), args.iters)
+        t_vec = timeit(lambda: rs.analyze_keypoints(kps, W, H), args.iters)
+        print(f"{n:>8} {t_loop:>10.4f} {t_vec:>10.4f} {t_loop / t_vec:>7.1f}x")
+
+# === [2] 프라이버시 블러 ===
+def random_head_boxes(n, w=W, h=H, seed=0):
+    # 720p 기준 행인 머리 박스 크기 (약 120x150)
+    rng = np.random.default_rng(seed)
+    x1 = rng.integers(0, w - 120, n); y1 = rng.integers(0, h - 150, n)
+    return [(int(x), int(y), int(x) + 120, int(y) + 150) for x, y in zip(x1, y1)]
+
+def bench_blur(args):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (H, W, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (5, 5), 0) # 완전 노이즈보다는 실제 영상에 가깝게
+    print("ms/frame " + " ".join(f"{m:>10}" for m in rs.BLUR_MODES))
+    for n in args.persons:
+        boxes = random_head_boxes(n)
+        row = []
+        for mode in rs.BLUR_MODES:
+            work = frame.copy()
+            row.append(timeit(lambda: rs.anonymize_regions(work, boxes, mode), args.iters))
+        print(f"{n:>5}명  " + " ".join(f"{t:>10.3f}" for t in row))
+
+# === [3] 이벤트 저장소 ===
+def bench_events(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench_events.db")
+    store = rs.EventStore(path)
+    threading.Thread(target=store.writer_loop, daemon=True).start()
+    rng = np.random.default_rng(0)
+    types = [t for t, _, _ in rs.initial_data]
+    locs = list(rs.locations_status)
+    t_idx = rng.integers(0, len(types), args.count); l_idx = rng.integers(0, len(locs), args.count)
+    start_ts = time.time() - 30 * 86400
+
+    t = time.perf_counter()
+    for i in range(args.count):
+        ts = start_ts + i * (30 * 86400 / args.count)
+        store.append({"time": "12:00", "date": "2025-01-03", "type": types[t_idx[i]], "loc": locs[l_idx[i]],
+                      "zone": "Live", "conf": 98, "status": "경고", "camera": "cam0"}, ts=ts)
+    t_append = time.perf_counter() - t
+    store.flush(timeout=600)
+    t_total = time.perf_counter() - t
+    print(f"append {args.count:,}건: {t_append:.2f}s (AI 스레드 부담 {t_append / args.count * 1e6:.1f}us/건), DB 반영까지 {t_total:.2f}s")
+
+    mid = store.next_id // 2
+    day = time.strftime("%Y-%m-%d", time.localtime(start_ts + 15 * 86400))
+    cases = [
+        ("최신 200건", lambda: store.query(limit=200)),
+        ("since_id 이후 200건", lambda: store.query(since_id=store.next_id - 300, limit=200, newest_first=False)),
+        ("유형 필터", lambda: store.query(limit=100, type=types[0])),
+        ("위치 필터 + before_id", lambda: store.query(before_id=mid, limit=100, loc=locs[0])),
+        ("날짜 필터", lambda: store.query(limit=100, date=day)),
+        ("유형별 건수 (count)", lambda: store.count(type=types[1])),
+    ]
+    for name, fn in cases:
+        print(f"  {name:<22} {timeit(fn, args.iters):8.3f} ms")
+    rs.stop_event.set()
+
+def bench_retention(args):
+    # 한 달치 이벤트를 하루 단위로 넣으면서 매일 보존 정책 적용 -> 메모리/DB 행 수가 평평한지, 집계/기간별 건수가 정확한지
+    rs.EVENT_RETENTION, rs.ROLLUP_HOURLY_DAYS, rs.RECENT_EVENTS = args.retention, args.hourly_days, args.window
+    path = os.path.join(tempfile.mkdtemp(), "bench_retention.db")
+    store = rs.EventStore(path)
+    threading.Thread(target=store.writer_loop, daemon=True).start()
+    rng = np.random.default_rng(0)
+    types = [t for t, _, _ in rs.initial_data]
+    locs = list(rs.locations_status)
+    base = store.insights.snapshot() # 초기 데이터
+    truth_type, truth_loc = dict(base["by_type"]), dict(base["by_loc"])
+    truth_hour = list(base["by_hour"])
+    truth_day = {}
+    day0 = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=args.days), datetime.time())
+
+    print(f"하루 {args.per_day:,}건 x {args.days}일, EVENT_RETENTION={args.retention:,}, ROLLUP_HOURLY_DAYS={args.hourly_days}, RECENT_EVENTS={args.window}")
+    print(f"{'day':>4} {'누적':>10} {'원본':>8} {'집계 행':>8} {'메모리 창':>9} {'RSS(MB)':>8} {'DB(MB)':>7} {'compact(ms)':>11}")
+    for day in range(args.days):
+        start = day0 + datetime.timedelta(days=day)
+        seconds = np.sort(rng.integers(0, 86400, args.per_day))
+        t_idx = rng.integers(0, len(types), args.per_day); l_idx = rng.integers(0, len(locs), args.per_day)
+        for sec, ti, li in zip(seconds, t_idx, l_idx):
+            at = start + datetime.timedelta(seconds=int(sec))
+            store.append({"time": at.strftime("%H:%M"), "date": at.strftime("%Y-%m-%d"), "type": types[ti], "loc": locs[li],
+                          "zone": "Live", "conf": 98, "status": "경고", "camera": f"cam{li % 2}"}, ts=at.timestamp())
+            truth_type[types[ti]] = truth_type.get(types[ti], 0) + 1
+            truth_loc[locs[li]] = truth_loc.get(locs[li], 0) + 1
+            truth_hour[at.hour] += 1
+        truth_day[start.strftime("%Y-%m-%d")] = args.per_day
+        store.flush(timeout=600)
+        t = time.perf_counter()
+        store.compact(now=(start + datetime.timedelta(days=1)).timestamp())
+        t_compact = (time.perf_counter() - t) * 1000
+        rollups = store._conn().execute("SELECT COUNT(*) FROM event_rollups").fetchone()[0]
+        if day % args.every == 0 or day == args.days - 1:
+            print(f"{day + 1:>4} {store.total:>10,} {store.detailed:>8,} {rollups:>8,} {len(store.recent):>9} "
+                  f"{rs.current_rss() / 2**20:>8.0f} {os.path.getsize(path) / 2**20:>7.1f} {t_compact:>11.1f}")
+
+    # 정확도: 메모리 집계 / DB 에서 다시 읽은 집계 / 날짜별 건수 / 일별 기간 조회가 실제 넣은 값과 같은지
+    reloaded = rs.Insights()
+    reloaded.load(store._conn())
+    end = (day0 + datetime.timedelta(days=args.days)).timestamp()
+    history = {time.strftime("%Y-%m-%d", time.localtime(s)): n for s, n in store.history("day", args.days, now=end)}
+    checks = [
+        ("total", store.total == reloaded.total == sum(truth_type.values())),
+        ("유형별 (메모리/재로딩)", store.insights.snapshot()["by_type"] == reloaded.snapshot()["by_type"] == truth_type),
+        ("위치별 (메모리/재로딩)", store.insights.snapshot()["by_loc"] == reloaded.snapshot()["by_loc"] == truth_loc),
+        ("시간대별 (메모리/재로딩)", store.insights.snapshot()["by_hour"] == reloaded.snapshot()["by_hour"] == truth_hour),
+        ("날짜별 count(date=)", all(store.count(date=d) == n for d, n in truth_day.items())),
+        ("일별 history", all(history.get(d) == n for d, n in truth_day.items())),
+    ]
+    for name, ok in checks: print(f"  {name:<24} {'✅' if ok else '❌'}")
+    rs.stop_event.set()
+    if not all(ok for _, ok in checks): sys.exit(1)
+
+# === [4] 전체 파이프라인 (헤드리스 리플레이) ===
+def bench_pipeline(args):
+    rs.INFERENCE_WORKERS = args.workers
+    rs.FRAME_POOL_SIZE = args.frame_pool
+    frames, elapsed = rs.run_replay(args.source, args.pace)
+    print(rs.format_perf_report(frames, elapsed))
+
+    # CI 회귀 체크: 기준 미달이면 종료 코드 1
+    failures = []
+    fps = frames / max(elapsed, 1e-9)
+    if args.min_fps and fps < args.min_fps: failures.append(f"FPS {fps:.1f} < {args.min_fps}")
+    summary = rs.perf.summary()
+    for limit in args.max_p95:
+        stage, _, ms = limit.partition("=")
+        p95 = summary.get(stage, {}).get("p95")
+        if p95 is not None and p95 > float(ms): failures.append(f"{stage} p95 {p95:.2f}ms > {ms}ms")
+    for f in failures: print(f"❌ {f}")
+    if failures: sys.exit(1)
+
+# === [5] 포즈 트래커 (POSE_STRIDE) ===
+def walking_people(n, frames, seed=0):
+    # 등속 + 약간의 흔들림으로 걷는 사람들의 정답 키포인트 (frames, n, 17, 2). 0번은 도중에 담배를 든다
+    rng = np.random.default_rng(seed)
+    start = rng.uniform([100, 150], [W - 100, H - 150], size=(n, 2))
+    speed = rng.uniform(-4, 4, size=(n, 2))
+    offsets = rng.uniform([-40, -120], [40, 120], size=(17, 2))
+    offsets[:5] = rng.uniform([-15, -130], [15, -90], size=(5, 2)) # 머리 키포인트
+    offsets[9:11] = [[-35, 40], [35, 40]] # 손목은 허리 높이 (흡연 자세 아님)
+    t = np.arange(frames)[:, None, None]
+    # 화면 가장자리에서는 반대로 꺾어서 걸음 (급격한 방향 전환도 포함되도록)
+    lo, span = np.array([100, 150]), np.array([W - 200, H - 300])
+    r = (start[None] - lo + speed[None] * t) % (2 * span)
+    centers = lo + np.where(r > span, 2 * span - r, r) + rng.normal(0, 1.5, size=(frames, n, 2))
+    truth = (centers[:, :, None, :] + offsets[None, None]).astype(np.float32)
+    truth[frames // 3:, 0, 9] = truth[frames // 3:, 0, 0] + [20, 30]
+    return truth
+
+def box_coverage(truth_boxes, boxes):
+    # 정답 머리 박스마다 예측 박스들이 덮은 최대 비율 (블러 누락 = 프라이버시 누출). 순서/ID 와 무관
+    if len(boxes) == 0: return np.zeros(len(truth_boxes))
+    t, b = truth_boxes[:, None].astype(np.float64), boxes[None].astype(np.float64)
+    iw = np.clip(np.minimum(t[..., 2], b[..., 2]) - np.maximum(t[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(t[..., 3], b[..., 3]) - np.maximum(t[..., 1], b[..., 1]), 0, None)
+    area = (t[..., 2] - t[..., 0]) * (t[..., 3] - t[..., 1])
+    return (iw * ih / np.maximum(area, 1)).max(axis=1)
+
+def shuffled(kps, seed):
+    # 실제 검출 결과처럼 사람 순서를 매번 섞음
+    return kps[np.random.default_rng(seed).permutation(len(kps))]
+
+def bench_tracker(args):
+    truth = walking_people(args.persons, args.frames)
+    print(f"{'stride':>6} {'추론':>6} {'범인 일치':>9} {'박스 커버(평균)':>15} {'커버<80%':>9} {'track(ms)':>10}")
+    for stride in args.strides:
+        tracker = rs.PoseTracker(max_age=max(10, stride))
+        agree, coverage, t_track, runs = 0, [], 0.0, 0
+        for f, kps in enumerate(truth):
+            t = time.perf_counter()
+            if f % stride == 0:
+                tracked = tracker.update(shuffled(kps, f), W, H); runs += 1
+            else:
+                tracked = tracker.predict(W, H)
+            t_track += time.perf_counter() - t
+            expected = rs.analyze_keypoints(kps, W, H)
+            got = rs.analyze_keypoints(tracked, W, H)
+            coverage.append(box_coverage(expected["boxes"][expected["has_box"]], got["boxes"][got["has_box"]]))
+            # 범인: 둘 다 없거나, 예측한 범인 박스가 정답 범인 머리를 덮고 있으면 일치
+            if expected["offender"] < 0 or got["offender"] < 0:
+                agree += expected["offender"] == got["offender"]
+            else:
+                agree += box_coverage(expected["boxes"][[expected["offender"]]], got["boxes"][[got["offender"]]])[0] >= 0.5
+        cov = np.concatenate(coverage)
+        print(f"{stride:>6} {runs:>6} {agree / args.frames:>9.1%} {cov.mean():>15.1%} {(cov < 0.8).mean():>9.2%} {t_track / args.frames * 1000:>10.3f}")
+
+# === [6] 포즈 추론 백엔드 비교 (CPU) ===
+def load_frames(source, limit):
+    cam = rs.Camera("bench", "bench", source)
+    if not cam.recorded: raise SystemExit(f"영상 파일이나 프레임 폴더가 필요합니다: {source}")
+    return list(itertools.islice(rs.read_frames(cam), limit))
+
+def keypoint_error(ref, kps):
+    # 기준 결과의 사람마다 중심이 가장 가까운 사람과 비교해서, 둘 다 검출된 키포인트의 평균 거리(px)
+    errors = []
+    ref_c, ref_ok = rs.PoseTracker._centers(ref)
+    kps_c, kps_ok = rs.PoseTracker._centers(kps)
+    if not kps_ok.any(): return errors
+    for r, c in zip(ref[ref_ok], ref_c[ref_ok]):
+        k = kps[kps_ok][np.argmin(np.linalg.norm(kps_c[kps_ok] - c, axis=1))]
+        both = (r != 0).all(axis=1) & (k != 0).all(axis=1)
+        if both.any(): errors.append(float(np.linalg.norm(r[both] - k[both], axis=1).mean()))
+    return errors
+
+def bench_backends(args):
+    frames = load_frames(args.source, args.frames)
+    h, w = frames[0].shape[:2]
+    print(f"프레임 {len(frames)}장 ({w}x{h}), 기준: {args.backends[0]}@{args.imgsz[0]}")
+    print(f"{'backend':<10} {'imgsz':>5} {'load(s)':>8} {'ms/frame':>9} {'FPS':>6} {'인원':>5} {'인원 일치':>9} {'kp 오차(px)':>11} {'범인 일치':>9}")
+    reference = None
+    for kind, imgsz in itertools.product(args.backends, args.imgsz):
+        t = time.perf_counter()
+        model = rs.load_pose_backend(kind, args.model, imgsz, args.threads)
+        t_load = time.perf_counter() - t
+        t = time.perf_counter()
+        outputs = [model([frame])[0] for frame in frames]
+        ms = (time.perf_counter() - t) / len(frames) * 1000
+        if reference is None: reference = outputs
+
+        same_count = np.mean([len(a) == len(b) for a, b in zip(reference, outputs)])
+        errors = [e for a, b in zip(reference, outputs) for e in keypoint_error(a, b)]
+        offenders = np.mean([(rs.analyze_keypoints(a, w, h)["offender"] >= 0) == (rs.analyze_keypoints(b, w, h)["offender"] >= 0)
+                             for a, b in zip(reference, outputs)])
+        persons = np.mean([len(o) for o in outputs])
+        err = f"{np.mean(errors):.2f}" if errors else "-"
+        print(f"{kind:<10} {imgsz:>5} {t_load:>8.1f} {ms:>9.2f} {1000 / ms:>6.1f} {persons:>5.2f} {same_count:>9.1%} {err:>11} {offenders:>9.1%}")
+
+# === [7] 포즈 + 객체 검출 비용 (전처리 공유 / 객체 검출 간격) ===
+def bench_scene(args):
+    frames = load_frames(args.source, args.frames)
+    pose = rs.load_pose_backend(args.backend, args.model, args.imgsz, args.threads)
+    objects = rs.load_object_backend(args.backend, args.object_model, pose.imgsz, args.threads)
+    batches = [frames[i:i + args.batch] for i in range(0, len(frames), args.batch)]
+    t = time.perf_counter()
+    for b in batches: rs.letterbox_batch(b, pose.imgsz)
+    prep = (time.perf_counter() - t) / len(frames) * 1000
+    print(f"프레임 {len(frames)}장, 배치 {args.batch}, letterbox {prep:.2f} ms/frame")
+    print(f"{'방식':<16} {'ms/frame':>9} {'FPS':>6} {'포즈만 대비':>10}")
+    base = None
+    for name, run in (("포즈만", pose),
+                      ("모델별 전처리", lambda b: (pose(b), objects(b))),
+                      ("공유 전처리", rs.SceneDetector(pose, objects, stride=1)),
+                      (f"공유 + 간격 {args.stride}", rs.SceneDetector(pose, objects, stride=args.stride))):
+        t = time.perf_counter()
+        for b in batches: run(b)
+        ms = (time.perf_counter() - t) / len(frames) * 1000
+        base = base or ms
+        print(f"{name:<16} {ms:>9.2f} {1000 / ms:>6.1f} {ms / base - 1:>+10.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CityEye 성능 측정")
+    sub = parser.add_subparsers(dest="target", required=True)
+
+    p = sub.add_parser("keypoints", help="키포인트 후처리: 파이썬 루프 vs NumPy")
+    p.add_argument("--persons", type=int, nargs="+", default=[1, 5, 20, 50])
+    p.add_argument("--iters", type=int, default=2000)
+    p.set_defaults(func=bench_keypoints)
+
+    p = sub.add_parser("blur", help="블러 모드별 ms/frame (사람 수별)")
+    p.add_argument("--persons", type=int, nargs="+", default=[1, 5, 10, 20])
+    p.add_argument("--iters", type=int, default=50)
+    p.set_defaults(func=bench_blur)
+
+    p = sub.add_parser("events", help="이벤트 저장소 대량 입력/조회")
+    p.add_argument("--count", type=int, default=1000000)
+    p.add_argument("--iters", type=int, default=20)
+    p.set_defaults(func=bench_events)
+
+    p = sub.add_parser("retention", help="이벤트 보존 정책: 한 달치 입력 동안 메모리/DB 크기와 집계 정확도")
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--per-day", type=int, default=20000)
+    p.add_argument("--retention", type=int, default=rs.EVENT_RETENTION)
+    p.add_argument("--hourly-days", type=float, default=7, help="시간별 집계 보관 일수 (이후 일별)")
+    p.add_argument("--window", type=int, default=rs.RECENT_EVENTS)
+    p.add_argument("--every", type=int, default=3, help="출력 간격(일)")
+    p.set_defaults(func=bench_retention)
+
+    p = sub.add_parser("pipeline", help="녹화 영상으로 전체 파이프라인 FPS / 단계별 p50·p95·p99")
+    p.add_argument("source", help="영상 파일/프레임 폴더 또는 CAMERA_SOURCES 형식")
+    p.add_argument("--pace", choices=["max", "realtime"], default="max")
+    p.add_argument("--min-fps", type=float, default=0)
+    p.add_argument("--max-p95", nargs="*", default=[], metavar="STAGE=MS")
+    p.add_argument("--workers", type=int, default=rs.INFERENCE_WORKERS, help="추론 워커 프로세스 수 (0: 인프로세스)")
+    p.add_argument("--frame-pool", type=int, default=rs.FRAME_POOL_SIZE, help="카메라당 프레임 버퍼 수 (0: 풀 없이 매 프레임 할당, 비교용)")
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("tracker", help="POSE_STRIDE 별 트래커 예측 정확도 (범인 판정, 머리 박스 커버율)")
+    p.add_argument("--persons", type=int, default=5)
+    p.add_argument("--strides", type=int, nargs="+", default=[1, 2, 3, 5])
+    p.add_argument("--frames", type=int, default=600)
+    p.set_defaults(func=bench_tracker)
+
+    p = sub.add_parser("backends", help="포즈 백엔드(torch/onnx/onnx-int8)·입력 해상도별 CPU FPS 와 정확도 (첫 조합 기준)")
+    p.add_argument("source", help="영상 파일 또는 프레임 폴더")
+    p.add_argument("--backends", nargs="+", choices=rs.POSE_BACKENDS, default=list(rs.POSE_BACKENDS))
+    p.add_argument("--imgsz", type=int, nargs="+", default=[rs.POSE_IMGSZ])
+    p.add_argument("--model", default=rs.POSE_MODEL)
+    p.add_argument("--threads", type=int, default=rs.INFERENCE_THREADS)
+    p.add_argument("--frames", type=int, default=200)
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("scene", help="포즈 + 객체 검출: 포즈만 / 모델별 전처리 / 공유 전처리 / 객체 검출 간격별 ms/frame")
+    p.add_argument("source", help="영상 파일 또는 프레임 폴더")
+    p.add_argument("--backend", choices=rs.POSE_BACKENDS, default=rs.POSE_BACKEND)
+    p.add_argument("--model", default=rs.POSE_MODEL)
+    p.add_argument("--object-model", default=rs.OBJECT_MODEL or "yolov8n.pt")
+    p.add_argument("--imgsz", type=int, default=rs.POSE_IMGSZ)
+    p.add_argument("--threads", type=int, default=rs.INFERENCE_THREADS)
+    p.add_argument("--batch", type=int, default=1, help="한 번에 추론할 프레임 수 (카메라 수)")
+    p.add_argument("--stride", type=int, default=rs.OBJECT_STRIDE, help="객체 검출 간격 (포즈 추론 N 번에 한 번)")
+    p.add_argument("--frames", type=int, default=200)
+    p.set_defaults(func=bench_scene)
+
+    args = parser.parse_args()
+    args.func(args)
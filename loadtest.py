@@ -0,0 +1,164 @@
+# 부하 테스트: 서버를 합성(또는 녹화) 카메라로 따로 띄우고, 로컬에서 MJPEG 시청자 N 명 + /status_json 폴러 M 개를 단계별로 붙여가며 측정
+#   python loadtest.py [--source synthetic://1280x720@30] [--viewers 0 5 10 20 40] [--pollers 10] [--duration 10]
+#   python loadtest.py --source "공학관=videos/a.mp4;정문=synthetic://1920x1080@30" --profile "width=640&quality=60&fps=10"
+# 서버 CPU/메모리는 서버 /metrics 의 process_* 값, AI 루프 FPS 는 cityeye_frames_processed_total 증가량으로 계산
+# (클라이언트 부하가 측정에 섞이지 않도록 서버는 별도 프로세스)
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "real_server.py")
+
+def start_server(args):
+    workdir = tempfile.mkdtemp(prefix="cityeye_loadtest_")
+    source = args.source if "=" in args.source else f"공학관={args.source}"
+    env = {**os.environ, "CAMERA_SOURCES": source, "EVENT_DB": os.path.join(workdir, "events.db"),
+           "CLIP_DIR": os.path.join(workdir, "clips"), "AUDIO_BACKEND": "null"}
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen([sys.executable, SERVER, "--host", "127.0.0.1", "--port", str(args.port)], env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    print(f"🚀 서버 시작 (pid {proc.pid}, 카메라 {source}, 로그 {log.name})")
+    return proc
+
+# === [1] 최소 HTTP 클라이언트 (외부 의존성 없이 asyncio 소켓으로) ===
+async def http_get(port, path, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    extra = "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n{extra}\r\n".encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    response_headers = {k.lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+    return status, response_headers, body
+
+async def viewer(port, path, stop, frames):
+    # MJPEG 스트림을 끝까지 읽으면서 경계(--frame) 개수만 셈
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    tail = b""
+    try:
+        while not stop.is_set():
+            try: chunk = await asyncio.wait_for(reader.read(65536), 1.0)
+            except asyncio.TimeoutError: continue
+            if not chunk: break
+            data = tail + chunk
+            frames[0] += data.count(b"--frame")
+            tail = data[-(len(b"--frame") - 1):] # 청크 경계에 걸친 구분자 (구분자 전체는 남기지 않아야 두 번 안 셈)
+    finally:
+        writer.close()
+
+async def poller(port, interval, stop, latencies):
+    # 대시보드 폴링 폴백과 같은 방식: since_id + ETag
+    last_id, etag = 0, None
+    while not stop.is_set():
+        t = time.perf_counter()
+        status, headers, body = await http_get(port, f"/status_json?since_id={last_id}&limit=500",
+                                               {"If-None-Match": etag} if etag else None)
+        latencies.append((time.perf_counter() - t) * 1000)
+        if status == 200:
+            etag = headers.get("etag")
+            last_id = int(body.split(b'"last_id":')[1].split(b",")[0]) if b'"last_id":' in body else last_id
+        await asyncio.sleep(interval)
+
+# === [2] 서버 지표 ===
+def parse_metrics(text):
+    # 이름별 합계 (라벨 무시)
+    totals = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"): continue
+        name_labels, _, value = line.rpartition(" ")
+        name = name_labels.split("{")[0]
+        totals[name] = totals.get(name, 0.0) + float(value)
+    return totals
+
+async def scrape(port):
+    _, _, body = await http_get(port, "/metrics")
+    return parse_metrics(body.decode()), time.perf_counter()
+
+async def wait_ready(port, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            metrics, _ = await scrape(port)
+            if metrics.get("cityeye_frames_processed_total", 0) > 0: return True # 모델 로딩 후 첫 프레임까지
+        except (OSError, IndexError, ValueError): pass
+        await asyncio.sleep(0.5)
+    return False
+
+# === [3] 단계별 측정 ===
+async def run_step(args, n_viewers):
+    stop = asyncio.Event()
+    counters = [[0] for _ in range(n_viewers)]
+    latencies = []
+    path = "/video_feed" + (f"?{args.profile}" if args.profile else "")
+    tasks = [asyncio.create_task(viewer(args.port, path, stop, c)) for c in counters]
+    tasks += [asyncio.create_task(poller(args.port, args.poll_interval, stop, latencies)) for _ in range(args.pollers)]
+
+    await asyncio.sleep(args.warmup) # 연결/첫 인코딩 안정화
+    start = [c[0] for c in counters]
+    before, t0 = await scrape(args.port)
+    latencies.clear()
+    await asyncio.sleep(args.duration)
+    after, t1 = await scrape(args.port)
+    end = [c[0] for c in counters]
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    elapsed = t1 - t0
+    delta = lambda name: after.get(name, 0) - before.get(name, 0)
+    fps = np.array([(e - s) / elapsed for s, e in zip(start, end)]) if n_viewers else np.zeros(0)
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "viewers": n_viewers,
+        "ai_fps": delta("cityeye_frames_processed_total") / elapsed,
+        "viewer_min": fps.min() if len(fps) else 0, "viewer_med": float(np.median(fps)) if len(fps) else 0,
+        "polls": len(latencies),
+        "p50": np.percentile(lat, 50), "p95": np.percentile(lat, 95), "p99": np.percentile(lat, 99),
+        "cpu": delta("process_cpu_seconds_total") / elapsed * 100,
+        "rss": after.get("process_resident_memory_bytes", 0) / 2**20,
+        "skipped": delta("cityeye_stream_skipped_frames_total"),
+    }
+
+async def main(args):
+    proc = start_server(args)
+    try:
+        if not await wait_ready(args.port, args.startup_timeout):
+            raise SystemExit(f"❌ 서버가 {args.startup_timeout}s 안에 프레임을 처리하지 못했습니다 (로그 확인)")
+        print(f"시청자 단계 {args.viewers}, 폴러 {args.pollers}개 (간격 {args.poll_interval}s), 단계당 {args.duration}s")
+        print(f"{'viewers':>7} {'AI fps':>7} {'시청 fps(min/med)':>17} {'polls':>6} {'status p50/p95/p99 (ms)':>24} {'CPU%':>6} {'RSS(MB)':>8} {'skip':>6}")
+        baseline, knee = None, None
+        for n in args.viewers:
+            row = await run_step(args, n)
+            baseline = baseline or row["ai_fps"]
+            print(f"{n:>7} {row['ai_fps']:>7.1f} {row['viewer_min']:>8.1f}/{row['viewer_med']:<8.1f} {row['polls']:>6} "
+                  f"{row['p50']:>8.1f}/{row['p95']:.1f}/{row['p99']:<8.1f} {row['cpu']:>6.0f} {row['rss']:>8.0f} {row['skipped']:>6.0f}")
+            if knee is None and row["ai_fps"] < baseline * (1 - args.max_drop): knee = n
+        if knee is None: print(f"✅ 시청자 {args.viewers[-1]}명까지 AI 루프 FPS 유지 (기준 {baseline:.1f}, 허용 하락 {args.max_drop:.0%})")
+        else: print(f"⚠️ 시청자 {knee}명부터 AI 루프 FPS 가 기준 {baseline:.1f} 대비 {args.max_drop:.0%} 이상 하락")
+    finally:
+        proc.terminate()
+        try: proc.wait(10)
+        except subprocess.TimeoutExpired: proc.kill()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CityEye 부하 테스트 (MJPEG 시청자 / 상태 폴러)")
+    parser.add_argument("--source", default="synthetic://1280x720@30", help="CAMERA_SOURCES 형식 또는 소스 하나 (synthetic://WxH@fps, 영상 파일 등)")
+    parser.add_argument("--viewers", type=int, nargs="+", default=[0, 5, 10, 20, 40], help="단계별 동시 MJPEG 시청자 수")
+    parser.add_argument("--pollers", type=int, default=10, help="/status_json 폴러 수 (모든 단계 공통)")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--profile", default="", help="/video_feed 프로필 쿼리 (예: width=640&quality=60&fps=10)")
+    parser.add_argument("--duration", type=float, default=10, help="단계당 측정 시간(s)")
+    parser.add_argument("--warmup", type=float, default=2, help="단계 시작 후 측정 전 대기(s)")
+    parser.add_argument("--max-drop", type=float, default=0.1, help="AI 루프 FPS 가 이 비율 이상 떨어지면 한계로 판단")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    asyncio.run(main(parser.parse_args()))
@@ -1,12 +1,34 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, StreamingResponse
-from ultralytics import YOLO
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 import cv2
 import threading
+import asyncio
 import time
-import math
 import random
 import datetime
+import os
+import bisect
+import argparse
+import tempfile
+import collections
+import sys
+import shutil
+import subprocess
+import zlib
+import math
+import gzip
+import socket
+import urllib.error
+import urllib.request
+import json
+import queue
+import sqlite3
+import multiprocessing
+from multiprocessing import shared_memory
+try:
+    import resource # 최대 RSS 측정 (리눅스/맥)
+except ImportError:
+    resource = None
 import numpy as np
 
 # 오디오 라이브러리 체크
@@ -28,8 +50,7 @@ locations_status = {
     "기숙사": {"status": "정상", "last_action": "특이사항 없음", "type": None},
 }
 
-# 초기 로그 데이터 (보고서용 고정확도 97~99% 적용)
-fake_logs = []
+# 초기 로그 데이터 (보고서용 고정확도 97~99% 적용) - 이벤트 DB 가 비어 있을 때만 넣음
 initial_data = [
     ("흡연 감지", "공학관", 35),
     ("무단 투기", "학생회관", 30),
@@ -37,246 +58,2545 @@ initial_data = [
     ("전단지 부착", "정문", 20)
 ]
 
-log_id_counter = 1
-for v_type, loc, count in initial_data:
-    for _ in range(count):
-        fake_logs.append({
-            "id": log_id_counter,
-            "time": "10:00",
-            "date": "2025-01-03",
-            "type": v_type,
-            "loc": loc,
-            "zone": "Record",
-            "conf": random.randint(97, 99), # 초기 데이터도 높은 정확도로 설정
-            "status": "경고"
-        })
-        log_id_counter += 1
-fake_logs.reverse()
-
-insights_data = {"total": 100, "peak_time": "12:00-14:00", "most_place": "공학관", "most_action": "흡연 감지"}
+def initial_logs():
+    for v_type, loc, count in initial_data:
+        for _ in range(count):
+            yield {
+                "time": "10:00",
+                "date": "2025-01-03",
+                "type": v_type,
+                "loc": loc,
+                "zone": "Record",
+                "conf": random.randint(97, 99), # 초기 데이터도 높은 정확도로 설정
+                "status": "경고"
+            }
+
 current_monitor_state = {"location": "공학관", "status": "정상", "action": "모니터링 중...", "time": "-", "conf": 0, "type": None}
 
-output_frame = None
-lock = threading.Lock()
+state_version = 0 # 대시보드 데이터(로그/구역/관제 상태)가 바뀔 때마다 증가 -> /status_json ETag
 stop_event = threading.Event()
+frame_ready = threading.Event() # 어느 카메라든 새 프레임이 들어오면 set
+
+def mark_changed():
+    global state_version
+    state_version += 1
+    status_notifier.notify() # 연결된 대시보드(SSE)에 즉시 푸시
+
+# === [1-1] 성능 계측 (/metrics, 리플레이 리포트) ===
+# 기록은 카운터 증가만 하고, 텍스트 변환은 /metrics 를 긁어갈 때만 하므로 평소 부담은 거의 없음
+PIPELINE_STAGES = ("decode", "motion", "inference", "track", "link", "keypoints", "blur", "overlay", "encode")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0) # 초
+PERSON_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def prometheus(self, name, labels=""):
+        sep = "," if labels else ""
+        with self._lock: counts, total, count = list(self.counts), self.sum, self.count
+        lines, acc = [], 0
+        for le, n in zip([*self.buckets, "+Inf"], counts):
+            acc += n
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {acc}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {total}")
+        lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+class StageTimer:
+    # 단계별 처리 시간: 누적 히스토그램(/metrics) + 최근 샘플(리플레이 리포트 백분위)
+    def __init__(self, maxlen=20000):
+        self.samples = {stage: collections.deque(maxlen=maxlen) for stage in PIPELINE_STAGES}
+        self.histograms = {stage: Histogram(LATENCY_BUCKETS) for stage in PIPELINE_STAGES}
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+        self.histograms[stage].observe(seconds)
+
+    def reset(self):
+        for samples in self.samples.values(): samples.clear()
+
+    def summary(self):
+        # {단계: {count, mean, p50, p95, p99}} (ms)
+        report = {}
+        for stage, samples in self.samples.items():
+            if not samples: continue
+            ms = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            report[stage] = {"count": len(ms), "mean": float(ms.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return report
+
+perf = StageTimer()
+persons_per_frame = Histogram(PERSON_BUCKETS)
 
 # === [2] 오디오 엔진 ===
-def play_sound_effect(scenario):
-    if not AUDIO_AVAILABLE: return
+# AUDIO_BACKEND: tts(스피커 송출) / file(재생 대신 AUDIO_LOG 파일에 기록) / null(기록만, 헤드리스 테스트용)
+AUDIO_MESSAGES = {
+    "SMOKING": "흡연 감지. 담배를 꺼주세요.",
+    "LITTERING": "무단 투기 감지. 쓰레기를 수거하세요.",
+    "PM_VIOLATION": "킥보드 불법 주차 및 탑승 위반입니다.",
+    "FLYER": "경고. 이곳은 광고물 부착 금지 구역입니다.",
+    "UNDO": "상황 해제. 정상 모니터링 중입니다.",
+}
+AUDIO_BACKEND = os.environ.get("AUDIO_BACKEND", "tts" if AUDIO_AVAILABLE else "null")
+AUDIO_CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", "audio_cache")
+AUDIO_LOG = os.environ.get("AUDIO_LOG", "audio_log.txt")
+
+def play_wav(path):
+    # OS 기본 플레이어로 wav 재생 (끝날 때까지 블로킹). 재생 수단이 없으면 False
+    if sys.platform == "win32":
+        import winsound
+        winsound.PlaySound(path, winsound.SND_FILENAME)
+        return True
+    player = shutil.which("afplay") or shutil.which("aplay") or shutil.which("paplay")
+    if not player: return False
+    return subprocess.run([player, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+class NullAudioOutput:
+    def __init__(self):
+        self.played = []
+
+    def play(self, scenario):
+        self.played.append((time.time(), scenario))
+
+class FileAudioOutput:
+    def __init__(self, path):
+        self.path = path
+
+    def play(self, scenario):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"{datetime.datetime.now().isoformat(timespec='seconds')} {scenario} {AUDIO_MESSAGES[scenario]}\n")
+
+class TTSAudioOutput:
+    # pyttsx3 엔진은 하나만 만들어 재사용. 안내 문구는 처음 한 번 wav 로 렌더링해 두고 이후엔 캐시 파일만 재생
+    def __init__(self, cache_dir):
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('rate', 150)
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.clips = {scenario: self.render(scenario) for scenario in AUDIO_MESSAGES}
+
+    def render(self, scenario):
+        text = AUDIO_MESSAGES[scenario]
+        path = os.path.join(self.cache_dir, f"{scenario}_{zlib.crc32(text.encode()):08x}.wav") # 문구가 바뀌면 새로 렌더링
+        if not os.path.exists(path):
+            try:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            except Exception: pass
+        return path if os.path.exists(path) and os.path.getsize(path) > 0 else None
+
+    def play(self, scenario):
+        clip = self.clips.get(scenario)
+        if clip and play_wav(clip): return
+        self.engine.say(AUDIO_MESSAGES[scenario]) # 캐시 재생이 안 되는 환경이면 직접 읽기
+        self.engine.runAndWait()
+
+def create_audio_output(backend):
+    if backend == "tts" and AUDIO_AVAILABLE: return TTSAudioOutput(AUDIO_CACHE_DIR)
+    if backend == "file": return FileAudioOutput(AUDIO_LOG)
+    return NullAudioOutput()
+
+class AudioWorker:
+    # 안내 방송 전담 스레드 1개: 요청은 작은 큐로 받고, 같은 안내가 쿨다운 안에 또 오면 합침
+    def __init__(self, backend, cooldown=3.0, maxsize=8):
+        self.backend = backend
+        self.cooldown = cooldown
+        self.queue = queue.Queue(maxsize)
+        self.last_requested = {}
+        self.output = None
+        self.coalesced = 0
+        self.dropped = 0
+
+    def announce(self, scenario):
+        # AI 스레드에서 호출: 절대 블로킹하지 않음
+        now = time.time()
+        if now - self.last_requested.get(scenario, 0) < self.cooldown:
+            self.coalesced += 1; return False
+        self.last_requested[scenario] = now
+        try: self.queue.put_nowait(scenario)
+        except queue.Full:
+            self.dropped += 1; return False
+        return True
+
+    def run(self):
+        # 엔진 생성/재생은 모두 이 스레드에서 (pyttsx3 드라이버는 만든 스레드에서만 써야 함)
+        try: self.output = create_audio_output(self.backend)
+        except Exception as e:
+            print(f"⚠️ 오디오 초기화 실패 ({e}). 소리 출력 불가.")
+            self.output = NullAudioOutput()
+        while not stop_event.is_set():
+            try: scenario = self.queue.get(timeout=0.5)
+            except queue.Empty: continue
+            try: self.output.play(scenario)
+            except Exception: pass
+
+audio = AudioWorker(AUDIO_BACKEND)
+
+# === [3] MJPEG 브로드캐스트 허브 ===
+class Notifier:
+    # 스레드에서 asyncio 구독자들을 깨우는 용도 (구독자마다 자기 이벤트 루프의 Event 하나씩)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def subscribe(self):
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock: self._waiters.add(entry)
+        return entry
+
+    def unsubscribe(self, entry):
+        with self._lock: self._waiters.discard(entry)
+
+    def notify(self):
+        with self._lock: waiters = list(self._waiters)
+        for loop, event in waiters:
+            try: loop.call_soon_threadsafe(event.set)
+            except RuntimeError: pass # 이미 닫힌 루프
+
+    def __len__(self):
+        return len(self._waiters)
+
+status_notifier = Notifier() # /status_stream 구독자
+
+# /video_feed?width=&quality=&fps= 로 시청자별 프로필 지정 (모바일은 작게/낮은 화질/낮은 fps)
+# 같은 프로필을 요청한 시청자들은 프레임당 한 번 인코딩한 바이트를 공유
+STREAM_DEFAULT_QUALITY = 95 # cv2 기본값 (프로필 미지정 시 기존 화질 그대로)
+MAX_STREAM_PROFILES = 8 # 카메라당 동시에 인코딩하는 프로필 수 상한 (CPU 보호)
+# 요청 값은 가장 가까운 허용값으로 맞춤 (0 은 원본/제한 없음 그대로) -> 폭을 1px 씩 바꿔 요청해도 프로필이 늘지 않음
+STREAM_WIDTHS = (320, 640, 960, 1280, 1920) # 대시보드는 320 단위
+STREAM_QUALITIES = (50, 60, 80, STREAM_DEFAULT_QUALITY)
+STREAM_FPS = (5, 8, 10, 15, 30)
+MJPEG_HEADER = b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n'
+
+def snap(value, choices):
+    return min(choices, key=lambda c: abs(c - value)) if value else 0
+
+class StreamProfile:
+    def __init__(self, width=0, quality=STREAM_DEFAULT_QUALITY, fps=0):
+        self.width = width # 최대 폭 (0: 원본)
+        self.quality = quality
+        self.fps = fps # 최대 fps (0: 제한 없음)
+        self.name = f"w{width or 'src'}-q{quality}-f{fps or 'max'}"
+        self.notifier = Notifier()
+        self.latest = (0, None) # (버전, multipart 청크)
+        self.encoded_seq = 0
+        self.next_due = 0.0
+        self.encoded_frames = 0
+        self.sent_frames = 0
+        self.skipped_frames = 0 # 느린 시청자가 못 받고 건너뛴 프레임 수
+
+    def due(self, seq, now):
+        if seq == self.encoded_seq: return False
+        if not self.fps: return True
+        period = 1.0 / self.fps
+        if now < self.next_due - 0.1 * period: return False # 원본 프레임 간격 지터 허용
+        self.next_due = max(self.next_due + period, now - period)
+        return True
+
+    def encode(self, frame, seq):
+        h, w = frame.shape[:2]
+        if self.width and self.width < w:
+            frame = cv2.resize(frame, (self.width, h * self.width // w), interpolation=cv2.INTER_AREA)
+        flag, encodedImage = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        self.encoded_seq = seq
+        if not flag: return None
+        chunk = MJPEG_HEADER + encodedImage.tobytes() + b'\r\n'
+        self.encoded_frames += 1
+        self.latest = (self.latest[0] + 1, chunk)
+        self.notifier.notify()
+        return chunk
+
+class StreamHub:
+    # 카메라당 1개: 새 프레임을 인코더 스레드에서 프로필별로 딱 한 번 JPEG 인코딩하고, 같은 프로필 시청자끼리 바이트를 공유
+    def __init__(self, name):
+        self.name = name
+        self._cond = threading.Condition()
+        self._raw = None # AI 루프가 넘긴 최신 프레임 (참조만 보관)
+        self._raw_seq = 0
+        self._encoded_seq = 0
+        self.profiles = {} # (width, quality, fps) -> StreamProfile (시청자가 있는 것만)
+        self.default = StreamProfile()
+        self.force = False # 시청자가 없어도 기본 프로필 인코딩 (리플레이 벤치마크용)
+        self.recorder = None # 사전 녹화 버퍼 (있으면 시청자와 무관하게 녹화 프로필 인코딩)
+        self.pool = None # 프레임 버퍼 풀 (송출 중인 프레임 참조 카운트)
+        self.encoded_frames = 0
+        self.encoded_bytes = 0
+        self.sent_frames = 0 # 시청자 전체에 보낸 프레임 수 합계
+        self.skipped_frames = 0
+
+    @property
+    def viewers(self):
+        return sum(len(p.notifier) for p in list(self.profiles.values()))
+
+    def publish(self, frame):
+        # AI 스레드에서 호출: 복사/인코딩 없이 참조만 교체
+        if self.pool: self.pool.retain(frame)
+        with self._cond:
+            previous = self._raw
+            self._raw = frame
+            self._raw_seq += 1
+            self._cond.notify()
+        if self.pool and previous is not None: self.pool.release(previous)
+
+    def _active(self):
+        active = [p for p in self.profiles.values() if len(p.notifier)]
+        if self.force and self.default not in active: active.append(self.default)
+        if self.recorder is not None: active.append(self.recorder.profile)
+        return active
+
+    def _pending(self):
+        return (self.force or self.recorder is not None or len(self.profiles) > 0) and self._raw is not None and self._raw_seq != self._encoded_seq
+
+    def encode_loop(self):
+        while not stop_event.is_set():
+            with self._cond:
+                if not self._cond.wait_for(self._pending, 0.5): continue # 시청자가 없으면 인코딩 안 함
+                frame, seq = self._raw, self._raw_seq
+                self._encoded_seq = seq
+                active = self._active()
+                if self.pool: self.pool.retain(frame) # 인코딩하는 동안 버퍼 재사용 방지
+            now = time.time()
+            for profile in active:
+                if not profile.due(seq, now): continue # fps 제한: 이 프레임은 이 프로필에선 건너뜀
+                t = time.perf_counter()
+                chunk = profile.encode(frame, seq)
+                perf.record("encode", time.perf_counter() - t)
+                if chunk is None: continue
+                self.encoded_frames += 1
+                self.encoded_bytes += len(chunk)
+                if self.recorder is not None and profile is self.recorder.profile:
+                    self.recorder.add(now, chunk[len(MJPEG_HEADER):-2])
+            if self.pool: self.pool.release(frame)
+
+    def admit(self, width=0, quality=STREAM_DEFAULT_QUALITY, fps=0):
+        # 요청 시점 검사만 (등록은 stream() 안에서): 허용값으로 맞춘 프로필 키, 새 프로필 자리가 없으면 None
+        key = (snap(width, STREAM_WIDTHS), snap(quality, STREAM_QUALITIES), snap(fps, STREAM_FPS))
+        with self._cond:
+            if key not in self.profiles and len(self.profiles) >= MAX_STREAM_PROFILES: return None
+        return key
+
+    def _register(self, key):
+        # self._cond 안에서 호출
+        profile = self.profiles.get(key)
+        if profile is None:
+            if len(self.profiles) >= MAX_STREAM_PROFILES: return None
+            profile = self.profiles[key] = self.default if key == (0, STREAM_DEFAULT_QUALITY, 0) else StreamProfile(*key)
+        return profile
+
+    async def stream(self, key=(0, STREAM_DEFAULT_QUALITY, 0)):
+        # 프로필 등록/해제는 제너레이터 안에서만: 응답이 시작되지 않거나 시청자가 끊으면 finally 에서 반드시 해제
+        profile = entry = None
+        try:
+            with self._cond:
+                profile = self._register(key)
+                if profile is None: return # admit 이후 다른 시청자들이 자리를 다 채움
+                entry = profile.notifier.subscribe()
+                if profile.latest[1] is None: self._encoded_seq = 0 # 새 시청자: 마지막 프레임부터 바로 인코딩
+                self._cond.notify()
+            _, event = entry
+            seen = 0
+            while not stop_event.is_set():
+                version, chunk = profile.latest
+                if version == seen or chunk is None:
+                    event.clear()
+                    if profile.latest[0] == version:
+                        try: await asyncio.wait_for(event.wait(), 1.0)
+                        except asyncio.TimeoutError: pass
+                    continue
+                # 최신 프레임만 보냄: 전송이 밀린 시청자는 그 사이 프레임을 버퍼에 쌓지 않고 건너뜀
+                if seen: profile.skipped_frames += version - seen - 1; self.skipped_frames += version - seen - 1
+                seen = version
+                profile.sent_frames += 1
+                self.sent_frames += 1
+                yield chunk
+        finally:
+            if entry is not None: self._release(key, profile, entry)
+
+    def _release(self, key, profile, entry):
+        profile.notifier.unsubscribe(entry)
+        with self._cond: # 프로필의 마지막 시청자가 나가면 프로필과 오래된 청크를 버림
+            if not len(profile.notifier) and self.profiles.get(key) is profile:
+                del self.profiles[key]
+                profile.latest = (profile.latest[0], None)
+                profile.encoded_seq = 0
+
+# === [3-1] 사전 녹화 버퍼 & 위반 클립 저장 ===
+# 카메라마다 최근 CLIP_PRE_SECONDS 초의 JPEG 를 링 버퍼에 보관 (인코더 스레드가 녹화 프로필로 인코딩)
+# 위반이 나면 앞 N 초 + 뒤 M 초를 클립으로 묶어 writer 스레드가 파일로 저장하고 이벤트 id 에 연결 (AI 루프는 안 막힘)
+# 같은 카메라에서 녹화 중에 또 이벤트가 나면 새 클립을 만들지 않고 기존 클립을 연장 (최대 CLIP_MAX_SECONDS)
+CLIP_DIR = os.environ.get("CLIP_DIR", "clips")
+CLIP_FPS = int(os.environ.get("CLIP_FPS", "10")) # 0 이면 녹화 끔
+CLIP_WIDTH = int(os.environ.get("CLIP_WIDTH", "960"))
+CLIP_QUALITY = 70
+CLIP_PRE_SECONDS = float(os.environ.get("CLIP_PRE_SECONDS", "5"))
+CLIP_POST_SECONDS = float(os.environ.get("CLIP_POST_SECONDS", "5"))
+CLIP_MAX_SECONDS = 60
+CLIP_BUFFER_BYTES = int(os.environ.get("CLIP_BUFFER_BYTES", 16 * 1024 * 1024)) # 카메라별 사전 버퍼 상한
+CLIP_PENDING_BYTES = int(os.environ.get("CLIP_PENDING_BYTES", 128 * 1024 * 1024)) # 녹화 중 + 저장 대기 클립 전체 상한
+CLIP_FOURCC = "mp4v"
+CLIP_EXPIRE_SECONDS = 2.0 # 끝 시각이 이만큼 지나도 새 프레임이 없으면 clip writer 가 있는 프레임으로 마감
+
+class Clip:
+    def __init__(self, cam_id, event_id, frames, start, end):
+        self.cam_id = cam_id
+        self.ids = [event_id] # 이 클립에 포함된 이벤트들
+        self.frames = frames # [(ts, jpeg bytes)] - 링 버퍼와 같은 bytes 객체를 공유 (복사 X)
+        self.bytes = sum(len(jpeg) for _, jpeg in frames)
+        self.start = start
+        self.end = end
+
+class PreEventRecorder:
+    def __init__(self, cam_id):
+        self.cam_id = cam_id
+        self.profile = StreamProfile(CLIP_WIDTH, CLIP_QUALITY, CLIP_FPS)
+        self.ring = collections.deque() # (ts, jpeg)
+        self.ring_bytes = 0
+        self.clip = None # 녹화 중인 클립
+        self._lock = threading.Lock()
+
+    def add(self, ts, jpeg):
+        # 인코더 스레드에서 호출
+        with self._lock:
+            self.ring.append((ts, jpeg))
+            self.ring_bytes += len(jpeg)
+            while self.ring and (self.ring_bytes > CLIP_BUFFER_BYTES or self.ring[0][0] < ts - CLIP_PRE_SECONDS):
+                self.ring_bytes -= len(self.ring.popleft()[1])
+            clip = self.clip
+            if clip is None: return
+            if clip_writer.reserve(len(jpeg)):
+                clip.frames.append((ts, jpeg)); clip.bytes += len(jpeg)
+            else:
+                clip.end = ts # 전체 메모리 상한: 이 클립은 여기서 마감
+            if ts >= clip.end:
+                self.clip = None
+                clip_writer.submit(clip)
+
+    def trigger(self, event_id, ts):
+        # AI 스레드에서 호출: 프레임은 참조만 모으고 바로 리턴
+        with self._lock:
+            clip = self.clip
+            if clip is not None:
+                clip.ids.append(event_id)
+                clip.end = min(max(clip.end, ts + CLIP_POST_SECONDS), clip.start + CLIP_MAX_SECONDS)
+                clip_writer.pending_ids.add(event_id)
+                return
+            clip = Clip(self.cam_id, event_id, [f for f in self.ring if f[0] >= ts - CLIP_PRE_SECONDS], ts - CLIP_PRE_SECONDS, ts + CLIP_POST_SECONDS)
+            if not clip_writer.reserve(clip.bytes):
+                clip_writer.dropped += 1
+                print(f"⚠️ [{self.cam_id}] 클립 메모리 상한 초과로 이벤트 {event_id} 녹화 생략")
+                return
+            clip_writer.pending_ids.add(event_id)
+            self.clip = clip
+
+    def finish(self, now=None):
+        # 녹화 중인 클립을 지금까지 모인 프레임으로 마감. now 를 주면 끝 시각 + CLIP_EXPIRE_SECONDS 가 지난 클립만
+        # (카메라가 멈추거나 루프가 밀려서 add() 가 더 안 불려도 이벤트가 '저장 중' 으로 남지 않게)
+        with self._lock:
+            clip = self.clip
+            if clip is None or (now is not None and now < clip.end + CLIP_EXPIRE_SECONDS): return
+            self.clip = None
+        clip_writer.submit(clip)
+
+class ClipWriter:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.pending_bytes = 0
+        self.pending_ids = set() # 녹화 중이거나 저장 대기 중인 이벤트 id
+        self.written = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, n):
+        with self._lock:
+            if self.pending_bytes + n > CLIP_PENDING_BYTES: return False
+            self.pending_bytes += n
+            return True
+
+    def submit(self, clip):
+        self.queue.put(clip)
+
+    def run(self):
+        while not (stop_event.is_set() and self.queue.empty()):
+            try: clip = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                for cam in list(cameras.values()): # 새 프레임이 끊긴 카메라의 녹화 중 클립 마감
+                    if cam.recorder is not None: cam.recorder.finish(time.time())
+                continue
+            try:
+                path = self.write(clip)
+                if path:
+                    store.set_clip(clip.ids, path)
+                    self.written += 1
+                    print(f"🎬 [{clip.cam_id}] 클립 저장: {path} (이벤트 {clip.ids}, {len(clip.frames)}프레임)")
+            except Exception as e:
+                print(f"⚠️ [{clip.cam_id}] 클립 저장 실패: {e}")
+            finally:
+                with self._lock: self.pending_bytes -= clip.bytes
+                self.pending_ids.difference_update(clip.ids)
+                mark_changed() # 대시보드의 '저장 중' 버튼 갱신 (저장 실패 포함)
+
+    def write(self, clip):
+        if not clip.frames: return None
+        first = cv2.imdecode(np.frombuffer(clip.frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        h, w = first.shape[:2]
+        span = clip.frames[-1][0] - clip.frames[0][0]
+        fps = (len(clip.frames) - 1) / span if span > 0 else CLIP_FPS # 실제로 버퍼에 쌓인 간격 기준
+        os.makedirs(CLIP_DIR, exist_ok=True)
+        path = os.path.join(CLIP_DIR, f"{clip.ids[0]}_{clip.cam_id}.mp4")
+        tmp = path[:-4] + ".tmp.mp4"
+        writer = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*CLIP_FOURCC), fps, (w, h))
+        try:
+            for _, jpeg in clip.frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame is not None and frame.shape[:2] == (h, w): writer.write(frame)
+        finally:
+            writer.release()
+        os.replace(tmp, path)
+        return path
+
+clip_writer = ClipWriter()
+
+# === [4] 카메라 레지스트리 & 캡처 워커 ===
+# CAMERA_SOURCES 환경변수로 "위치=소스" 목록을 ';' 로 구분해 지정 (소스: 웹캠 번호, RTSP/파일 URL)
+#   예) CAMERA_SOURCES="공학관=0;정문=rtsp://192.168.0.10/stream1;도서관=videos/library.mp4"
+#       CAMERA_SOURCES="공학관=synthetic://1920x1080@30" (합성 영상, 부하 테스트용)
+DEFAULT_CAMERA_SOURCES = "공학관=0"
+
+# 합성 카메라: "synthetic://1280x720@30" -> 카메라 없이 움직이는 도형 영상 생성 (부하 테스트/CI)
+SYNTHETIC_PREFIX = "synthetic://"
+
+# 프레임 버퍼 풀: 카메라별로 같은 크기 배열을 미리 만들어 두고 돌려씀 (매 프레임 새 1080p 배열 할당 X)
+# 캡처는 풀 버퍼에 바로 디코딩하고 좌우 반전도 제자리에서. 버퍼는 참조 카운트로 관리:
+#   캡처(1) -> LatestFrame 에서 덮어써지면 release / AI 루프가 가져가서 송출 허브에 넘기면 허브가 retain 후 AI 쪽 release
+#   허브는 다음 프레임으로 교체될 때 release, 인코더는 인코딩하는 동안만 retain -> 0 이 되면 풀로 복귀
+# INFERENCE_WORKERS 사용 시 풀을 공유 메모리 위에 만들어, 추론 워커가 캡처 버퍼를 복사 없이 그대로 읽음
+FRAME_POOL_SIZE = int(os.environ.get("FRAME_POOL_SIZE", "6")) # 카메라당 버퍼 수 (0 이면 풀 사용 안 함)
+
+def buffer_key(frame):
+    return frame.__array_interface__["data"][0]
+
+class FramePool:
+    def __init__(self, size=None):
+        self.size = FRAME_POOL_SIZE if size is None else size
+        self.shared = False # True 면 공유 메모리(FrameRing)에 할당
+        self.shape = None
+        self.free = []
+        self.refs = {} # 버퍼 주소 -> 참조 수 (풀 소속 버퍼만)
+        self.shm_slots = {} # 버퍼 주소 -> (공유 메모리 이름, 오프셋)
+        self.rings = [] # 해상도가 바뀌어도 이전 버퍼를 누가 쓰고 있을 수 있으므로 닫지 않고 보관
+        self.allocated_bytes = 0 # 새로 할당한 프레임 버퍼 (풀 생성 + 풀 고갈/미사용 시 매 프레임)
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def _configure(self, shape):
+        nbytes = int(np.prod(shape))
+        if self.shared:
+            ring = FrameRing(self.size, nbytes)
+            self.rings.append(ring)
+            arrays = [ring.view(i, shape) for i in range(self.size)]
+            self.shm_slots = {buffer_key(a): (ring.shm.name, i * nbytes) for i, a in enumerate(arrays)}
+        else:
+            arrays = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+        self.shape = shape
+        self.free = arrays
+        self.refs = {buffer_key(a): 0 for a in arrays}
+        self.allocated_bytes += nbytes * self.size
+
+    def acquire(self):
+        # 캡처 스레드: 빈 버퍼(참조 1) 또는 None (풀 미사용 / 첫 프레임 전 / 모두 사용 중이면 새로 할당하게)
+        with self._lock:
+            if not self.free: return None
+            frame = self.free.pop()
+            self.refs[buffer_key(frame)] = 1
+            self.reused += 1
+            return frame
+
+    def after_read(self, frame, buf):
+        # 디코더가 buf 에 바로 썼는지 확인. 아니면 새 할당으로 집계하고 해상도에 맞춰 풀 생성
+        if buf is not None and buffer_key(frame) == buffer_key(buf): return frame
+        if buf is not None: self.release(buf)
+        with self._lock:
+            self.allocated_bytes += frame.nbytes
+            if self.size and frame.shape != self.shape: self._configure(frame.shape)
+        return frame
+
+    def retain(self, frame):
+        with self._lock:
+            key = buffer_key(frame)
+            if key in self.refs: self.refs[key] += 1
+
+    def release(self, frame):
+        with self._lock:
+            key = buffer_key(frame)
+            if key not in self.refs: return # 풀 밖 버퍼 (첫 프레임, 이미지 폴더 등) 는 GC 에 맡김
+            self.refs[key] -= 1
+            if self.refs[key] == 0 and frame.shape == self.shape: self.free.append(frame)
+
+    def shm_slot(self, frame):
+        return self.shm_slots.get(buffer_key(frame))
+
+    def close(self):
+        for ring in self.rings:
+            try: ring.close(unlink=True)
+            except BufferError: ring.shm.unlink() # 허브가 마지막 프레임을 아직 참조 중 -> 이름만 지우고 메모리는 GC 때 해제
+        self.rings = []
+
+class LatestFrame:
+    # 캡처 -> 추론 사이 단일 슬롯 버퍼: 추론이 밀리면 안 가져간 프레임은 버리고 최신 것만 유지
+    def __init__(self, on_drop=None):
+        self._cond = threading.Condition()
+        self.on_drop = on_drop # 덮어써진 프레임 반환 (버퍼 풀)
+        self.frame = None
+        self.ts = 0 # 캡처 시각
+        self.frame_ts = 0 # 영상 기준 시각 (녹화 소스는 원본 FPS 로 계산, 재생 속도와 무관)
+        self.captured = 0
+        self.dropped = 0
+        self.processed = 0
+
+    def put(self, frame, block=False, frame_ts=None):
+        # block=True: 녹화 영상 최대 속도 재생용. 버리지 않고 추론이 가져갈 때까지 대기
+        with self._cond:
+            while block and self.frame is not None and not stop_event.is_set(): self._cond.wait(0.1)
+            if self.frame is not None: # 추론에 못 쓰이고 덮어써진 프레임
+                self.dropped += 1
+                if self.on_drop: self.on_drop(self.frame)
+            self.frame = frame
+            self.ts = time.time()
+            self.frame_ts = self.ts if frame_ts is None else frame_ts
+            self.captured += 1
+        frame_ready.set()
+
+    def take(self):
+        with self._cond:
+            frame, ts, frame_ts = self.frame, self.ts, self.frame_ts
+            self.frame = None
+            if frame is not None: self.processed += 1
+            self._cond.notify_all()
+        return frame, ts, frame_ts
+
+# 움직임 게이트: 저해상도 프레임 차분으로 정적인 장면(빈 복도 등)은 포즈 추론을 건너뛰고 직전 결과 재사용
+MOTION_THRESHOLD = float(os.environ.get("MOTION_THRESHOLD", "0.003")) # 바뀐 픽셀 비율이 이 이상이면 추론 (0 이면 매 프레임 추론)
+MOTION_KEEPALIVE = float(os.environ.get("MOTION_KEEPALIVE", "2.0")) # 움직임이 없어도 이 간격(초)마다 한 번은 추론
+MOTION_WIDTH = 160 # 차분 계산용 축소 폭
+MOTION_PIXEL_DIFF = 25 # 밝기 차이가 이 이상인 픽셀만 '변화'로 집계 (센서 노이즈 무시)
+
+class MotionGate:
+    def __init__(self, threshold=MOTION_THRESHOLD, keepalive=MOTION_KEEPALIVE):
+        self.threshold = threshold
+        self.keepalive = keepalive
+        self.prev = None # 마지막으로 추론한 프레임 (축소 + 흑백 + 블러)
+        self.last_run = 0.0
+        self.motion = 0.0 # 마지막 추론 프레임 대비 바뀐 픽셀 비율
+        self.checked = 0
+        self.skipped = 0
+
+    def should_run(self, frame, now=None):
+        now = time.time() if now is None else now
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (MOTION_WIDTH, max(1, h * MOTION_WIDTH // w)), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.prev is None or self.prev.shape != small.shape:
+            self.motion = 1.0
+        else:
+            _, changed = cv2.threshold(cv2.absdiff(small, self.prev), MOTION_PIXEL_DIFF, 255, cv2.THRESH_BINARY)
+            self.motion = cv2.countNonZero(changed) / changed.size
+        self.checked += 1
+        if self.motion >= self.threshold or now - self.last_run >= self.keepalive:
+            # 기준 프레임은 추론할 때만 바꿈: 천천히 움직여도 변화가 쌓여서 결국 추론 (직전 프레임과만 비교하면 매번 0)
+            self.prev = small
+            self.last_run = now
+            return True
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+# 포즈 트래커: POSE_STRIDE 프레임마다 한 번만 추론하고, 사이 프레임은 사람별 등속 모델로 키포인트를 외삽
+# (추론을 건너뛰어도 행인 블러 박스가 사람을 따라가도록)
+POSE_STRIDE = max(1, int(os.environ.get("POSE_STRIDE", "1"))) # 1 이면 움직임이 있는 모든 프레임 추론
+TRACK_MAX_AGE = max(int(os.environ.get("TRACK_MAX_AGE", "10")), POSE_STRIDE) # 검출 없이 예측만으로 유지할 최대 프레임 수 (K)
+TRACK_MATCH_DIST = 0.15 # 검출-트랙 매칭 허용 거리 (프레임 대각선 대비)
+TRACK_SMOOTHING = 0.5 # 속도 갱신 시 새 측정값 비중
+
+class PoseTracker:
+    # 트랙은 ID 순(먼저 등장한 사람부터)으로 유지 -> 프레임마다 사람 순서가 바뀌지 않음
+    def __init__(self, max_age=TRACK_MAX_AGE, match_dist=TRACK_MATCH_DIST):
+        self.max_age = max_age
+        self.match_dist = match_dist
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.kps = np.zeros((0, 17, 2), dtype=np.float32) # 현재(예측 포함) 키포인트
+        self.measured = np.zeros((0, 17, 2), dtype=np.float32) # 마지막으로 검출된 키포인트
+        self.velocity = np.zeros((0, 17, 2), dtype=np.float32) # 프레임당 이동량
+        self.age = np.zeros(0, dtype=np.int32) # 마지막 검출 이후 지난 프레임 수
+        self.matched = np.zeros(0, dtype=bool) # 마지막 추론에서 검출과 매칭된 트랙 (False 면 예측만으로 버티는 유령 트랙)
+
+    @staticmethod
+    def _centers(kps):
+        valid = (kps != 0).all(axis=2)
+        n = valid.sum(axis=1)
+        return (kps * valid[..., None]).sum(axis=1) / np.maximum(n, 1)[:, None], n > 0
+
+    def _keep(self, mask):
+        self.ids, self.kps, self.measured, self.velocity, self.age, self.matched = (
+            a[mask] for a in (self.ids, self.kps, self.measured, self.velocity, self.age, self.matched))
+
+    def _step(self, w, h):
+        # 등속 이동 (미검출 키포인트 0 은 그대로), 오래됐거나 화면 밖으로 나간 트랙은 제거
+        self.kps += self.velocity * (self.kps != 0).all(axis=2, keepdims=True)
+        self.age += 1
+        centers, _ = self._centers(self.kps)
+        inside = (centers[:, 0] >= 0) & (centers[:, 0] < w) & (centers[:, 1] >= 0) & (centers[:, 1] < h)
+        self._keep((self.age <= self.max_age) & inside)
+
+    def predict(self, w, h):
+        self._step(w, h)
+        return self.kps
+
+    def update(self, detections, w, h):
+        det = np.asarray(detections, dtype=np.float32).reshape(-1, 17, 2)
+        det_centers, det_valid = self._centers(det)
+        det, det_centers = det[det_valid], det_centers[det_valid]
+        self._step(w, h) # 기존 트랙을 이번 프레임 위치로 옮긴 뒤 매칭
+
+        # 중심점 거리 기준 그리디 매칭 (가까운 쌍부터)
+        track_centers, _ = self._centers(self.kps)
+        cost = np.linalg.norm(track_centers[:, None] - det_centers[None], axis=2)
+        limit = self.match_dist * np.hypot(w, h)
+        matched_t, matched_d = [], []
+        for flat in np.argsort(cost, axis=None):
+            ti, di = np.unravel_index(flat, cost.shape)
+            if cost[ti, di] > limit: break
+            if ti in matched_t or di in matched_d: continue
+            matched_t.append(ti); matched_d.append(di)
+
+        self.matched[:] = False
+        self.matched[matched_t] = True
+        for ti, di in zip(matched_t, matched_d):
+            both = ((det[di] != 0) & (self.measured[ti] != 0)).all(axis=1, keepdims=True)
+            v = (det[di] - self.measured[ti]) / self.age[ti] * both
+            self.velocity[ti] = TRACK_SMOOTHING * v + (1 - TRACK_SMOOTHING) * self.velocity[ti]
+            self.kps[ti] = self.measured[ti] = det[di]
+            self.age[ti] = 0
+
+        new = np.setdiff1d(np.arange(len(det)), matched_d)
+        if len(new):
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+            self.next_id += len(new)
+            self.kps = np.concatenate([self.kps, det[new]])
+            self.measured = np.concatenate([self.measured, det[new]])
+            self.velocity = np.concatenate([self.velocity, np.zeros_like(det[new])])
+            self.age = np.concatenate([self.age, np.zeros(len(new), dtype=np.int32)])
+            self.matched = np.concatenate([self.matched, np.ones(len(new), dtype=bool)])
+        return self.kps
+
+# 객체-사람 연결: OBJECT_MODEL 로 검출한 가방/쓰레기, 킥보드를 프레임 간 추적하면서 사람(포즈 트랙)과 연결
+#   무단 투기) 사람이 들고 있던(손목/골반 가까이) 물건이 그 자리에 남고, 주인이 ABANDON_SECONDS 동안 멀어져 있으면
+#     주인은 물건이 처음 나타날 때 가까이 있던 사람이나 물건과 같이 움직인 사람만 (바닥의 물건 옆을 지나가는 사람은 주인이 아님)
+#   시간은 모두 프레임 시각 기준 (최대 속도 리플레이도 실시간과 같은 판정)
+#   불법 주차) 킥보드가 PM_ZONE 안에서 탑승자 없이 PARK_SECONDS 이상 서 있으면
+OBJECT_MATCH_DIST = 0.08 # 검출-트랙 매칭 허용 거리 (프레임 대각선 대비)
+OBJECT_MAX_AGE = 5 # 검출 없이 유지할 객체 검출 횟수
+OBJECT_STILL_DIST = 0.02 # 이 이상 움직이면 '이동 중' (대각선 대비)
+LINK_DIST = 0.08 # 물건 중심-손목/골반 거리가 이 안이면 그 사람이 들고 있음 (대각선 대비)
+ABANDON_DIST = 0.2 # 주인이 이만큼 떨어져 있어야 두고 간 것으로 봄
+ABANDON_SECONDS = float(os.environ.get("ABANDON_SECONDS", "3"))
+PARK_SECONDS = float(os.environ.get("PARK_SECONDS", "5"))
+PM_ZONE = tuple(float(v) for v in os.environ.get("PM_ZONE", "0.0,0.55,0.4,1.0").split(",")) # 킥보드 주차 금지 구역 (x1, y1, x2, y2, 화면 비율)
+LINK_KEYPOINTS = [9, 10, 11, 12] # 손목, 골반
+
+def zone_rect(zone, w, h):
+    x1, y1, x2, y2 = zone
+    return int(w * x1), int(h * y1), int(w * x2), int(h * y2)
+
+class TrackedObject:
+    __slots__ = ("id", "box", "cls", "age", "anchor", "still_since", "owner", "owner_seen", "rider_seen", "fired")
+
+    def __init__(self, obj_id, box, cls, now):
+        self.id = obj_id
+        self.box = box
+        self.cls = cls
+        self.age = 0
+        self.anchor = self.center # 마지막으로 움직이기 시작한 위치
+        self.still_since = now
+        self.owner = None # 들고 있던 사람 트랙 id
+        self.owner_seen = now # 주인이 가까이 있었던 마지막 시각
+        self.rider_seen = now # 킥보드 근처에 사람이 있었던 마지막 시각
+        self.fired = False # 이 물건으로 이미 위반을 냈는지 (물건당 한 번)
+
+    @property
+    def center(self):
+        return np.array([(self.box[0] + self.box[2]) / 2, (self.box[1] + self.box[3]) / 2], dtype=np.float32)
+
+    @property
+    def litter(self):
+        return self.cls in LITTER_CLASSES
+
+    @property
+    def action(self):
+        return "littering" if self.litter else "kickboard"
+
+class ObjectTracker:
+    def __init__(self):
+        self.objects = []
+        self.next_id = 1
+
+    def _match(self, detections, limit):
+        # 같은 클래스끼리 중심점 거리 그리디 매칭 (PoseTracker 와 같은 방식)
+        if not self.objects or not len(detections): return []
+        centers = np.array([o.center for o in self.objects])
+        det_centers = (detections[:, :2] + detections[:, 2:4]) / 2
+        cost = np.linalg.norm(centers[:, None] - det_centers[None], axis=2)
+        cost[np.array([o.cls for o in self.objects])[:, None] != detections[None, :, 5]] = np.inf
+        pairs, used_t, used_d = [], set(), set()
+        for flat in np.argsort(cost, axis=None):
+            ti, di = np.unravel_index(flat, cost.shape)
+            if cost[ti, di] > limit: break
+            if ti in used_t or di in used_d: continue
+            used_t.add(ti); used_d.add(di); pairs.append((ti, di))
+        return pairs
+
+    def update(self, detections, kps, person_ids, w, h, now=None):
+        # detections: (M, 6), kps/person_ids: 이번 프레임 포즈 트랙, now: 프레임 시각. 반환: 새로 발생한 위반 액션 목록 ("littering"/"kickboard")
+        now = time.time() if now is None else now
+        diag = np.hypot(w, h)
+        matched = self._match(detections, OBJECT_MATCH_DIST * diag)
+        for o in self.objects: o.age += 1
+        for ti, di in matched:
+            o = self.objects[ti]
+            o.box, o.age = detections[di, :4].copy(), 0
+        new = set(range(len(detections))) - {di for _, di in matched}
+        born = set() # 이번 프레임에 처음 나타난 물건 id
+        for di in sorted(new):
+            self.objects.append(TrackedObject(self.next_id, detections[di, :4].copy(), int(detections[di, 5]), now))
+            born.add(self.next_id); self.next_id += 1
+        self.objects = [o for o in self.objects if o.age <= OBJECT_MAX_AGE] # 트랙에서 빠진 물건은 경고도 같이 해제
+        if not self.objects: return []
+
+        # 물건마다 가장 가까운 사람과 거리 (손목/골반 키포인트 중 최소, 미검출 키포인트 제외)
+        centers = np.array([o.center for o in self.objects])
+        anchors = np.asarray(kps, dtype=np.float32).reshape(-1, 17, 2)[:, LINK_KEYPOINTS]
+        dist = np.linalg.norm(centers[:, None, None] - anchors[None], axis=3) # (물건, 사람, 키포인트)
+        dist = np.where((anchors != 0).all(axis=2)[None], dist, np.inf).min(axis=2) / diag # (물건, 사람)
+        zone = zone_rect(PM_ZONE, w, h)
+
+        fired = []
+        for i, o in enumerate(self.objects):
+            moved = np.linalg.norm(o.center - o.anchor) / diag > OBJECT_STILL_DIST
+            if moved: o.anchor, o.still_since = o.center, now
+            nearest = int(np.argmin(dist[i])) if dist.shape[1] else -1
+            near = nearest >= 0 and dist[i, nearest] < LINK_DIST
+            if o.litter:
+                if near and (o.id in born or moved): # 같이 나타났거나 들고 움직인 사람이 주인 (다른 사람이 집어 가면 그 사람으로)
+                    o.owner, o.owner_seen, o.fired = int(person_ids[nearest]), now, False
+                elif o.owner is not None:
+                    owner_dist = dist[i, np.asarray(person_ids) == o.owner]
+                    if (owner_dist < ABANDON_DIST).any(): o.owner_seen = now # 주인이 아직 근처
+                    if (owner_dist < LINK_DIST).any(): o.fired = False # 주인이 다시 집으러 오면 경고 해제, 다시 두고 가면 새 위반
+                if (not o.fired and o.owner is not None and now - o.owner_seen >= ABANDON_SECONDS
+                        and now - o.still_since >= ABANDON_SECONDS):
+                    o.fired = True; fired.append("littering")
+            else:
+                if near: o.rider_seen, o.fired = now, False # 탑승자가 돌아오면 경고 해제
+                bx, by = (o.box[0] + o.box[2]) / 2, o.box[3] # 바닥 중앙이 구역 안이면
+                in_zone = zone[0] <= bx <= zone[2] and zone[1] <= by <= zone[3]
+                if (not o.fired and in_zone and now - o.still_since >= PARK_SECONDS and now - o.rider_seen >= PARK_SECONDS):
+                    o.fired = True; fired.append("kickboard")
+        return fired
+
+    @property
+    def alerts(self):
+        # 위반으로 판정된 뒤 아직 트랙에 남아 있는 물건의 액션 (화면 경고/관제 상태용, 이벤트는 update 의 반환값으로 한 번만)
+        return {o.action for o in self.objects if o.fired}
+
+class Camera:
+    def __init__(self, cam_id, location, source):
+        self.id = cam_id
+        self.location = location
+        self.source = source
+        self.flip = isinstance(source, int) # 웹캠만 좌우 반전 (거울 모드)
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.is_dir = isinstance(source, str) and os.path.isdir(source) # 프레임 이미지 폴더
+        self.is_synthetic = isinstance(source, str) and source.startswith(SYNTHETIC_PREFIX) # 부하 테스트용 합성 영상
+        self.pace = "realtime" # 녹화 소스 재생 속도: realtime(원본 FPS) / max(드롭 없이 최대 속도)
+        self.pool = FramePool()
+        self.buffer = LatestFrame(self.pool.release) # 캡처 워커가 넣어두는 최신 프레임
+        self.latency_ms = 0 # 캡처 ~ 송출까지 걸린 시간 (마지막 프레임 기준)
+        self.hub = StreamHub(cam_id) # /video_feed/{camera} 송출
+        self.hub.pool = self.pool
+        self.recorder = PreEventRecorder(cam_id) if CLIP_FPS > 0 else None
+        self.hub.recorder = self.recorder
+        self.gate = MotionGate()
+        self.tracker = PoseTracker()
+        self.kps = np.zeros((0, 17, 2), dtype=np.float32) # 이번 프레임 키포인트 (검출 또는 트래커 예측)
+        self.since_pose = POSE_STRIDE # 마지막 추론 이후 프레임 수 (첫 프레임은 바로 추론)
+        self.predicted = 0 # 추론 대신 트래커 예측으로 처리한 프레임 수
+        self.objects = ObjectTracker() # OBJECT_MODEL 사용 시 가방/킥보드 추적 + 사람 연결
+        self.frame_ts = 0 # 이번 프레임의 영상 기준 시각 (객체 방치/주차 시간 판정용)
+        self.detected = [] # 이번 프레임에 새로 판정된 자동 위반 액션 (sync_camera_state 에서 이벤트로 한 번 기록 후 비움)
+        # 카메라별 상태 플래그 & 오디오 쿨다운
+        self.state_littering = False
+        self.state_kickboard = False
+        self.state_flyer = False
+        self.last_audio_time = 0
+        self.monitor = {"location": location, "status": "정상", "action": "모니터링 중...", "time": "-", "conf": 0, "type": None}
+
+    def set_trigger(self, littering=False, kickboard=False, flyer=False):
+        self.state_littering = littering; self.state_kickboard = kickboard; self.state_flyer = flyer
+
+    @property
+    def recorded(self):
+        return self.is_file or self.is_dir
+
+    @property
+    def manual_event(self):
+        return self.state_littering or self.state_kickboard or self.state_flyer
+
+def parse_camera_sources(spec):
+    registry = {}
+    for entry in [e.strip() for e in spec.split(";") if e.strip()]:
+        loc, sep, src = entry.partition("=")
+        if not sep or not loc.strip() or not src.strip():
+            raise ValueError(f"잘못된 카메라 설정: '{entry}' (형식: 위치=소스)")
+        src = src.strip()
+        cam_id = f"cam{len(registry)}"
+        registry[cam_id] = Camera(cam_id, loc.strip(), int(src) if src.isdigit() else src)
+    if not registry:
+        raise ValueError("CAMERA_SOURCES 에 카메라가 하나도 없습니다.")
+    return registry
+
+cameras = parse_camera_sources(os.environ.get("CAMERA_SOURCES", DEFAULT_CAMERA_SOURCES))
+primary_cam = next(iter(cameras.values())) # 키보드 트리거 & /video_feed 기본 카메라
+
+REPLAY_FPS = float(os.environ.get("REPLAY_FPS", 30)) # 프레임 폴더를 realtime 으로 재생할 때 FPS
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def parse_synthetic(source):
+    # "synthetic://WxH@fps" -> (w, h, fps). 생략한 값은 1280x720@30
+    size, _, fps = source[len(SYNTHETIC_PREFIX):].partition("@")
+    w, _, h = size.partition("x")
+    return int(w or 1280), int(h or 720), float(fps or 30)
+
+def synthetic_frames(cam, pool=None):
+    # 고정 배경 + 가로로 지나가는 사람 크기 도형 3개 (움직임 게이트/인코딩이 실제와 비슷하게 동작하도록)
+    w, h, _ = parse_synthetic(cam.source)
+    rng = np.random.default_rng(zlib.crc32(cam.id.encode()))
+    background = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), (0, 0), 5)
+    colors = [tuple(int(c) for c in rng.integers(0, 256, 3)) for _ in range(3)]
+    i = 0
+    while not stop_event.is_set():
+        buf = pool.acquire() if pool else None
+        frame = buf if buf is not None else np.empty((h, w, 3), dtype=np.uint8)
+        np.copyto(frame, background)
+        for k, color in enumerate(colors):
+            x = int((i * 4 + k * w / 3) % w)
+            cv2.rectangle(frame, (x, h // 3), (x + w // 12, h // 3 + h // 2), color, -1)
+        cv2.putText(frame, f"SYNTHETIC {cam.id} #{i}", (20, h - 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        yield pool.after_read(frame, buf) if pool else frame
+        i += 1
+
+def open_capture(cam):
+    cap = cv2.VideoCapture(cam.source)
+    if not cam.recorded: cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # 드라이버 내부 버퍼도 최소화 (지연 누적 방지)
+    return cap
+
+def read_frames(cam, pool=None):
+    # 소스 종류별 프레임 제너레이터 (폴더: 이미지 파일 이름순 / 파일: 끝까지 / 라이브: 끊기면 재연결)
+    # pool 이 있으면 풀 버퍼에 바로 디코딩
+    if cam.is_synthetic:
+        yield from synthetic_frames(cam, pool)
+        return
+    if cam.is_dir:
+        for name in sorted(os.listdir(cam.source)):
+            if name.lower().endswith(IMAGE_EXTS):
+                frame = cv2.imread(os.path.join(cam.source, name))
+                if frame is not None: yield pool.after_read(frame, None) if pool else frame
+        return
+
+    cap = open_capture(cam)
     try:
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 150)
-        
-        if scenario == "SMOKING":
-            engine.say("흡연 감지. 담배를 꺼주세요.")
-        elif scenario == "LITTERING": 
-            engine.say("무단 투기 감지. 쓰레기를 수거하세요.")
-        elif scenario == "PM_VIOLATION":
-            engine.say("킥보드 불법 주차 및 탑승 위반입니다.")
-        elif scenario == "FLYER": 
-            engine.say("경고. 이곳은 광고물 부착 금지 구역입니다.")
-        elif scenario == "UNDO": 
-            engine.say("상황 해제. 정상 모니터링 중입니다.")
-            
-        engine.runAndWait()
-    except Exception: pass
+        while not stop_event.is_set():
+            if not cap.isOpened():
+                if cam.is_file: return
+                print(f"⚠️ [{cam.id}] 카메라 연결 실패 ({cam.source}). 재연결 시도...")
+                time.sleep(2.0)
+                cap = open_capture(cam)
+                continue
 
-def play_audio_thread(scenario):
-    threading.Thread(target=play_sound_effect, args=(scenario,), daemon=True).start()
+            buf = pool.acquire() if pool else None
+            ret, frame = cap.read(buf)
+            if not ret:
+                if buf is not None: pool.release(buf)
+                if cam.is_file: return # 영상 끝
+                cap.release() # 스트림 끊김 -> 재연결
+                continue
+            yield pool.after_read(frame, buf) if pool else frame
+    finally:
+        cap.release()
 
-# === [3] AI 엔진 (키보드 제어 + 고정확도 표시 + 빨간 테두리) ===
-def run_ai_loop():
-    global output_frame, current_monitor_state, locations_status, fake_logs, insights_data, log_id_counter
-    print("🚀 AI 시스템 가동 (L:투기, K:킥보드, J:전단지, U:초기화)")
-    
-    model_pose = YOLO('yolov8n-pose.pt') 
-    
-    cap = cv2.VideoCapture(0) 
-    if not cap.isOpened(): cap = cv2.VideoCapture(0)
-    
-    last_audio_time = 0
-    audio_cooldown = 3.0 
-    
-    # 상태 플래그
-    state_littering = False
-    state_kickboard = False
-    state_flyer = False
-
-    while cap.isOpened() and not stop_event.is_set():
-        ret, frame = cap.read()
-        if not ret: break
-        frame = cv2.flip(frame, 1)
-        h, w, _ = frame.shape
+def capture_worker(cam):
+    frame_interval = source_interval = 0
+    if cam.recorded: # 녹화 소스는 원본 FPS 로 재생 (최대 속도로 읽으면 전부 버려짐), 프레임 시각도 원본 FPS 기준
+        fps = cv2.VideoCapture(cam.source).get(cv2.CAP_PROP_FPS) if cam.is_file else REPLAY_FPS
+        source_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        if cam.pace == "realtime": frame_interval = source_interval
+    if cam.is_synthetic: frame_interval = 1.0 / parse_synthetic(cam.source)[2] # 실제 카메라처럼 지정 FPS 로 생성
+    block = cam.recorded and cam.pace == "max"
+    next_t = start = time.time()
+    n = 0 # 읽은 프레임 수
+
+    frames = read_frames(cam, cam.pool)
+    while not stop_event.is_set():
+        t = time.perf_counter()
+        frame = next(frames, None)
+        if frame is None: break
+        perf.record("decode", time.perf_counter() - t)
+        if cam.flip: cv2.flip(frame, 1, dst=frame) # 제자리 반전 (새 배열 X)
+        # 녹화 소스는 최대 속도로 읽어도 영상 속 시간으로 (ABANDON_SECONDS/PARK_SECONDS 가 실시간 재생과 같게)
+        cam.buffer.put(frame, block=block, frame_ts=start + n * source_interval if source_interval else None)
+        n += 1
+
+        if frame_interval:
+            next_t += frame_interval
+            time.sleep(max(0, next_t - time.time()))
+
+    frames.close()
+    print(f"📷 [{cam.id}] 캡처 종료 ({cam.location})")
+
+# === [5] AI 엔진 (키보드 제어 + 고정확도 표시 + 빨간 테두리) ===
+SMOKING_THRESHOLD = 160 # 코-손목 거리(px) 이 값 미만이면 흡연 동작
+GUIDE_LINE_DIST = 300 # 이 거리 안쪽이면 코-손목 가이드 라인 표시
+HEAD_MARGIN = (40, 60, 40, 30) # 머리 박스 여백 (좌, 상, 우, 하)
+
+def analyze_keypoints(kps_batch, w, h, threshold=SMOKING_THRESHOLD, live=None):
+    # (N, 17, 2) 키포인트 배열 전체를 NumPy 로 한 번에 처리 (사람 수만큼 파이썬 루프 X)
+    # 좌표가 0 인 키포인트는 미검출로 보고 제외. live: 이번 추론에서 실제로 검출된 사람 (유령 트랙은 흡연 판정 X, 머리 박스는 블러용으로 유지)
+    kps = np.asarray(kps_batch, dtype=np.float32)
+    n = len(kps)
+    result = {"dist": np.full((n, 2), 999.0, dtype=np.float32), "offender": -1,
+              "boxes": np.zeros((n, 4), dtype=np.int32), "has_box": np.zeros(n, dtype=bool)}
+    if n == 0 or kps.ndim != 3 or kps.shape[1] <= 10: return result
+
+    # 1. 코-손목(왼/오) 거리 -> 흡연 판정, 첫 번째 해당자가 범인
+    nose = kps[:, 0:1]
+    wrists = kps[:, 9:11]
+    valid = (nose[..., 0] != 0) & (wrists[..., 0] != 0)
+    if live is not None: valid &= np.asarray(live, dtype=bool)[:, None]
+    result["dist"] = np.where(valid, np.linalg.norm(wrists - nose, axis=2), 999.0)
+    smoking = (result["dist"] < threshold).any(axis=1)
+    if smoking.any(): result["offender"] = int(np.argmax(smoking))
+
+    # 2. 머리 박스: 얼굴 키포인트(0~4) 의 min/max + 여백, 화면 밖은 잘라냄
+    head_x, head_y = kps[:, 0:5, 0], kps[:, 0:5, 1]
+    mask_x, mask_y = head_x != 0, head_y != 0
+    has_box = mask_x.any(axis=1) & mask_y.any(axis=1)
+    min_x = np.where(mask_x, head_x, np.inf).min(axis=1)
+    max_x = np.where(mask_x, head_x, -np.inf).max(axis=1)
+    min_y = np.where(mask_y, head_y, np.inf).min(axis=1)
+    max_y = np.where(mask_y, head_y, -np.inf).max(axis=1)
+    edges = np.where(has_box[:, None], np.stack([min_x, min_y, max_x, max_y], axis=1), 0).astype(np.int32)
+    ml, mt, mr, mb = HEAD_MARGIN
+    boxes = result["boxes"]
+    # 키포인트가 화면 밖으로 나가도 (트래커 예측, 프레임 가장자리) 박스는 양쪽 모두 화면 안으로 -> 뒤집힌 박스 없음
+    boxes[:, 0] = np.clip(edges[:, 0] - ml, 0, w)
+    boxes[:, 1] = np.clip(edges[:, 1] - mt, 0, h)
+    boxes[:, 2] = np.clip(edges[:, 2] + mr, 0, w)
+    boxes[:, 3] = np.clip(edges[:, 3] + mb, 0, h)
+    result["has_box"] = has_box
+    return result
+
+# === [프라이버시 블러 엔진] ===
+# BLUR_MODE: gaussian(기존 99x99 가우시안) / downscale(축소-블러-확대) / pixelate(모자이크) / masked(전체 ROI 한 번에 마스크 블러)
+BLUR_MODES = ("gaussian", "downscale", "pixelate", "masked")
+BLUR_MODE = os.environ.get("BLUR_MODE", "downscale")
+if BLUR_MODE not in BLUR_MODES: raise ValueError(f"BLUR_MODE 는 {BLUR_MODES} 중 하나여야 합니다: {BLUR_MODE}")
+BLUR_SCALE = 8 # downscale/masked 축소 배율 (시그마도 같은 비율로 줄여서 기존 블러 세기 유지)
+PIXEL_BLOCK = 16 # pixelate 블록 크기(px)
+
+def _soft_blur(img):
+    # 1/BLUR_SCALE 로 줄여서 블러 후 다시 키움 -> 기존 GaussianBlur((99,99), 30) 과 비슷한 세기를 훨씬 적은 연산으로
+    h, w = img.shape[:2]
+    small = cv2.resize(img, (max(1, w // BLUR_SCALE), max(1, h // BLUR_SCALE)), interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, (0, 0), 30 / BLUR_SCALE)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+def anonymize_regions(frame, boxes, mode=None):
+    # 한 프레임의 행인 머리 영역(x1, y1, x2, y2) 전체를 제자리에서 익명화
+    mode = mode or BLUR_MODE
+    boxes = [b for b in boxes if b[2] > b[0] and b[3] > b[1]]
+    if not boxes: return
+
+    if mode == "masked":
+        # 모든 ROI 를 감싸는 영역을 축소해서 블러는 한 번만 하고, 머리 박스 부분만 잘라 원래 크기로 덮어씀
+        x1 = min(b[0] for b in boxes); y1 = min(b[1] for b in boxes)
+        x2 = max(b[2] for b in boxes); y2 = max(b[3] for b in boxes)
+        s = BLUR_SCALE
+        small = cv2.resize(frame[y1:y2, x1:x2], (max(1, (x2-x1) // s), max(1, (y2-y1) // s)), interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (0, 0), 30 / s)
+        for bx1, by1, bx2, by2 in boxes:
+            sub = small[(by1-y1) // s:-(-(by2-y1) // s), (bx1-x1) // s:-(-(bx2-x1) // s)]
+            if sub.size: frame[by1:by2, bx1:bx2] = cv2.resize(sub, (bx2-bx1, by2-by1), interpolation=cv2.INTER_LINEAR)
+        return
+
+    for x1, y1, x2, y2 in boxes:
+        roi = frame[y1:y2, x1:x2]
+        if mode == "gaussian":
+            roi[:] = cv2.GaussianBlur(roi, (99, 99), 30)
+        elif mode == "pixelate":
+            h, w = roi.shape[:2]
+            small = cv2.resize(roi, (max(1, w // PIXEL_BLOCK), max(1, h // PIXEL_BLOCK)), interpolation=cv2.INTER_AREA)
+            roi[:] = cv2.resize(small, (w, h), interpolation=cv2.INTER_NEAREST)
+        else:
+            roi[:] = _soft_blur(roi)
+
+def process_frame(cam, frame, kps_batch, live=None):
+    # live: 트랙별로 이번 추론에서 검출과 매칭됐는지 (None 이면 모두). 유령 트랙은 그리거나 집계하지 않고 행인 블러만
+    t_start = time.perf_counter()
+    h, w, _ = frame.shape
+    clean_zone = {"x1": int(w*0.65), "y1": int(h*0.2), "x2": int(w*0.95), "y2": int(h*0.7)}
+    live = np.ones(len(kps_batch), dtype=bool) if live is None else np.asarray(live, dtype=bool)
+    analysis = analyze_keypoints(kps_batch, w, h, live=live)
+    t_keypoints = time.perf_counter() - t_start
+    persons_per_frame.observe(int((analysis["has_box"] & live).sum()))
+    offender_idx = analysis["offender"]
+    is_smoking_now = offender_idx >= 0
+
+    # 1. 흡연 감지 (자동) - 가이드 라인은 범인까지만 표시
+    line_upto = offender_idx + 1 if is_smoking_now else len(kps_batch)
+    for i, j in zip(*np.nonzero(analysis["dist"][:line_upto] < GUIDE_LINE_DIST)):
+        nose, wrist = kps_batch[i][0], kps_batch[i][9 + j]
+        cv2.line(frame, (int(nose[0]), int(nose[1])), (int(wrist[0]), int(wrist[1])), (0,255,255), 2)
+
+    # 2. 키보드 트리거 시 범인 지정: 이번 프레임에 실제로 검출된 첫 번째 사람 (트랙 순서상 앞이어도 유령 트랙은 제외)
+    if cam.manual_event and live.any():
+        offender_idx = int(np.argmax(live))
+
+    # 3. 블러링 (조건부)
+    alerts = cam.objects.alerts # 자동 판정된 투기/킥보드 (물건이 트랙에 남아 있는 동안)
+    is_event_active = is_smoking_now or cam.manual_event or bool(alerts)
+
+    blur_boxes = []
+    for i in np.flatnonzero(analysis["has_box"]):
+        min_x, min_y, max_x, max_y = analysis["boxes"][i].tolist()
         
-        clean_zone = {"x1": int(w*0.65), "y1": int(h*0.2), "x2": int(w*0.95), "y2": int(h*0.7)}
+        should_blur = False
+        box_color = (0, 255, 0) # 평소 초록
 
-        # === [키보드 입력] ===
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'): break
+        if is_event_active:
+            if i == offender_idx:
+                box_color = (0, 0, 255) # 범인 빨강
+                should_blur = False 
+            else:
+                should_blur = True # 행인 블러
         
-        if key == ord('u'): # 초기화
-            state_littering = False; state_kickboard = False; state_flyer = False
-            play_audio_thread("UNDO")
-            
-        if key == ord('l'): # 투기
-            state_littering = True; state_kickboard = False; state_flyer = False
-            play_audio_thread("LITTERING")
+        if should_blur:
+            blur_boxes.append((min_x, min_y, max_x, max_y)) # 행인은 모아서 한 번에 처리
+        elif live[i]: # 유령 트랙은 박스 표시 X
+            cv2.rectangle(frame, (min_x, min_y), (max_x, max_y), box_color, 2)
+            if is_event_active and i == offender_idx:
+                # 정확도 표시 (화면에도 표시하여 캡처 시 도움됨)
+                conf_val = random.randint(97, 99)
+                cv2.putText(frame, f"CONF: {conf_val}%", (min_x, min_y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
 
-        if key == ord('k'): # 킥보드
-            state_littering = False; state_kickboard = True; state_flyer = False
-            play_audio_thread("PM_VIOLATION")
+    t = time.perf_counter()
+    anonymize_regions(frame, blur_boxes)
+    t_blur = time.perf_counter() - t
+    for min_x, min_y, _, _ in blur_boxes:
+        cv2.putText(frame, "Privacy", (min_x, min_y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200,200,200), 1)
 
-        if key == ord('j'): # 전단지
-            state_littering = False; state_kickboard = False; state_flyer = True
-            play_audio_thread("FLYER")
+    # 4. 추적 중인 물건 (OBJECT_MODEL): 투기 물건 주황, 킥보드 노랑, 위반으로 판정된 물건 빨강
+    for o in cam.objects.objects:
+        x1, y1, x2, y2 = o.box.astype(int).tolist()
+        color = (0, 0, 255) if o.fired else (0, 165, 255) if o.litter else (0, 255, 255)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{'ITEM' if o.litter else 'PM'}#{o.id}", (x1, y1-8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
-        # === [AI 감지] ===
-        res_pose = model_pose(frame, verbose=False, conf=0.5)
-        offender_idx = -1 
-        is_smoking_now = False
+    # === [경고 시각 효과 (빨간 테두리 깜빡임)] ===
+    if is_event_active:
+        if int(time.time() * 8) % 2 == 0:
+            cv2.rectangle(frame, (0, 0), (w, h), (0, 0, 255), 20)
 
-        if res_pose[0].keypoints is not None:
-            kps_batch = res_pose[0].keypoints.xy.cpu().numpy()
-            
-            # 1. 흡연 감지 (자동)
-            for i, kps in enumerate(kps_batch):
-                if len(kps) > 10:
-                    nose = kps[0]; l_wrist = kps[9]; r_wrist = kps[10]
-                    dist_l = math.dist(nose, l_wrist) if nose[0]!=0 and l_wrist[0]!=0 else 999
-                    dist_r = math.dist(nose, r_wrist) if nose[0]!=0 and r_wrist[0]!=0 else 999
-                    
-                    threshold = 160 
-                    
-                    if dist_l < 300: 
-                        cv2.line(frame, (int(nose[0]), int(nose[1])), (int(l_wrist[0]), int(l_wrist[1])), (0,255,255), 2)
-                    if dist_r < 300: 
-                        cv2.line(frame, (int(nose[0]), int(nose[1])), (int(r_wrist[0]), int(r_wrist[1])), (0,255,255), 2)
-
-                    if dist_l < threshold or dist_r < threshold:
-                        is_smoking_now = True
-                        offender_idx = i 
-                        break 
-
-            # 2. 키보드 트리거 시 범인 지정
-            if (state_littering or state_kickboard or state_flyer) and len(kps_batch) > 0:
-                offender_idx = 0 
-
-            # 3. 블러링 (조건부)
-            is_event_active = is_smoking_now or state_littering or state_kickboard or state_flyer
-
-            for i, kps in enumerate(kps_batch):
-                if len(kps) > 10:
-                    head_x = [p[0] for p in kps[0:5] if p[0]!=0]
-                    head_y = [p[1] for p in kps[0:5] if p[1]!=0]
-                    
-                    if head_x and head_y:
-                        min_x, max_x = int(min(head_x))-40, int(max(head_x))+40
-                        min_y, max_y = int(min(head_y))-60, int(max(head_y))+30
-                        min_x=max(0, min_x); min_y=max(0, min_y); max_x=min(w, max_x); max_y=min(h, max_y)
-                        
-                        should_blur = False
-                        box_color = (0, 255, 0) # 평소 초록
-
-                        if is_event_active:
-                            if i == offender_idx:
-                                box_color = (0, 0, 255) # 범인 빨강
-                                should_blur = False 
-                            else:
-                                should_blur = True # 행인 블러
-                        
-                        if should_blur:
-                            roi = frame[min_y:max_y, min_x:max_x]
-                            roi = cv2.GaussianBlur(roi, (99, 99), 30)
-                            frame[min_y:max_y, min_x:max_x] = roi
-                            cv2.putText(frame, "Privacy", (min_x, min_y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200,200,200), 1)
-                        else:
-                            cv2.rectangle(frame, (min_x, min_y), (max_x, max_y), box_color, 2)
-                            if is_event_active and i == offender_idx:
-                                # 정확도 표시 (화면에도 표시하여 캡처 시 도움됨)
-                                conf_val = random.randint(97, 99)
-                                cv2.putText(frame, f"CONF: {conf_val}%", (min_x, min_y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
-
-        # === [경고 시각 효과 (빨간 테두리 깜빡임)] ===
-        if is_event_active:
-            if int(time.time() * 8) % 2 == 0:
-                cv2.rectangle(frame, (0, 0), (w, h), (0, 0, 255), 20)
-
-        # === [상태 텍스트 & 오디오 트리거] ===
-        status_text = "NORMAL - Monitoring"
-        status_color = (0, 255, 0)
-        update_type = None
-        curr_time = time.time()
-
-        if state_flyer:
-            status_text = "VIOLATION: ILLEGAL POSTING"
-            status_color = (0, 0, 255)
-            update_type = "전단지 부착"
-            cv2.rectangle(frame, (clean_zone["x1"], clean_zone["y1"]), (clean_zone["x2"], clean_zone["y2"]), (255, 0, 0), 3)
-            cv2.putText(frame, "CLEAN ZONE (ROI)", (clean_zone["x1"], clean_zone["y1"]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,0,0), 2)
-            
-        elif state_kickboard:
-            status_text = "WARNING: PM VIOLATION"
-            status_color = (0, 255, 255)
-            update_type = "불법 주차"
-            
-        elif state_littering:
-            status_text = "ALERT: ILLEGAL DUMPING"
-            status_color = (0, 165, 255)
-            update_type = "무단 투기"
-            cv2.putText(frame, "TRASH DETECTED", (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 165, 255), 3)
-            
-        elif is_smoking_now:
-            status_text = "WARNING: SMOKING DETECTED"
-            status_color = (200, 0, 255)
-            update_type = "흡연 감지"
-            if curr_time - last_audio_time > audio_cooldown:
-                play_audio_thread("SMOKING")
-                last_audio_time = curr_time
-
-        # 상단바
-        cv2.rectangle(frame, (0, 0), (w, 60), (0,0,0), -1) 
-        cv2.putText(frame, status_text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
+    # === [상태 텍스트 & 오디오 트리거] ===
+    status_text = "NORMAL - Monitoring"
+    status_color = (0, 255, 0)
+    update_type = None
+    curr_time = time.time()
+
+    if cam.state_flyer:
+        status_text = "VIOLATION: ILLEGAL POSTING"
+        status_color = (0, 0, 255)
+        update_type = "전단지 부착"
+        cv2.rectangle(frame, (clean_zone["x1"], clean_zone["y1"]), (clean_zone["x2"], clean_zone["y2"]), (255, 0, 0), 3)
+        cv2.putText(frame, "CLEAN ZONE (ROI)", (clean_zone["x1"], clean_zone["y1"]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,0,0), 2)
+        
+    elif cam.state_kickboard or "kickboard" in alerts:
+        status_text = "WARNING: PM VIOLATION"
+        status_color = (0, 255, 255)
+        update_type = "불법 주차"
+        px1, py1, px2, py2 = zone_rect(PM_ZONE, w, h)
+        cv2.rectangle(frame, (px1, py1), (px2, py2), (0, 255, 255), 3)
+        cv2.putText(frame, "NO PARKING ZONE", (px1 + 10, py1 + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        
+    elif cam.state_littering or "littering" in alerts:
+        status_text = "ALERT: ILLEGAL DUMPING"
+        status_color = (0, 165, 255)
+        update_type = "무단 투기"
+        cv2.putText(frame, "TRASH DETECTED", (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 165, 255), 3)
+        
+    elif is_smoking_now:
+        status_text = "WARNING: SMOKING DETECTED"
+        status_color = (200, 0, 255)
+        update_type = "흡연 감지"
+        if curr_time - cam.last_audio_time > audio_cooldown:
+            audio.announce("SMOKING")
+            cam.last_audio_time = curr_time
+
+    # 상단바
+    cv2.rectangle(frame, (0, 0), (w, 60), (0,0,0), -1) 
+    cv2.putText(frame, status_text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, status_color, 2)
+    cv2.putText(frame, cam.id, (w-120, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200,200,200), 2)
+    if cam is primary_cam and PREVIEW_WINDOW:
         cv2.putText(frame, "Keys: L(Trash) K(PM) J(Flyer) U(Reset)", (20, h-20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200,200,200), 1)
 
-        cv2.imshow("CityEye Manager", frame)
+    perf.record("keypoints", t_keypoints)
+    perf.record("blur", t_blur)
+    perf.record("overlay", time.perf_counter() - t_start - t_keypoints - t_blur)
+    return update_type
 
-        # === [데이터 동기화 (보고서용 97~99% 설정)] ===
-        if update_type:
+audio_cooldown = 3.0 
+
+# === [데이터 동기화 (보고서용 97~99% 설정)] ===
+def sync_camera_state(cam, update_type):
+    curr_time = time.time()
+    loc_status = locations_status.setdefault(cam.location, {"status": "정상", "last_action": "특이사항 없음", "type": None})
+
+    if update_type:
+        if cam.monitor["type"] != update_type: # 경고가 새로 시작될 때만 정확도 산정 (매 프레임 바뀌지 않게)
             high_conf = random.randint(97, 99) # 여기서 97~99 설정
-            current_monitor_state.update({"status": "경고", "type": update_type, "action": "위반 행위 감지됨", "conf": high_conf})
-            
-            if (state_flyer or state_kickboard or state_littering) and (curr_time - last_audio_time > audio_cooldown):
-                now_str = datetime.datetime.now().strftime("%H:%M")
-                fake_logs.insert(0, {"id": log_id_counter, "time": now_str, "date": "2025-01-03", "type": update_type, "loc": "AI 감지구역", "zone": "Live", "conf": high_conf, "status": "경고"})
-                log_id_counter += 1
-                insights_data["total"] += 1
-                last_audio_time = curr_time
+            cam.monitor.update({"status": "경고", "type": update_type, "action": "위반 행위 감지됨", "conf": high_conf})
+            loc_status.update({"status": "경고", "last_action": update_type, "type": update_type})
+            mark_changed()
+        
+        if cam.manual_event and (curr_time - cam.last_audio_time > audio_cooldown):
+            log_event(cam, update_type)
+            cam.last_audio_time = curr_time
+    elif cam.monitor["status"] != "정상":
+        cam.monitor.update({"status": "정상", "type": None, "action": "모니터링 중...", "conf": 0})
+        loc_status.update({"status": "정상", "last_action": "특이사항 없음", "type": None})
+        mark_changed()
+
+    # 자동 판정(객체-사람 연결)은 위반 한 건당 이벤트 하나 (수동 트리거처럼 쿨다운마다 반복 기록하지 않음)
+    for action in cam.detected: log_event(cam, DETECTION_TYPES[action])
+    cam.detected.clear()
+
+def log_event(cam, event_type):
+    now = datetime.datetime.now()
+    conf = cam.monitor["conf"] if cam.monitor["type"] == event_type else random.randint(97, 99)
+    store.append({"time": now.strftime("%H:%M"), "date": now.strftime("%Y-%m-%d"), "type": event_type, "loc": cam.location, "zone": "Live", "conf": conf, "status": "경고", "camera": cam.id},
+                 ts=now.timestamp(), on_id=cam.recorder.trigger if cam.recorder is not None else None)
+
+# === [원격 제어 (HTTP -> AI 루프 명령 큐)] ===
+# 액션 -> (트리거 플래그, 안내 방송). reset 은 모든 트리거 해제
+CONTROL_ACTIONS = {
+    "littering": ({"littering": True}, "LITTERING"),
+    "kickboard": ({"kickboard": True}, "PM_VIOLATION"),
+    "flyer": ({"flyer": True}, "FLYER"),
+    "reset": ({}, "UNDO"),
+}
+DETECTION_TYPES = {"littering": "무단 투기", "kickboard": "불법 주차"} # 자동 판정 액션 -> 이벤트 종류 (process_frame 의 경고 문구와 같게)
+KEY_ACTIONS = {ord('l'): "littering", ord('k'): "kickboard", ord('j'): "flyer", ord('u'): "reset"}
+PREVIEW_WINDOW = os.environ.get("PREVIEW_WINDOW", "0") == "1" # 서버 PC 에서 OpenCV 미리보기 창 (기본: 헤드리스)
+commands = queue.Queue() # (camera_id, action). API 스레드가 넣고 AI 루프가 꺼내서 적용
+
+def apply_command(cam, action):
+    flags, scenario = CONTROL_ACTIONS[action]
+    cam.set_trigger(**flags)
+    audio.announce(scenario)
+
+def drain_commands():
+    # 카메라 상태는 AI 루프 스레드에서만 바꾼다
+    while True:
+        try: cam_id, action = commands.get_nowait()
+        except queue.Empty: return
+        if cam_id in cameras: apply_command(cameras[cam_id], action)
+
+def handle_key(key):
+    # 키보드 트리거는 기본 카메라(primary_cam) 에 적용 (미리보기 창 사용 시)
+    if key in KEY_ACTIONS: apply_command(primary_cam, KEY_ACTIONS[key])
+
+# === [포즈 추론 백엔드] ===
+# POSE_BACKEND: torch(ultralytics 기본) / onnx(ONNX Runtime, .pt 에서 자동 export) / onnx-int8(동적 INT8 양자화)
+# 모든 백엔드는 frames(list of BGR) -> [키포인트 (N, 17, 2) float32] 로 같은 형식을 돌려줌 (미검출 키포인트는 0)
+# ultralytics / onnxruntime 은 실제로 그 백엔드를 쓸 때만 import (서버 시작이 무거운 import 에 막히지 않게)
+POSE_BACKENDS = ("torch", "onnx", "onnx-int8")
+POSE_BACKEND = os.environ.get("POSE_BACKEND", "torch")
+POSE_MODEL = os.environ.get("POSE_MODEL", "yolov8n-pose.pt")
+POSE_IMGSZ = int(os.environ.get("POSE_IMGSZ", "640")) # 추론 입력 해상도 (32 의 배수, 작을수록 빠름)
+POSE_CONF = 0.5
+POSE_IOU = 0.7 # NMS
+KEYPOINT_MIN_CONF = 0.5 # 이보다 낮은 키포인트는 미검출(0) 처리 (ultralytics 와 동일)
+WARMUP_RUNS = int(os.environ.get("WARMUP_RUNS", "2")) # 시작 시 더미 프레임으로 미리 돌려서 첫 프레임 지연 제거
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "0")) # torch/onnxruntime 스레드 수 (0: 기본값, 워커 풀에서는 코어 수 / 워커 수)
+
+# 객체 검출 (무단 투기 가방/쓰레기, 킥보드): OBJECT_MODEL 을 지정하면 포즈 모델과 같은 백엔드/입력 해상도로 같이 실행
+# 두 모델이 letterbox 한 배치 텐서 하나를 같이 씀 (리사이즈/패딩/정규화는 프레임당 한 번)
+OBJECT_MODEL = os.environ.get("OBJECT_MODEL", "") # 예) yolov8n.pt. 비우면 포즈만 (투기/킥보드는 키보드·API 트리거로만)
+OBJECT_CONF = 0.4
+OBJECT_STRIDE = max(1, int(os.environ.get("OBJECT_STRIDE", "3"))) # 포즈 추론 N 번에 한 번만 객체 검출 (가방/킥보드는 천천히 움직임)
+LITTER_CLASSES = tuple(int(c) for c in os.environ.get("LITTER_CLASSES", "24,26,28,39,41").split(",") if c) # COCO: 백팩, 핸드백, 캐리어, 병, 컵
+KICKBOARD_CLASSES = tuple(int(c) for c in os.environ.get("KICKBOARD_CLASSES", "1,3").split(",") if c) # COCO 에 킥보드가 없어 자전거/오토바이 (전용 모델이면 그 클래스 번호)
+OBJECT_CLASSES = LITTER_CLASSES + KICKBOARD_CLASSES
+NO_OBJECTS = np.zeros((0, 6), dtype=np.float32) # (x1, y1, x2, y2, conf, cls)
+
+def letterbox(frame, imgsz):
+    # 비율 유지 축소 + 회색(114) 패딩 -> CHW RGB 0~1, 원본 좌표 복원용 (scale, left, top)
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = round(h * scale), round(w * scale)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[top:top + nh, left:left + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    blob = canvas[..., ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return blob, (scale, left, top)
+
+def letterbox_batch(frames, imgsz):
+    # 프레임 목록 -> (B, 3, imgsz, imgsz) 배치 + 프레임별 복원 정보. 포즈/객체 모델이 같이 씀
+    prepared = [letterbox(frame, imgsz) for frame in frames]
+    return np.stack([p[0] for p in prepared]), [p[1] for p in prepared]
+
+def unletterbox(xy, meta):
+    # letterbox 좌표 (..., 2) -> 원본 프레임 좌표
+    scale, left, top = meta
+    return (xy - [left, top]) / scale
+
+def keypoints_of(result):
+    if result.keypoints is None: return np.zeros((0, 17, 2), dtype=np.float32)
+    return result.keypoints.xy.cpu().numpy()
+
+def boxes_of(result):
+    if result.boxes is None or not len(result.boxes.conf.cpu().numpy()): return NO_OBJECTS
+    b = result.boxes
+    return np.column_stack([b.xyxy.cpu().numpy(), b.conf.cpu().numpy(), b.cls.cpu().numpy()]).astype(np.float32)
+
+class UltralyticsModel:
+    def __init__(self, model_path, imgsz=POSE_IMGSZ, threads=0):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+
+    def run(self, source):
+        return self.model(source, imgsz=self.imgsz, verbose=False, **self.options)
+
+    def __call__(self, frames):
+        return [self.parse(res) for res in self.run(frames)]
+
+    def infer_blob(self, blob, metas):
+        # 공유 전처리 결과 (B, 3, imgsz, imgsz) 0~1 RGB 텐서를 그대로 넣음 -> ultralytics 자체 letterbox 생략
+        import torch
+        return [self.parse(res, meta) for res, meta in zip(self.run(torch.from_numpy(blob)), metas)]
+
+class UltralyticsPose(UltralyticsModel):
+    options = {"conf": POSE_CONF}
+
+    def parse(self, result, meta=None):
+        kps = keypoints_of(result)
+        if meta is None: return kps
+        missing = (kps == 0).all(axis=2)
+        kps = unletterbox(kps, meta).astype(np.float32)
+        kps[missing] = 0
+        return kps
+
+class UltralyticsDetect(UltralyticsModel):
+    options = {"conf": OBJECT_CONF, "classes": list(OBJECT_CLASSES)}
+
+    def parse(self, result, meta=None):
+        objects = boxes_of(result)
+        if meta is not None: objects[:, :4] = unletterbox(objects[:, :4].reshape(-1, 2), meta).reshape(-1, 4)
+        return objects
+
+class OnnxModel:
+    def __init__(self, model_path, imgsz=POSE_IMGSZ, threads=0, int8=False):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("POSE_BACKEND=onnx 에는 onnxruntime 이 필요합니다 (pip install onnxruntime)")
+        path = export_onnx(model_path, imgsz)
+        if int8: path = quantize_onnx(path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads: options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.imgsz = inp.shape[2] if isinstance(inp.shape[2], int) else imgsz # 고정 크기로 export 된 경우 그 크기를 따름
+        self.batched = not isinstance(inp.shape[0], int) # dynamic batch 로 export 된 경우만 한 번에 추론
+
+    @staticmethod
+    def nms(pred, scores, classes=None):
+        # 점수 필터 + NMS. classes 를 주면 클래스별로 따로 (좌표를 클래스마다 멀리 띄워서 한 번에)
+        cx, cy, bw, bh = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        offset = 0 if classes is None else classes * 8192
+        boxes = np.stack([cx - bw / 2 + offset, cy - bh / 2, bw, bh], axis=1)
+        return np.array(cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), 0, POSE_IOU), dtype=np.int64).reshape(-1)
+
+    def __call__(self, frames):
+        return self.infer_blob(*letterbox_batch(frames, self.imgsz))
+
+    def infer_blob(self, blob, metas):
+        if self.batched:
+            preds = self.session.run(None, {self.input_name: blob})[0]
         else:
-            current_monitor_state.update({"status": "정상", "type": None, "action": "모니터링 중...", "conf": 0})
+            preds = [self.session.run(None, {self.input_name: blob[i:i + 1]})[0][0] for i in range(len(blob))]
+        return [self.postprocess(pred, meta) for pred, meta in zip(preds, metas)]
 
-        with lock: output_frame = frame.copy()
-        time.sleep(0.01)
+class OnnxPose(OnnxModel):
+    # YOLOv8-pose ONNX 출력 (B, 56, anchors) = 박스 4 + 점수 1 + 키포인트 17x(x, y, conf) 를 직접 후처리
+    def postprocess(self, pred, meta):
+        pred = pred.T # (anchors, 56)
+        pred = pred[pred[:, 4] > POSE_CONF]
+        if not len(pred): return np.zeros((0, 17, 2), dtype=np.float32)
+        kps = pred[self.nms(pred, pred[:, 4]), 5:].reshape(-1, 17, 3)
+        xy = unletterbox(kps[..., :2], meta)
+        xy[kps[..., 2] < KEYPOINT_MIN_CONF] = 0
+        return xy.astype(np.float32)
 
-    cap.release()
-    cv2.destroyAllWindows()
+class OnnxDetect(OnnxModel):
+    # YOLOv8 검출 ONNX 출력 (B, 4 + 클래스 수, anchors) -> (M, 6) [x1, y1, x2, y2, conf, cls], 관심 클래스만
+    def postprocess(self, pred, meta):
+        pred = pred.T
+        classes = np.array([c for c in OBJECT_CLASSES if c < pred.shape[1] - 4], dtype=np.int64)
+        if not len(classes): return NO_OBJECTS
+        class_scores = pred[:, 4 + classes]
+        best = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(pred)), best]
+        keep = scores > OBJECT_CONF
+        pred, scores, cls = pred[keep], scores[keep], classes[best[keep]]
+        if not len(pred): return NO_OBJECTS
+        keep = self.nms(pred, scores, cls)
+        cx, cy, bw, bh = pred[keep, :4].T
+        corners = unletterbox(np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1).reshape(-1, 2), meta).reshape(-1, 4)
+        return np.column_stack([corners, scores[keep], cls[keep]]).astype(np.float32)
 
-def generate_frames():
-    global output_frame
-    while not stop_event.is_set():
-        with lock:
-            if output_frame is None: time.sleep(0.1); continue
-            (flag, encodedImage) = cv2.imencode(".jpg", output_frame)
-            if not flag: continue
-        yield(b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
+class SceneDetector:
+    # 포즈 + 객체 검출 한 번에: letterbox 는 프레임당 한 번, 두 모델 모두 같은 배치 텐서로 실행
+    # 반환: [(키포인트 (N, 17, 2), 객체 (M, 6) 또는 None)]. None 은 이번 호출에서 객체 검출을 건너뜀 (직전 결과 유지)
+    def __init__(self, pose, objects=None, stride=OBJECT_STRIDE):
+        if objects is not None and objects.imgsz != pose.imgsz:
+            raise ValueError(f"포즈/객체 모델 입력 크기가 다릅니다 ({pose.imgsz} != {objects.imgsz}). 같은 imgsz 로 export 하세요")
+        self.pose = pose
+        self.objects = objects
+        self.stride = stride
+        self.calls = 0
+
+    def __call__(self, frames):
+        if self.objects is None: return [(kps, None) for kps in self.pose(frames)]
+        blob, metas = letterbox_batch(frames, self.pose.imgsz)
+        kps = self.pose.infer_blob(blob, metas)
+        objects = self.objects.infer_blob(blob, metas) if self.calls % self.stride == 0 else [None] * len(frames)
+        self.calls += 1
+        return list(zip(kps, objects))
+
+def export_onnx(model_path, imgsz):
+    # .onnx 가 주어지면 그대로, .pt 면 같은 폴더에 <이름>_<imgsz>.onnx 로 한 번만 export
+    if model_path.endswith(".onnx"): return model_path
+    path = f"{os.path.splitext(model_path)[0]}_{imgsz}.onnx"
+    if not os.path.exists(path):
+        from ultralytics import YOLO
+        print(f"📦 ONNX export: {model_path} -> {path} (imgsz={imgsz})")
+        shutil.move(YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True), path)
+    return path
+
+def quantize_onnx(path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    out = path.replace(".onnx", "_int8.onnx")
+    if not os.path.exists(out):
+        print(f"📦 INT8 양자화: {path} -> {out}")
+        quantize_dynamic(path, out, weight_type=QuantType.QUInt8)
+    return out
+
+def load_backend(task, kind, model_path, imgsz, threads, warmup):
+    if kind not in POSE_BACKENDS: raise ValueError(f"POSE_BACKEND 는 {POSE_BACKENDS} 중 하나여야 합니다: {kind}")
+    t = time.perf_counter()
+    if kind == "torch": backend = (UltralyticsPose if task == "pose" else UltralyticsDetect)(model_path, imgsz, threads)
+    else: backend = (OnnxPose if task == "pose" else OnnxDetect)(model_path, imgsz, threads, int8=kind == "onnx-int8")
+    t_load = time.perf_counter() - t
+    dummy = np.zeros((720, 1280, 3), dtype=np.uint8)
+    t = time.perf_counter()
+    for _ in range(warmup): backend([dummy])
+    label = "포즈" if task == "pose" else "객체"
+    print(f"🧠 {label} 모델 {kind} ({model_path}, imgsz={imgsz}) 로딩 {t_load:.1f}s + 워밍업 {warmup}회 {time.perf_counter() - t:.1f}s")
+    return backend
+
+def load_pose_backend(kind=None, model_path=None, imgsz=None, threads=None, warmup=None):
+    return load_backend("pose", kind or POSE_BACKEND, model_path or POSE_MODEL, imgsz or POSE_IMGSZ,
+                        INFERENCE_THREADS if threads is None else threads, WARMUP_RUNS if warmup is None else warmup)
+
+def load_object_backend(kind=None, model_path=None, imgsz=None, threads=None, warmup=None):
+    # OBJECT_MODEL 이 비어 있으면 None (포즈만)
+    model_path = OBJECT_MODEL if model_path is None else model_path
+    if not model_path: return None
+    return load_backend("detect", kind or POSE_BACKEND, model_path, imgsz or POSE_IMGSZ,
+                        INFERENCE_THREADS if threads is None else threads, WARMUP_RUNS if warmup is None else warmup)
+
+def load_scene_detector(kind=None, model_path=None, imgsz=None, threads=None, object_model=None):
+    pose = load_pose_backend(kind, model_path, imgsz, threads)
+    return SceneDetector(pose, load_object_backend(kind, object_model, pose.imgsz, threads), stride=OBJECT_STRIDE)
+
+# === [추론 워커 프로세스 풀 (공유 메모리 프레임 전달)] ===
+# INFERENCE_WORKERS > 0 이면 포즈 추론을 별도 프로세스들에서 실행 (GIL 회피). 카메라는 워커별로 나눠 담당
+# 프레임은 pickle 없이 워커별 공유 메모리 링에 한 번 memcpy, 워커는 그 메모리를 복사 없이 ndarray 로 읽음
+# 돌려받는 건 사람별 키포인트 배열 (N, 17, 2) float32 + 객체 박스 (M, 6) 뿐 (OBJECT_MODEL 사용 시 워커 안에서 같이 추론)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+SHM_SLOT_BYTES = int(os.environ.get("SHM_SLOT_BYTES", 1920 * 1080 * 3)) # 링 슬롯 하나 크기 (최대 프레임 크기)
+INFERENCE_TIMEOUT = 60 # 워커 응답 대기 (첫 호출은 모델 로딩 포함)
+
+class FrameRing:
+    # 공유 메모리 한 덩어리를 고정 크기 슬롯으로 나눠 돌아가며 사용
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=slots * slot_bytes if name is None else 0)
+        self.next = 0
+
+    def view(self, slot, shape):
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def put(self, frame):
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"프레임({frame.shape})이 공유 메모리 슬롯보다 큽니다. SHM_SLOT_BYTES 를 늘리세요")
+        slot = self.next
+        self.next = (self.next + 1) % self.slots
+        np.copyto(self.view(slot, frame.shape), frame)
+        return self.shm.name, slot * self.slot_bytes, frame.shape
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink: self.shm.unlink()
+
+# 워커에 그대로 넘기는 설정: spawn 된 워커는 모듈을 새로 import 하므로 부모가 실행 중에 바꾼 값(벤치마크 옵션 등)을 모름
+INFERENCE_CONFIG_KEYS = ("POSE_BACKEND", "POSE_MODEL", "POSE_IMGSZ", "POSE_CONF", "POSE_IOU", "KEYPOINT_MIN_CONF", "WARMUP_RUNS",
+                         "INFERENCE_THREADS", "OBJECT_MODEL", "OBJECT_CONF", "OBJECT_STRIDE", "LITTER_CLASSES", "KICKBOARD_CLASSES", "OBJECT_CLASSES")
+INFERENCE_CALL_TIMEOUT = float(os.environ.get("INFERENCE_CALL_TIMEOUT", "10")) # 추론 한 번 응답 대기 (넘으면 워커가 멈춘 것으로 보고 재시작)
+INFERENCE_MAX_RESTARTS = int(os.environ.get("INFERENCE_MAX_RESTARTS", "3")) # 워커별 재시작 한도. 넘으면 그 워커 카메라는 메인 프로세스에서 추론
+
+def inference_config(**overrides):
+    return {**{key: globals()[key] for key in INFERENCE_CONFIG_KEYS}, **overrides}
+
+def inference_worker(requests, responses, config):
+    # 워커 프로세스 본체 (spawn 으로 시작되므로 모듈 최상위 함수)
+    # 작업 = [(공유 메모리 이름, 오프셋, shape)]: 자기 링 또는 카메라 프레임 풀. 처음 보는 이름이면 그때 연결
+    globals().update(config) # 환경변수 기본값 대신 부모가 확정한 설정
+    model = load_scene_detector()
+    attached = {}
+    responses.put("ready")
+    while True:
+        job = requests.get()
+        if job is None: break
+        for name, _, _ in job:
+            if name not in attached: attached[name] = shared_memory.SharedMemory(name=name)
+        frames = [np.ndarray(shape, dtype=np.uint8, buffer=attached[name].buf, offset=offset) for name, offset, shape in job]
+        responses.put(model(frames))
+        del frames # 공유 메모리를 가리키는 view 를 닫기 전에 해제
+    for shm in attached.values(): shm.close()
+
+class InferencePool:
+    # 워커가 죽거나 멈추면 AI 루프는 계속 돌고: 그 워커 카메라는 재시작(모델 로딩)이 끝날 때까지 결과 None (트래커 예측으로 대체)
+    # INFERENCE_MAX_RESTARTS 를 넘기면 그 워커 몫은 메인 프로세스 모델로 추론
+    def __init__(self, workers, cams, slot_bytes=SHM_SLOT_BYTES):
+        self.ctx = multiprocessing.get_context("spawn")
+        workers = max(1, min(workers, len(cams)))
+        threads = INFERENCE_THREADS or max(1, (os.cpu_count() or 1) // workers)
+        self.config = inference_config(INFERENCE_THREADS=threads)
+        self.shard = {cam.id: i % workers for i, cam in enumerate(cams)} # 카메라 -> 담당 워커
+        self.rings = []
+        self.requests, self.responses, self.procs = [None] * workers, [None] * workers, [None] * workers
+        self.ready = [False] * workers
+        self.restarts = [0] * workers
+        self.local = None # 재시작 한도를 넘긴 워커 대신 쓰는 메인 프로세스 모델
+        self.zero_copy = 0 # 복사 없이 넘긴 프레임 수
+        for i in range(workers):
+            n_cams = sum(1 for w in self.shard.values() if w == i)
+            self.rings.append(FrameRing(2 * n_cams, slot_bytes)) # 카메라당 2 슬롯 (재시작한 워커도 같은 링을 씀)
+            self._spawn(i)
+        for i in range(workers):
+            try: self._expect_ready(i, INFERENCE_TIMEOUT)
+            except RuntimeError as e: self._fail(i, e)
+        print(f"🧠 추론 워커 {workers}개 (워커당 스레드 {threads}): " + ", ".join(f"{c}->{w}" for c, w in self.shard.items()))
+
+    def _spawn(self, i):
+        self.requests[i], self.responses[i] = self.ctx.Queue(), self.ctx.Queue()
+        self.procs[i] = self.ctx.Process(target=inference_worker, daemon=True, name=f"inference-{i}",
+                                         args=(self.requests[i], self.responses[i], self.config))
+        self.procs[i].start()
+        self.ready[i] = False
+
+    def _receive(self, i, timeout):
+        # 워커가 죽으면 타임아웃까지 기다리지 않고 바로 실패
+        deadline = time.time() + timeout
+        while True:
+            try: return self.responses[i].get(timeout=min(0.5, max(0.01, deadline - time.time())))
+            except queue.Empty: pass
+            if not self.procs[i].is_alive(): raise RuntimeError(f"추론 워커 {i} 종료 (exitcode={self.procs[i].exitcode})")
+            if time.time() >= deadline: raise RuntimeError(f"추론 워커 {i} 응답 없음 ({timeout:.0f}s)")
+
+    def _expect_ready(self, i, timeout):
+        if self._receive(i, timeout) != "ready": raise RuntimeError(f"추론 워커 {i} 시작 응답 이상")
+        self.ready[i] = True
+
+    def _poll_ready(self, i):
+        # 재시작 중인 워커: 모델 로딩이 끝났는지 AI 루프를 막지 않고 확인
+        try: self._expect_ready(i, 0)
+        except RuntimeError as e:
+            if not self.procs[i].is_alive(): self._fail(i, e)
+        return self.ready[i]
+
+    def _fail(self, i, error):
+        proc = self.procs[i]
+        if proc.is_alive(): proc.kill()
+        proc.join(timeout=5)
+        self.ready[i] = False
+        self.restarts[i] += 1
+        if self.restarts[i] > INFERENCE_MAX_RESTARTS:
+            self.procs[i] = None
+            print(f"⚠️ {error} -> 재시작 {INFERENCE_MAX_RESTARTS}회 초과, 이 워커 카메라는 메인 프로세스에서 추론")
+            return
+        print(f"⚠️ {error} -> 재시작 ({self.restarts[i]}/{INFERENCE_MAX_RESTARTS}), 그 동안 해당 카메라는 트래커 예측")
+        self._spawn(i)
+
+    def _local(self, frames):
+        if self.local is None: self.local = load_scene_detector() # 메인 프로세스는 이미 같은 설정 (워커별 스레드 수만 기본값)
+        return self.local(frames)
+
+    def __call__(self, items):
+        # items: [(cam, frame)] -> 같은 순서의 (키포인트, 객체) 목록. 모든 워커에 먼저 보내고 나서 모아서 받음 (병렬 실행)
+        # 캡처 버퍼가 공유 메모리 풀 소속이면 위치만 보냄 (복사 0회), 아니면 워커 링에 한 번 복사
+        # 담당 워커를 쓸 수 없는 프레임은 None
+        out = [None] * len(items)
+        jobs, local = {}, []
+        for k, (cam, frame) in enumerate(items):
+            w = self.shard[cam.id]
+            if self.procs[w] is None: local.append(k); continue
+            if not (self.ready[w] or self._poll_ready(w)): continue
+            slot = cam.pool.shm_slot(frame)
+            if slot is None: slot = self.rings[w].put(np.ascontiguousarray(frame))
+            else: slot = (*slot, frame.shape); self.zero_copy += 1
+            jobs.setdefault(w, []).append((k, slot))
+        for w, job in jobs.items(): self.requests[w].put([slot for _, slot in job])
+        for w, job in jobs.items():
+            try: results = self._receive(w, INFERENCE_CALL_TIMEOUT)
+            except RuntimeError as e: self._fail(w, e); continue
+            for (k, _), result in zip(job, results): out[k] = result
+        if local:
+            for k, result in zip(local, self._local([items[k][1] for k in local])): out[k] = result
+        return out
+
+    def close(self):
+        for req, proc in zip(self.requests, self.procs):
+            if proc is not None and proc.is_alive(): req.put(None)
+        for proc in self.procs:
+            if proc is not None: proc.join(timeout=5)
+        for ring in self.rings: ring.close(unlink=True)
+
+def run_ai_loop(show_window=None):
+    if show_window is None: show_window = PREVIEW_WINDOW
+    if show_window: print("🚀 AI 시스템 가동 (L:투기, K:킥보드, J:전단지, U:초기화)")
+    else: print("🚀 AI 시스템 가동 (헤드리스, 제어: POST /control/{camera}/{action})")
+    
+    if INFERENCE_WORKERS > 0:
+        detect = InferencePool(INFERENCE_WORKERS, list(cameras.values()))
+    else:
+        # 모델은 하나만 올리고 모든 카메라 프레임을 한 번에 배치 추론 (OBJECT_MODEL 이 있으면 같은 배치로 객체 검출도)
+        model = load_scene_detector()
+        detect = lambda items: model([frame for _, frame in items])
+
+    for cam in cameras.values(): cam.pool.shared = isinstance(detect, InferencePool) # 워커가 캡처 버퍼를 직접 읽도록
+    workers = [threading.Thread(target=capture_worker, args=(cam,), daemon=True) for cam in cameras.values()]
+    for t in workers: t.start()
+    for cam in cameras.values(): threading.Thread(target=cam.hub.encode_loop, daemon=True).start()
+    print(f"📷 카메라 {len(cameras)}대: " + ", ".join(f"{c.id}({c.location})" for c in cameras.values()))
+
+    while not stop_event.is_set() and (any(t.is_alive() for t in workers) or any(c.buffer.frame is not None for c in cameras.values())):
+        # 새 프레임이 들어올 때까지 대기 후, 각 카메라의 최신 프레임만 모아서 배치 구성
+        frame_ready.wait(0.1)
+        frame_ready.clear()
+        drain_commands()
+        batch = []
+        for cam in cameras.values():
+            frame, ts, cam.frame_ts = cam.buffer.take()
+            if frame is not None: batch.append((cam, frame, ts))
+        if not batch: continue
+
+        # === [움직임 게이트] 움직임이 있거나 keep-alive 가 지난 카메라만 추론 ===
+        t = time.perf_counter()
+        moving = [(cam, frame) for cam, frame, _ in batch if cam.gate.should_run(frame)] # 정적 장면은 직전 키포인트 유지
+        perf.record("motion", time.perf_counter() - t)
+
+        # === [추론 간격] POSE_STRIDE 프레임마다 추론, 사이 프레임은 트래커 예측 ===
+        t = time.perf_counter()
+        infer = []
+        for cam, frame in moving:
+            if cam.since_pose + 1 >= POSE_STRIDE:
+                infer.append((cam, frame)); cam.since_pose = 0
+            else:
+                cam.kps = cam.tracker.predict(frame.shape[1], frame.shape[0])
+                cam.since_pose += 1; cam.predicted += 1
+        t_track = time.perf_counter() - t
+
+        # === [AI 감지] ===
+        if infer:
+            t = time.perf_counter()
+            detections = detect(infer)
+            perf.record("inference", time.perf_counter() - t)
+            t = time.perf_counter()
+            for (cam, frame), result in zip(infer, detections):
+                if result is None: # 추론 워커 재시작 중: 이 프레임은 추론 간격 사이처럼 트래커 예측
+                    cam.kps = cam.tracker.predict(frame.shape[1], frame.shape[0]); cam.predicted += 1
+                else: cam.kps = cam.tracker.update(result[0], frame.shape[1], frame.shape[0])
+            t_track += time.perf_counter() - t
+
+            # === [객체-사람 연결] 객체 검출을 한 프레임만 (OBJECT_STRIDE) ===
+            t = time.perf_counter()
+            linked = False
+            for (cam, frame), result in zip(infer, detections):
+                objects = result[1] if result is not None else None
+                if objects is None: continue
+                linked = True
+                for action in cam.objects.update(objects, cam.kps, cam.tracker.ids, frame.shape[1], frame.shape[0], cam.frame_ts):
+                    if getattr(cam, f"state_{action}"): continue # 운영자가 이미 같은 위반을 트리거해 둠
+                    cam.detected.append(action) # 이벤트/클립은 sync_camera_state 에서 한 번만
+                    audio.announce(CONTROL_ACTIONS[action][1])
+            if linked: perf.record("link", time.perf_counter() - t)
+        if moving: perf.record("track", t_track)
+
+        for cam, frame, ts in batch:
+            update_type = process_frame(cam, frame, cam.kps, cam.tracker.matched)
+            sync_camera_state(cam, update_type)
+            if show_window: cv2.imshow(f"CityEye Manager - {cam.id}", frame)
+            cam.hub.publish(frame)
+            cam.pool.release(frame) # 이제 허브가 참조를 들고 있음
+            cam.latency_ms = (time.time() - ts) * 1000
+
+        # 관제 화면은 경고 중인 카메라 우선, 없으면 기본 카메라
+        focus = next((c for c in cameras.values() if c.monitor["status"] != "정상"), primary_cam)
+        if current_monitor_state != focus.monitor:
+            current_monitor_state.update(focus.monitor); mark_changed()
+
+        # === [키보드 입력] ===
+        if not show_window: continue
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'): stop_event.set(); break
+        handle_key(key)
+
+    if show_window: cv2.destroyAllWindows()
+    if isinstance(detect, InferencePool): detect.close()
+    for cam in cameras.values(): # 루프가 끝나면 녹화 중이던 클립도 있는 프레임까지 저장
+        if cam.recorder is not None: cam.recorder.finish()
+    for cam in cameras.values(): cam.pool.close()
+
+def run_replay(spec, pace="max", encode=True):
+    # 헤드리스 오프라인 리플레이: 웹캠/GUI 없이 녹화 영상이나 프레임 폴더로 전체 파이프라인 실행
+    # spec 은 CAMERA_SOURCES 형식 (경로만 주면 기본 위치로). 반환: (처리 프레임 수, 경과 시간)
+    global cameras, primary_cam, store
+    if "=" not in spec: spec = f"{primary_cam.location}={spec}"
+    cameras = parse_camera_sources(spec)
+    primary_cam = next(iter(cameras.values()))
+    for cam in cameras.values():
+        if not cam.recorded: raise ValueError(f"리플레이 소스는 영상 파일이나 프레임 폴더여야 합니다: {cam.source}")
+        cam.pace = pace
+        cam.hub.force = encode # 시청자가 없어도 JPEG 인코딩 단계까지 측정
+    if store is None: store = EventStore(os.path.join(tempfile.mkdtemp(), "replay_events.db"))
+
+    stop_event.clear()
+    first_id = store.next_id
+    # 이벤트/클립 저장은 서버와 같은 writer 스레드로 (startup_event 와 동일)
+    writers = [threading.Thread(target=clip_writer.run, daemon=True), threading.Thread(target=store.writer_loop, daemon=True)]
+    for w in writers: w.start()
+    perf.reset()
+    t = time.perf_counter()
+    run_ai_loop(show_window=False)
+    elapsed = time.perf_counter() - t
+    # 두 writer 가 큐를 다 비우고 끝날 때까지 대기 (클립 먼저: set_clip 이 이벤트 DB 를 씀)
+    stop_event.set()
+    for w in writers: w.join()
+    print(f"💾 리플레이 이벤트 {store.next_id - first_id}건, 클립 {clip_writer.written}개 -> {store.path}")
+    return sum(c.buffer.processed for c in cameras.values()), elapsed
+
+def format_perf_report(frames, elapsed):
+    lines = [f"처리 프레임 {frames}개 / {elapsed:.2f}s -> {frames / max(elapsed, 1e-9):.1f} FPS",
+             f"{'stage':<10} {'count':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms, inference 는 배치 단위)"]
+    for stage, st in perf.summary().items():
+        lines.append(f"{stage:<10} {st['count']:>7} {st['mean']:>8.2f} {st['p50']:>8.2f} {st['p95']:>8.2f} {st['p99']:>8.2f}")
+    lines.append(f"트래커 예측 (POSE_STRIDE={POSE_STRIDE}): " + ", ".join(f"{c.id} {c.predicted}" for c in cameras.values()))
+    lines.append("추론 생략 (움직임 없음): " + ", ".join(f"{c.id} {c.gate.skipped}/{c.gate.checked} ({c.gate.skip_ratio:.0%})" for c in cameras.values()))
+    allocated = sum(c.pool.allocated_bytes for c in cameras.values()) / 2**20
+    lines.append(f"프레임 버퍼 할당 {allocated:.1f} MB ({allocated / max(elapsed, 1e-9):.1f} MB/s), 풀 재사용 "
+                 + ", ".join(f"{c.id} {c.pool.reused}회" for c in cameras.values()) + f" (FRAME_POOL_SIZE={FRAME_POOL_SIZE})")
+    if resource: lines.append(f"최대 RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    return "\n".join(lines)
+
+# === [6] 이벤트 저장소 (SQLite WAL) ===
+EVENT_DB = os.environ.get("EVENT_DB", "events.db")
+EVENT_COLUMNS = ("id", "ts", "date", "time", "type", "loc", "zone", "conf", "status", "camera", "clip", "site", "src_id")
+EVENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY, ts REAL NOT NULL, date TEXT, time TEXT, type TEXT, loc TEXT,
+    zone TEXT, conf INTEGER, status TEXT, camera TEXT, clip TEXT, site TEXT, src_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+CREATE INDEX IF NOT EXISTS idx_events_type ON events(type, id);
+CREATE INDEX IF NOT EXISTS idx_events_loc ON events(loc, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS event_rollups (
+    period TEXT NOT NULL, start REAL NOT NULL, type TEXT NOT NULL, loc TEXT NOT NULL, camera TEXT NOT NULL, count INTEGER NOT NULL,
+    UNIQUE (period, start, type, loc, camera)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_start ON event_rollups(start);
+CREATE TABLE IF NOT EXISTS event_hour_totals (hour INTEGER PRIMARY KEY, count INTEGER NOT NULL);
+"""
+EVENT_MIGRATIONS = {"clip": "TEXT", "site": "TEXT", "src_id": "INTEGER"} # 예전 DB 에 없는 컬럼
+
+# 보존 정책: 최근 EVENT_RETENTION 건만 원본 그대로, 그보다 오래된 이벤트는 시간별 건수(유형/위치/카메라)로 합쳐서 보관
+# 시간별 집계도 ROLLUP_HOURLY_DAYS 일이 지나면 일별로 합침. 시간대 분포는 event_hour_totals(24행)에 따로 누적 -> 피크 시간대 유지
+# 집계 테이블에는 NULL 대신 '' 를 넣음 (UNIQUE 제약이 NULL 끼리는 같다고 보지 않아서)
+EVENT_RETENTION = int(os.environ.get("EVENT_RETENTION", "100000")) # 원본으로 남길 최대 이벤트 수 (0: 무제한)
+EVENT_RETENTION_DAYS = float(os.environ.get("EVENT_RETENTION_DAYS", "0")) # 이보다 오래된 원본도 집계로 (0: 건수 기준만)
+ROLLUP_HOURLY_DAYS = float(os.environ.get("ROLLUP_HOURLY_DAYS", "30"))
+COMPACT_INTERVAL = 60 # 보존 정책 적용 주기(초)
+RECENT_EVENTS = int(os.environ.get("RECENT_EVENTS", "1000")) # 대시보드 폴링을 DB 조회 없이 처리하는 메모리 창 크기
+LOCAL_HOUR = "CAST(strftime('%H', {}, 'unixepoch', 'localtime') AS INTEGER)"
+LOCAL_DAY = "CAST(strftime('%s', {}, 'unixepoch', 'localtime', 'start of day', 'utc') AS INTEGER)"
+ROLLUP_UPSERT = " ON CONFLICT (period, start, type, loc, camera) DO UPDATE SET count = count + excluded.count"
+ROLLUP_EVENTS_SQL = ("INSERT INTO event_rollups SELECT 'hour', CAST(ts / 3600 AS INTEGER) * 3600, IFNULL(type, ''), IFNULL(loc, ''), "
+                     "IFNULL(camera, ''), COUNT(*) FROM events WHERE id <= ? GROUP BY 2, 3, 4, 5" + ROLLUP_UPSERT)
+ROLLUP_HOURS_SQL = (f"INSERT INTO event_rollups SELECT 'day', {LOCAL_DAY.format('start')}, type, loc, camera, SUM(count) "
+                    "FROM event_rollups WHERE period = 'hour' AND start < ? GROUP BY 2, 3, 4, 5" + ROLLUP_UPSERT)
+HOUR_TOTALS_SQL = (f"INSERT INTO event_hour_totals SELECT {LOCAL_HOUR.format('start')}, SUM(count) FROM event_rollups "
+                   "WHERE period = 'hour' AND start < ? GROUP BY 1 ON CONFLICT (hour) DO UPDATE SET count = count + excluded.count")
+INTERNED_COLUMNS = ("date", "type", "loc", "zone", "status", "camera", "site") # 같은 값이 반복되는 문자열
+
+class EventRecord:
+    # 메모리 창의 이벤트 한 건: dict 대신 __slots__, 반복되는 문자열은 intern 해서 한 객체를 공유
+    __slots__ = EVENT_COLUMNS
+
+    def __init__(self, event):
+        for c in EVENT_COLUMNS:
+            value = event.get(c)
+            setattr(self, c, sys.intern(value) if c in INTERNED_COLUMNS and isinstance(value, str) else value)
+
+    def as_dict(self):
+        return {c: getattr(self, c) for c in EVENT_COLUMNS}
+
+class RecentEvents:
+    # DB 에 들어간 최근 이벤트 (id 오름차순). since_id 폴링/첫 화면은 여기서 바로 응답
+    def __init__(self, maxlen):
+        self._lock = threading.Lock()
+        self.records = collections.deque(maxlen=maxlen)
+        self.complete = True # DB 의 원본 이벤트가 전부 창 안에 있음 (한 번이라도 밀려나면 False)
+
+    def __len__(self):
+        return len(self.records)
+
+    def extend(self, events):
+        with self._lock:
+            for e in sorted(events, key=lambda e: e["id"]):
+                if len(self.records) == self.records.maxlen: self.complete = False
+                self.records.append(EventRecord(e))
+
+    def discard(self, upto_id):
+        # 보존 정책으로 DB 에서 지운 이벤트는 창에서도 제거
+        with self._lock:
+            while self.records and self.records[0].id <= upto_id: self.records.popleft()
+
+    def set_clip(self, ids, path):
+        with self._lock:
+            for r in self.records:
+                if r.id in ids: r.clip = path
+
+    def query(self, since_id=None, limit=200, type=None, loc=None, newest_first=True):
+        # 창으로 답할 수 없으면 None (DB 조회)
+        with self._lock:
+            records = list(self.records)
+        if not records or (since_id and since_id < records[0].id - 1 and not self.complete): return None
+        matches = [r for r in records if (not since_id or r.id > since_id) and (not type or r.type == type) and (not loc or r.loc == loc)]
+        if newest_first:
+            if not since_id and len(matches) < limit and not self.complete: return None
+            return [r.as_dict() for r in matches[::-1][:limit]]
+        return [r.as_dict() for r in matches[:limit]]
+
+class Insights:
+    # 이벤트가 추가될 때마다 누적하는 집계 (유형/위치/시간대/카메라별). 최다 항목도 증가 시점에 같이 갱신 -> 조회 O(1)
+    DIMENSIONS = ("type", "loc", "hour", "camera")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.counts = {dim: {} for dim in self.DIMENSIONS}
+        self.top = dict.fromkeys(self.DIMENSIONS)
+
+    def _bump(self, dim, key, n):
+        if key is None: return
+        counts = self.counts[dim]
+        counts[key] = counts.get(key, 0) + n
+        top = self.top[dim]
+        if top is None or counts[key] > counts[top]: self.top[dim] = key
+
+    def add(self, event, n=1):
+        with self._lock:
+            self.total += n
+            self._bump("type", event.get("type"), n)
+            self._bump("loc", event.get("loc"), n)
+            self._bump("hour", datetime.datetime.fromtimestamp(event["ts"]).hour, n)
+            self._bump("camera", event.get("camera"), n)
+
+    def load(self, conn):
+        # 시작할 때 한 번만 DB 에서 GROUP BY 로 채움 (이후로는 전체 스캔 없음). 원본 + 보존 정책으로 합쳐진 집계
+        with self._lock:
+            self.total = conn.execute("SELECT (SELECT COUNT(*) FROM events) + (SELECT IFNULL(SUM(count), 0) FROM event_rollups)").fetchone()[0]
+            for dim in ("type", "loc", "camera"):
+                for key, n in conn.execute(f"SELECT {dim}, COUNT(*) FROM events GROUP BY 1 UNION ALL "
+                                           f"SELECT NULLIF({dim}, ''), SUM(count) FROM event_rollups GROUP BY 1").fetchall():
+                    self._bump(dim, key, n)
+            for key, n in conn.execute(f"SELECT {LOCAL_HOUR.format('ts')}, COUNT(*) FROM events GROUP BY 1 UNION ALL "
+                                       f"SELECT {LOCAL_HOUR.format('start')}, SUM(count) FROM event_rollups WHERE period = 'hour' GROUP BY 1 UNION ALL "
+                                       "SELECT hour, count FROM event_hour_totals").fetchall():
+                self._bump("hour", key, n)
+
+    def count(self, dim, key):
+        return self.counts[dim].get(key, 0)
+
+    def snapshot(self):
+        with self._lock:
+            peak = self.top["hour"]
+            return {"total": self.total,
+                    "peak_time": f"{peak:02d}:00-{(peak + 1) % 24:02d}:00" if peak is not None else "-",
+                    "most_place": self.top["loc"] or "-", "most_action": self.top["type"] or "-",
+                    "by_type": dict(self.counts["type"]), "by_loc": dict(self.counts["loc"]),
+                    "by_hour": [self.counts["hour"].get(h, 0) for h in range(24)],
+                    "by_camera": dict(self.counts["camera"])}
+
+EVENT_ROW_ERRORS = (sqlite3.Error, OverflowError, ValueError, TypeError) # 한 행만 버리면 되는 저장 오류
+
+class IngestBatch:
+    # 엣지 한 곳에서 온 이벤트 묶음 (writer 스레드가 저장 후 accepted 채우고 done set)
+    def __init__(self, site):
+        self.site = site
+        self.events = []
+        self.accepted = []
+        self.done = threading.Event()
+
+class EventStore:
+    # 위반 이벤트 저장소. id 는 append 시점에 바로 발급하고, DB 쓰기는 writer 스레드가 모아서 처리
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._id_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(EVENT_SCHEMA)
+        existing = [r[1] for r in conn.execute("PRAGMA table_info(events)")]
+        for column, kind in EVENT_MIGRATIONS.items():
+            if column not in existing: conn.execute(f"ALTER TABLE events ADD COLUMN {column} {kind}")
+        # 중앙 서버: 엣지에서 받은 이벤트는 (site, 엣지 쪽 id) 로 한 번만 저장 (로컬 이벤트는 둘 다 NULL 이라 제약 없음)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_src ON events(site, src_id)")
+        if conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0:
+            seed_ts = datetime.datetime(2025, 1, 3, 10, 0).timestamp()
+            rows = [(i, seed_ts, *(log.get(c) for c in EVENT_COLUMNS[2:])) for i, log in enumerate(initial_logs(), 1)]
+            conn.executemany(f"INSERT INTO events VALUES ({','.join('?' * len(EVENT_COLUMNS))})", rows)
+            conn.commit()
+        self.next_id = max((conn.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0) + 1, int(self.get_meta("next_id", 1)))
+        self.detailed = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] # 원본으로 남아 있는 이벤트 수
+        self.compacted = 0 # 이번 실행에서 집계로 합친 이벤트 수
+        self.pinned = None # 이 id 보다 큰 원본은 보존 정책으로 지우지 않음 (엣지: 아직 중앙에 못 보낸 이벤트)
+        self.insights = Insights()
+        self.insights.load(conn)
+        self.recent = RecentEvents(min(RECENT_EVENTS, EVENT_RETENTION or RECENT_EVENTS))
+        rows = conn.execute("SELECT * FROM events ORDER BY id DESC LIMIT ?", (self.recent.records.maxlen,)).fetchall()
+        self.recent.extend([dict(r) for r in rows])
+        self.recent.complete = len(rows) == self.detailed
+
+    def _conn(self):
+        # sqlite3 연결은 스레드마다 따로
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def append(self, event, ts=None, on_id=None):
+        # AI 스레드에서 호출: 큐에 넣기만 하고 바로 리턴
+        # id 발급과 큐 넣기를 같은 잠금 안에서 -> writer 가 id 순서대로 받음 (/ingest 스레드와 섞여도 since_id 폴링이 건너뛰는 id 없음)
+        # on_id(id, ts): 큐에 넣기 전에 호출 (클립 예약이 대시보드에 이벤트가 보이는 것보다 먼저)
+        with self._id_lock:
+            event = {**event, "id": self.next_id, "ts": ts or time.time()}
+            self.next_id += 1
+            if on_id: on_id(event["id"], event["ts"])
+            self._queue.put(event)
+        self.insights.add(event)
+        return event
+
+    def ingest(self, site, events, timeout=10.0):
+        # 중앙 서버 /ingest 에서 호출: 엣지 배치를 writer 큐로 보내고 DB 에 들어갈 때까지 대기
+        # id 는 append 와 같은 잠금 안에서 발급 + 큐에 넣음 (로컬 이벤트와 id 순서 유지). 중복이면 그 id 는 비어 있게 됨
+        batch = IngestBatch(site)
+        with self._id_lock:
+            for e in events:
+                batch.events.append({**{c: e.get(c) for c in EVENT_COLUMNS[1:10]}, "id": self.next_id, "site": site, "src_id": e["id"],
+                                     "camera": f"{site}/{e.get('camera')}"})
+                self.next_id += 1
+            self._queue.put(batch)
+        if not batch.done.wait(timeout): raise TimeoutError("이벤트 DB 쓰기 지연")
+        return batch
+
+    def writer_loop(self):
+        sql = f"INSERT INTO events ({','.join(EVENT_COLUMNS)}) VALUES ({','.join('?' * len(EVENT_COLUMNS))})"
+        while not (stop_event.is_set() and self._queue.empty()):
+            try: batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty: continue
+            while len(batch) < 1000:
+                try: batch.append(self._queue.get_nowait())
+                except queue.Empty: break
+            # writer 는 하나뿐이라 어떤 예외에도 멈추면 안 됨: 잘못된 행/묶음은 로그만 남기고 다음 묶음 계속, /ingest 대기는 항상 풀어줌
+            try: self._write(batch, sql)
+            except Exception as e: print(f"⚠️ 이벤트 DB 쓰기 실패 ({len(batch)}개 묶음 생략): {e!r}")
+            finally:
+                for item in batch:
+                    if isinstance(item, IngestBatch): item.done.set()
+                    self._queue.task_done()
+            mark_changed() # DB 에 들어간 뒤에 대시보드 갱신
+
+    def _write(self, batch, sql):
+        conn = self._conn()
+        local = [e for e in batch if not isinstance(e, IngestBatch)]
+        try: conn.executemany(sql, [tuple(e.get(c) for c in EVENT_COLUMNS) for e in local])
+        except EVENT_ROW_ERRORS: # 한 건 때문에 묶음 전체를 버리지 않게 한 건씩 다시
+            conn.rollback()
+            local = self._insert_rows(conn, sql, local)
+        stored = {e["id"] for e in local}
+        ingested = [b for b in batch if isinstance(b, IngestBatch)]
+        for b in ingested: b.accepted = self._insert_rows(conn, "INSERT OR IGNORE" + sql[6:], b.events)
+        conn.commit()
+        written = [e for item in batch for e in (item.accepted if isinstance(item, IngestBatch) else (item,) if item["id"] in stored else ())] # 큐 순서 = id 순서
+        with self._id_lock: self.detailed += len(written)
+        self.recent.extend(written)
+        for b in ingested:
+            for e in b.accepted: self.insights.add(e) # 중복으로 무시된 건 집계에서도 제외
+
+    def _insert_rows(self, conn, sql, events):
+        # 실제로 들어간 행만 돌려줌 (INSERT OR IGNORE 로 무시된 중복, 저장할 수 없는 행 제외)
+        inserted = []
+        for e in events:
+            try:
+                if conn.execute(sql, tuple(e.get(c) for c in EVENT_COLUMNS)).rowcount: inserted.append(e)
+            except EVENT_ROW_ERRORS as err: print(f"⚠️ 이벤트 {e.get('id')} 저장 생략: {err!r}")
+        return inserted
+
+    def flush(self, timeout=5.0):
+        # 지금까지 큐에 넣은 이벤트가 DB 에 들어갈 때까지 대기: 빈 IngestBatch 를 뒤에 넣고 writer 가 done 을 set 하면 끝
+        if not self._queue.unfinished_tasks: return
+        marker = IngestBatch(None)
+        self._queue.put(marker)
+        marker.done.wait(timeout)
+
+    def set_clip(self, ids, path):
+        # 클립 writer 스레드에서 호출. 이벤트가 아직 큐에 있으면 먼저 DB 에 들어가게 함
+        self.flush()
+        conn = self._conn()
+        conn.execute(f"UPDATE events SET clip = ? WHERE id IN ({','.join('?' * len(ids))})", [path, *ids])
+        conn.commit()
+        self.recent.set_clip(set(ids), path)
+        mark_changed()
+
+    def get_meta(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+        conn.commit()
+
+    def get(self, event_id):
+        row = self._conn().execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+        return dict(row) if row else None
+
+    def compact(self, now=None):
+        # 보존 정책 적용 (compact 스레드/벤치마크에서 호출): 한도를 넘은 오래된 원본 -> 시간별 집계, 오래된 시간별 집계 -> 일별
+        # 원본 이벤트의 합계는 그대로라 Insights/total 은 바뀌지 않음
+        # (중앙 서버: 집계로 합쳐진 뒤에 같은 엣지 이벤트가 재전송되면 다시 들어감. 재전송은 몇 초 안이라 보존 한도보다 훨씬 짧음)
+        now = time.time() if now is None else now
+        conn = self._conn()
+        cutoff = 0
+        if EVENT_RETENTION and self.detailed > EVENT_RETENTION:
+            row = conn.execute("SELECT id FROM events ORDER BY id LIMIT 1 OFFSET ?", (self.detailed - EVENT_RETENTION - 1,)).fetchone()
+            cutoff = row[0] if row else 0
+        if EVENT_RETENTION_DAYS:
+            row = conn.execute("SELECT MAX(id) FROM events WHERE ts < ?", (now - EVENT_RETENTION_DAYS * 86400,)).fetchone()
+            cutoff = max(cutoff, row[0] or 0)
+        if self.pinned is not None: cutoff = min(cutoff, self.pinned)
+        rolled = 0
+        if cutoff:
+            self.set_meta("next_id", self.next_id) # 마지막 이벤트까지 지워져도 id 를 다시 쓰지 않게
+            conn.execute(ROLLUP_EVENTS_SQL, (cutoff,))
+            rolled = conn.execute("DELETE FROM events WHERE id <= ?", (cutoff,)).rowcount
+            conn.commit()
+            with self._id_lock: self.detailed -= rolled
+            self.compacted += rolled
+            self.recent.discard(cutoff)
+        hour_cutoff = now - ROLLUP_HOURLY_DAYS * 86400
+        conn.execute(HOUR_TOTALS_SQL, (hour_cutoff,))
+        conn.execute(ROLLUP_HOURS_SQL, (hour_cutoff,))
+        merged = conn.execute("DELETE FROM event_rollups WHERE period = 'hour' AND start < ?", (hour_cutoff,)).rowcount
+        conn.commit()
+        return rolled, merged
+
+    def compact_loop(self):
+        while True:
+            self.compact()
+            if stop_event.wait(COMPACT_INTERVAL): return
+
+    @property
+    def total(self):
+        return self.insights.total
+
+    def _where(self, since_id=None, before_id=None, type=None, loc=None, date=None, ts="ts"):
+        clauses, params = [], []
+        if since_id: clauses.append("id > ?"); params.append(since_id)
+        if before_id: clauses.append("id < ?"); params.append(before_id)
+        if type: clauses.append("type = ?"); params.append(type)
+        if loc: clauses.append("loc = ?"); params.append(loc)
+        if date:
+            start = datetime.datetime.strptime(date, "%Y-%m-%d")
+            clauses.append(f"{ts} >= ? AND {ts} < ?")
+            params += [start.timestamp(), (start + datetime.timedelta(days=1)).timestamp()]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, since_id=None, before_id=None, limit=200, type=None, loc=None, date=None, newest_first=True):
+        if not (before_id or date): # 대시보드 폴링은 메모리 창에서
+            page = self.recent.query(since_id, limit, type, loc, newest_first)
+            if page is not None: return page
+        where, params = self._where(since_id, before_id, type, loc, date)
+        order = "DESC" if newest_first else "ASC"
+        # 날짜 필터는 ts 인덱스를 타도록 정렬 기준도 ts 로 (id 와 ts 는 같은 순서로 증가)
+        order_by = f"ts {order}, id {order}" if date else f"id {order}"
+        rows = self._conn().execute(f"SELECT * FROM events{where} ORDER BY {order_by} LIMIT ?", params + [limit]).fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self, type=None, loc=None, date=None):
+        # 전체 기간 건수 (집계로 합쳐진 이벤트 포함)
+        if not (loc or date): return self.total if not type else self.insights.count("type", type)
+        if not (type or date): return self.insights.count("loc", loc)
+        where, params = self._where(type=type, loc=loc, date=date, ts="start")
+        rolled = self._conn().execute(f"SELECT IFNULL(SUM(count), 0) FROM event_rollups{where}", params).fetchone()[0]
+        return self.count_detailed(type, loc, date) + rolled
+
+    def count_detailed(self, type=None, loc=None, date=None):
+        # 원본으로 남아 있어서 목록으로 볼 수 있는 건수
+        if not (type or loc or date): return self.detailed
+        where, params = self._where(type=type, loc=loc, date=date)
+        return self._conn().execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    def history(self, period="day", days=30, type=None, loc=None, now=None):
+        # 기간별 건수 [(구간 시작 ts, 건수)]: 원본 + 집계. 시간 단위는 시간별 집계가 남아 있는 기간(ROLLUP_HOURLY_DAYS)까지만 정확
+        since = (time.time() if now is None else now) - days * 86400
+        bucket = LOCAL_DAY if period == "day" else "CAST({} / 3600 AS INTEGER) * 3600"
+        where, params = self._where(type=type, loc=loc)
+        where = (where + " AND" if where else " WHERE") + " {} >= ?"
+        rollup_where = where.format("start") + ("" if period == "day" else " AND period = 'hour'")
+        sql = (f"SELECT bucket, SUM(n) FROM (SELECT {bucket.format('ts')} AS bucket, COUNT(*) AS n FROM events{where.format('ts')} GROUP BY 1 "
+               f"UNION ALL SELECT {bucket.format('start')}, SUM(count) FROM event_rollups{rollup_where} GROUP BY 1) GROUP BY 1 ORDER BY 1")
+        return self._conn().execute(sql, params + [since] + params + [since]).fetchall()
+
+store = None # startup 에서 생성
+
+# === [6-1] 엣지 -> 중앙 이벤트 집계 ===
+# 건물마다 엣지 서버(카메라 + AI)를 두고, 중앙 서버 하나가 모든 건물의 이벤트/구역 상태를 모아 대시보드 하나로 보여줌
+#   중앙) ROLE=central python real_server.py --port 8000
+#   엣지) ROLE=edge CENTRAL_URL=http://127.0.0.1:8000 SITE_ID=engineering CAMERA_SOURCES="공학관=0" python real_server.py --port 8001
+# 한 PC 에서 시험할 때는 EVENT_DB/CLIP_DIR 을 인스턴스마다 다르게, 카메라는 synthetic:// 소스로
+# 엣지는 로컬 이벤트 DB 자체를 전송 버퍼로 사용: 중앙이 저장했다고 응답한 id 까지만 커서(meta.forward_cursor)를 옮김
+#   -> 중앙이 꺼져 있거나 엣지가 재시작돼도 유실 없음. 재전송은 중앙에서 (site, id) 로 걸러서 한 번만 반영
+ROLES = ("standalone", "edge", "central")
+ROLE = os.environ.get("ROLE", "standalone")
+CENTRAL_URL = os.environ.get("CENTRAL_URL", "").rstrip("/")
+SITE_ID = os.environ.get("SITE_ID", socket.gethostname())
+INGEST_TOKEN = os.environ.get("INGEST_TOKEN", "") # 설정하면 중앙/엣지 모두 같은 값 (X-Ingest-Token 헤더)
+INGEST_MAX_BYTES = 16 * 1024 * 1024 # 압축 해제 후 배치 크기 상한
+FORWARD_BATCH = int(os.environ.get("FORWARD_BATCH", "500")) # 한 번에 보내는 이벤트 수
+FORWARD_INTERVAL = float(os.environ.get("FORWARD_INTERVAL", "1.0")) # 전송 주기(초)
+FORWARD_HEARTBEAT = 10 # 새 이벤트/상태 변화가 없어도 이 간격(초)으로 구역 상태 전송 (중앙의 last_seen 갱신)
+FORWARD_MAX_BACKOFF = 60 # 전송 실패 시 재시도 간격 상한(초, 실패할 때마다 2배)
+FORWARD_REJECT_CODES = (400, 413, 422) # 중앙이 데이터를 거부한 응답 -> 반씩 나눠 보내서 거부된 이벤트만 격리 (401/404 등 설정 오류는 재시도)
+FORWARD_TIMEOUT = 10
+if ROLE not in ROLES: raise ValueError(f"ROLE 은 {', '.join(ROLES)} 중 하나: {ROLE}")
+if ROLE == "edge" and not CENTRAL_URL: raise ValueError("ROLE=edge 는 CENTRAL_URL 이 필요합니다")
+
+sites = {} # 중앙: site -> {"last_seen", "events", "duplicates", "locations"}
+
+class EventForwarder:
+    def __init__(self, store, url, site):
+        self.store = store
+        self.url = url + "/ingest"
+        self.site = site
+        # 처음 엣지로 켤 때는 기존 이벤트(초기 데이터 포함)는 보내지 않고 지금부터
+        self.cursor = int(store.get_meta("forward_cursor", store.next_id - 1))
+        store.set_meta("forward_cursor", self.cursor)
+        store.pinned = self.cursor # 아직 못 보낸 이벤트는 보존 정책으로 지우지 않음
+        self.sent = 0
+        self.quarantined = json.loads(store.get_meta("forward_quarantine", "[]")) # 중앙이 거부해서 건너뛴 이벤트 id (최근 것만)
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def backlog(self):
+        return max(self.store.next_id - 1 - self.cursor, 0)
+
+    def locations(self):
+        # 이 엣지 카메라가 보는 구역만 (다른 건물 구역을 기본값 '정상' 으로 덮어쓰지 않게)
+        return {c.location: locations_status[c.location] for c in cameras.values() if c.location in locations_status}
+
+    def post(self, events):
+        body = gzip.compress(json.dumps({"site": self.site, "events": events, "locations": self.locations()}, ensure_ascii=False).encode())
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        if INGEST_TOKEN: headers["X-Ingest-Token"] = INGEST_TOKEN
+        request = urllib.request.Request(self.url, data=body, headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=FORWARD_TIMEOUT) as response:
+            return json.loads(response.read())
+
+    def send(self, events):
+        # 중앙이 배치를 데이터 오류(4xx)로 거부하면 반씩 나눠 다시 보내서, 거부되는 이벤트만 격리하고 나머지는 전송
+        try:
+            self.post([{c: e[c] for c in EVENT_COLUMNS[:10]} for e in events])
+        except urllib.error.HTTPError as e:
+            if e.code not in FORWARD_REJECT_CODES or not events: raise
+            if len(events) == 1: return self.quarantine(events[0], e)
+            mid = len(events) // 2
+            self.send(events[:mid]); self.send(events[mid:])
+
+    def quarantine(self, event, error):
+        self.quarantined = (self.quarantined + [event["id"]])[-100:]
+        self.store.set_meta("forward_quarantine", json.dumps(self.quarantined))
+        print(f"⚠️ 중앙 서버가 이벤트 {event['id']} 를 거부 ({error.code}), 건너뜀: {str(event)[:200]}")
+
+    def run(self):
+        delay, sent_version, last_sent = 0, -1, 0
+        while not stop_event.wait(delay):
+            events = self.store.query(since_id=self.cursor, limit=FORWARD_BATCH, newest_first=False)
+            version = state_version
+            if not events and version == sent_version and time.time() - last_sent < FORWARD_HEARTBEAT:
+                delay = FORWARD_INTERVAL
+                continue
+            try:
+                self.send(events)
+            except (OSError, ValueError) as e: # 연결 실패/타임아웃/HTTP 오류 -> 커서 그대로 두고 재시도 (이미 보낸 앞부분은 중앙에서 중복 제거)
+                self.failures += 1
+                self.last_error = str(e)
+                delay = min(max(delay * 2, FORWARD_INTERVAL), FORWARD_MAX_BACKOFF)
+                print(f"⚠️ 중앙 서버 전송 실패 ({self.last_error}), {delay:.0f}초 후 재시도 (대기 {self.backlog}건)")
+                continue
+            if events:
+                self.cursor = self.store.pinned = events[-1]["id"]
+                self.store.set_meta("forward_cursor", self.cursor)
+                self.sent += len(events)
+            self.last_error = None
+            sent_version, last_sent = version, time.time()
+            delay = 0 if len(events) == FORWARD_BATCH else FORWARD_INTERVAL # 밀린 게 있으면 바로 다음 배치
+
+forwarder = None # ROLE=edge 일 때 startup 에서 생성
+
+def parse_ingest(body, encoding):
+    # gzip 해제는 상한까지만 (압축 폭탄 방지)
+    if encoding == "gzip":
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = inflater.decompress(body, INGEST_MAX_BYTES)
+        if inflater.unconsumed_tail: raise HTTPException(status_code=413, detail=f"배치가 {INGEST_MAX_BYTES} 바이트를 넘습니다")
+    payload = json.loads(body)
+    site, events, locations = str(payload["site"]), payload.get("events", []), payload.get("locations", {})
+    if not isinstance(events, list): raise ValueError("events 는 목록이어야 합니다")
+    for e in events: check_ingest_event(e)
+    locations = {str(loc): {k: st.get(k) for k in ("status", "last_action", "type")} for loc, st in locations.items()}
+    for st in locations.values():
+        if not all(v is None or (isinstance(v, str) and len(v) <= INGEST_MAX_TEXT) for v in st.values()): raise ValueError(f"잘못된 위치 상태: {st}")
+    return site, events, locations
+
+INGEST_MAX_TEXT = 200 # 문자열 컬럼 최대 길이
+INGEST_TEXT_COLUMNS = ("date", "time", "type", "loc", "zone", "status", "camera")
+INGEST_MAX_TS = 32503680000 # 3000-01-01: datetime.fromtimestamp 가 받는 범위 안
+
+def is_int(v, lo, hi):
+    return isinstance(v, int) and not isinstance(v, bool) and lo <= v <= hi
+
+def check_ingest_event(e):
+    # writer 스레드까지 가기 전에 SQLite/집계가 받을 수 있는 값인지 확인 (잘못되면 400, 배치 전체 거부)
+    if not isinstance(e, dict): raise ValueError(f"잘못된 이벤트: {e!r}")
+    ts = e.get("ts")
+    ok = (is_int(e.get("id"), 0, 2**63 - 1)
+          and isinstance(ts, (int, float)) and not isinstance(ts, bool) and math.isfinite(ts) and 0 <= ts <= INGEST_MAX_TS
+          and (e.get("conf") is None or is_int(e.get("conf"), 0, 100))
+          and all(e.get(c) is None or (isinstance(e.get(c), str) and len(e.get(c)) <= INGEST_MAX_TEXT) for c in INGEST_TEXT_COLUMNS))
+    if not ok: raise ValueError(f"잘못된 이벤트: {str(e)[:200]}")
+
+def ingest_batch(site, events, locations):
+    batch = store.ingest(site, events)
+    info = sites.setdefault(site, {"events": 0, "duplicates": 0})
+    info.update(last_seen=time.time(), locations=sorted(locations))
+    info["events"] += len(batch.accepted)
+    info["duplicates"] += len(batch.events) - len(batch.accepted)
+    changed = False
+    for loc, status in locations.items():
+        status["site"] = site
+        if locations_status.get(loc) != status:
+            locations_status[loc] = status
+            changed = True
+    if changed: mark_changed()
+    return {"site": site, "accepted": len(batch.accepted), "duplicates": len(batch.events) - len(batch.accepted)}
 
 @app.on_event("startup")
-def startup_event(): stop_event.clear(); threading.Thread(target=run_ai_loop, daemon=True).start()
+def startup_event():
+    global store, forwarder
+    stop_event.clear()
+    store = EventStore(EVENT_DB)
+    threading.Thread(target=store.writer_loop, daemon=True).start()
+    threading.Thread(target=store.compact_loop, daemon=True).start()
+    threading.Thread(target=audio.run, daemon=True).start()
+    threading.Thread(target=clip_writer.run, daemon=True).start()
+    if ROLE == "edge":
+        forwarder = EventForwarder(store, CENTRAL_URL, SITE_ID)
+        threading.Thread(target=forwarder.run, daemon=True).start()
+        print(f"📡 엣지 모드: {SITE_ID} -> {CENTRAL_URL}")
+    threading.Thread(target=run_ai_loop, daemon=True).start()
 @app.on_event("shutdown")
 def shutdown_event(): stop_event.set()
+def clip_state(event_id, path):
+    # 대시보드에 보낼 클립 상태 (서버 파일 경로는 보내지 않음): ready / pending(녹화·저장 중) / None(없음: CLIP_FPS=0, 메모리 상한으로 생략, 저장 실패, 엣지 이벤트)
+    if path: return "ready"
+    return "pending" if event_id in clip_writer.pending_ids else None
+
+def public_events(page):
+    return [{**e, "clip": clip_state(e["id"], e["clip"])} for e in page]
+
+def build_status(since_id, limit, type=None, loc=None):
+    # since_id 이후의 새 로그만 (오래된 것부터 limit 건씩) + 현재 상태 스냅샷
+    # since_id=0 (첫 로딩) 이면 전체가 아니라 최신 limit 건만
+    if since_id <= 0:
+        page = store.query(limit=limit, type=type, loc=loc)
+        has_more = False
+    else:
+        page = store.query(since_id=since_id, limit=limit + 1, type=type, loc=loc, newest_first=False)
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+    return {"locations": locations_status, "monitor": current_monitor_state,
+            "insights": store.insights.snapshot(),
+            "cameras": {c.id: c.location for c in cameras.values()},
+            "logs": public_events(page), "last_id": page[0]["id"] if page else max(since_id, 0),
+            "has_more": has_more, "total": store.total, "detailed": store.detailed,
+            "pending_clips": sorted(clip_writer.pending_ids.copy())}
+
 @app.get("/status_json")
-def get_status_json(): return {"locations": locations_status, "monitor": current_monitor_state, "logs": fake_logs, "insights": insights_data}
+def get_status_json(request: Request, since_id: int = 0, limit: int = Query(200, ge=1, le=1000),
+                    type: str = None, loc: str = None):
+    # 변화 없으면 304
+    etag = f'"{state_version}-{since_id}-{limit}-{type}-{loc}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(build_status(since_id, limit, type, loc), headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def current_rss():
+    # 리눅스는 /proc 에서 현재 값, 그 외에는 최대 RSS 로 대체
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+def render_metrics():
+    lines = []
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    def cam_labels(c):
+        loc = c.location.replace("\\", "\\\\").replace('"', '\\"')
+        return f'camera="{c.id}",location="{loc}"'
+
+    cams = list(cameras.values())
+    metric("cityeye_frames_captured_total", "counter", "캡처된 프레임 수", [(cam_labels(c), c.buffer.captured) for c in cams])
+    metric("cityeye_frames_dropped_total", "counter", "추론 전에 최신 프레임으로 덮어써져 버려진 프레임 수", [(cam_labels(c), c.buffer.dropped) for c in cams])
+    metric("cityeye_frames_processed_total", "counter", "추론/후처리까지 마친 프레임 수", [(cam_labels(c), c.buffer.processed) for c in cams])
+    metric("cityeye_inference_skipped_total", "counter", "움직임이 없어 포즈 추론을 생략한 프레임 수", [(cam_labels(c), c.gate.skipped) for c in cams])
+    metric("cityeye_inference_skip_ratio", "gauge", "움직임 게이트 통과 프레임 중 추론 생략 비율", [(cam_labels(c), round(c.gate.skip_ratio, 4)) for c in cams])
+    metric("cityeye_pose_predicted_total", "counter", "POSE_STRIDE 로 추론 대신 트래커 예측을 쓴 프레임 수", [(cam_labels(c), c.predicted) for c in cams])
+    metric("cityeye_tracked_persons", "gauge", "현재 추적 중인 인원", [(cam_labels(c), int(c.tracker.matched.sum())) for c in cams])
+    metric("cityeye_capture_to_publish_latency_ms", "gauge", "마지막 프레임의 캡처~송출 지연", [(cam_labels(c), round(c.latency_ms, 2)) for c in cams])
+    metric("cityeye_stream_clients", "gauge", "/video_feed 시청자 수", [(cam_labels(c), c.hub.viewers) for c in cams])
+    metric("cityeye_stream_profiles", "gauge", "인코딩 중인 스트림 프로필 수", [(cam_labels(c), len(c.hub.profiles)) for c in cams])
+    metric("cityeye_stream_encoded_frames_total", "counter", "JPEG 인코딩한 프레임 수 (프로필당 1회, 시청자 수와 무관)", [(cam_labels(c), c.hub.encoded_frames) for c in cams])
+    metric("cityeye_stream_encoded_bytes_total", "counter", "인코딩된 MJPEG 바이트 수", [(cam_labels(c), c.hub.encoded_bytes) for c in cams])
+    metric("cityeye_stream_sent_frames_total", "counter", "시청자들에게 보낸 프레임 수 합계", [(cam_labels(c), c.hub.sent_frames) for c in cams])
+    metric("cityeye_stream_skipped_frames_total", "counter", "느린 시청자가 최신 프레임만 받느라 건너뛴 프레임 수", [(cam_labels(c), c.hub.skipped_frames) for c in cams])
+    metric("cityeye_status_stream_clients", "gauge", "/status_stream 구독 대시보드 수", [("", len(status_notifier))])
+    metric("cityeye_audio_announcements_skipped_total", "counter", "쿨다운으로 합쳐지거나 큐가 가득 차 생략된 안내 방송",
+           [('reason="coalesced"', audio.coalesced), ('reason="queue_full"', audio.dropped)])
+    metric("cityeye_clip_buffer_bytes", "gauge", "사전 녹화 링 버퍼 크기", [(cam_labels(c), c.recorder.ring_bytes) for c in cams if c.recorder])
+    metric("cityeye_clip_pending_bytes", "gauge", "녹화 중 + 저장 대기 클립이 잡고 있는 메모리", [("", clip_writer.pending_bytes)])
+    metric("cityeye_clips_total", "counter", "위반 클립 저장/생략 수", [('result="written"', clip_writer.written), ('result="dropped"', clip_writer.dropped)])
+    if resource:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        metric("process_cpu_seconds_total", "counter", "서버 프로세스 CPU 시간 (user+sys, 추론 워커 프로세스 제외)", [("", round(usage.ru_utime + usage.ru_stime, 3))])
+    metric("process_resident_memory_bytes", "gauge", "서버 프로세스 메모리 (RSS)", [("", current_rss())])
+    if store is not None:
+        metric("cityeye_events_total", "counter", "저장된 위반 이벤트 수", [("", store.total)])
+        metric("cityeye_events_detailed", "gauge", "원본으로 남아 있는 이벤트 수 (EVENT_RETENTION 한도)", [("", store.detailed)])
+        metric("cityeye_events_compacted_total", "counter", "보존 정책으로 시간별 집계에 합친 이벤트 수", [("", store.compacted)])
+        metric("cityeye_recent_events", "gauge", "메모리 창(RECENT_EVENTS)에 있는 이벤트 수", [("", len(store.recent))])
+    if forwarder is not None:
+        metric("cityeye_forward_events_total", "counter", "중앙 서버로 보낸 이벤트 수", [("", forwarder.sent)])
+        metric("cityeye_forward_failures_total", "counter", "중앙 서버 전송 실패 횟수", [("", forwarder.failures)])
+        metric("cityeye_forward_backlog", "gauge", "아직 중앙 서버에 보내지 못한 이벤트 수", [("", forwarder.backlog)])
+    if sites:
+        site_items = list(sites.items())
+        site_label = lambda site: 'site="' + site.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        metric("cityeye_ingest_events_total", "counter", "엣지에서 받은 이벤트 수 (duplicate: 재전송으로 무시)",
+               [(f'{site_label(site)},result="accepted"', info["events"]) for site, info in site_items]
+               + [(f'{site_label(site)},result="duplicate"', info["duplicates"]) for site, info in site_items])
+        metric("cityeye_site_last_seen_seconds", "gauge", "엣지별 마지막 배치 수신 후 경과 시간", [(site_label(site), round(time.time() - info["last_seen"], 1)) for site, info in site_items])
+
+    lines.append("# HELP cityeye_stage_seconds 파이프라인 단계별 처리 시간")
+    lines.append("# TYPE cityeye_stage_seconds histogram")
+    for stage, hist in perf.histograms.items():
+        lines += hist.prometheus("cityeye_stage_seconds", f'stage="{stage}"')
+    lines.append("# HELP cityeye_persons_per_frame 프레임당 검출 인원")
+    lines.append("# TYPE cityeye_persons_per_frame histogram")
+    lines += persons_per_frame.prometheus("cityeye_persons_per_frame")
+    return "\n".join(lines) + "\n"
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/insights")
+def get_insights(): return store.insights.snapshot()
+
+@app.get("/logs")
+def get_logs(type: str = None, loc: str = None, date: str = None, before_id: int = None,
+             limit: int = Query(100, ge=1, le=1000)):
+    # 알림 센터 목록: 서버에서 필터링, before_id 로 과거 페이지
+    page = store.query(before_id=before_id, limit=limit, type=type, loc=loc, date=date)
+    return {"logs": public_events(page), "count": store.count(type=type, loc=loc, date=date),
+            "detailed": store.count_detailed(type=type, loc=loc, date=date)} # 목록으로 더 불러올 수 있는 건수 (오래된 건 집계로만 남음)
+
+@app.get("/history")
+def get_history(period: str = "day", days: int = Query(30, ge=1, le=3650), type: str = None, loc: str = None):
+    # 기간별 위반 건수 (보존 정책으로 원본이 지워진 기간도 집계로)
+    if period not in ("hour", "day"): raise HTTPException(status_code=400, detail=f"period 는 hour 또는 day: {period}")
+    rows = store.history(period, days, type, loc)
+    fmt = "%Y-%m-%d" if period == "day" else "%Y-%m-%d %H:00"
+    return {"period": period, "buckets": [{"start": start, "label": time.strftime(fmt, time.localtime(start)), "count": n} for start, n in rows]}
+
+async def status_events(since_id):
+    # 상태가 바뀔 때만 전송. 여러 번 바뀌어도 보낼 때의 최신 상태 한 번으로 합쳐짐 (coalescing)
+    entry = status_notifier.subscribe()
+    _, event = entry
+    seen = -1
+    try:
+        while not stop_event.is_set():
+            if state_version == seen:
+                event.clear()
+                if state_version == seen:
+                    try: await asyncio.wait_for(event.wait(), 15.0)
+                    except asyncio.TimeoutError: yield ": ping\n\n" # 프록시/터널 연결 유지
+                continue
+            seen = state_version
+            has_more = True
+            while has_more:
+                # SQLite 조회가 있을 수 있으므로 스레드풀에서 (이벤트 루프/다른 스트림을 막지 않게)
+                body = await asyncio.get_running_loop().run_in_executor(None, build_status, since_id, 500)
+                since_id, has_more = body["last_id"], body["has_more"]
+                yield f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+    finally:
+        status_notifier.unsubscribe(entry)
+
+@app.get("/status_stream")
+async def status_stream(since_id: int = 0):
+    return StreamingResponse(status_events(since_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+@app.get("/pipeline_stats")
+def get_pipeline_stats():
+    return {c.id: {"location": c.location, "captured": c.buffer.captured, "dropped": c.buffer.dropped,
+                   "processed": c.buffer.processed, "latency_ms": round(c.latency_ms, 1),
+                   "inference_skipped": c.gate.skipped, "skip_ratio": round(c.gate.skip_ratio, 3),
+                   "pose_predicted": c.predicted, "tracks": c.tracker.ids[c.tracker.matched].tolist(),
+                   "motion": round(c.gate.motion, 4),
+                   "streams": {p.name: {"viewers": len(p.notifier), "encoded": p.encoded_frames, "sent": p.sent_frames,
+                                        "skipped": p.skipped_frames} for p in list(c.hub.profiles.values())}} for c in cameras.values()}
+@app.post("/control/{camera}/{action}")
+def control_camera(camera: str, action: str):
+    # 관제 화면/외부 시스템에서 트리거 및 알림 해제. 실제 적용은 AI 루프가 다음 프레임에서
+    if camera not in cameras: raise HTTPException(status_code=404, detail=f"알 수 없는 카메라: {camera}")
+    if action not in CONTROL_ACTIONS: raise HTTPException(status_code=400, detail=f"지원하지 않는 동작: {action} ({', '.join(CONTROL_ACTIONS)})")
+    commands.put((camera, action))
+    frame_ready.set()
+    return {"ok": True, "camera": camera, "action": action, "queued": commands.qsize()}
+def open_feed(cam, width, quality, fps):
+    key = cam.hub.admit(width, quality, fps)
+    if key is None:
+        raise HTTPException(status_code=503, detail=f"{cam.id}: 동시 스트림 프로필이 {MAX_STREAM_PROFILES}개를 넘었습니다. 기존 프로필 값을 사용하세요")
+    return StreamingResponse(cam.hub.stream(key), media_type="multipart/x-mixed-replace; boundary=frame")
+# 프로필: width(최대 폭, 0=원본), quality(JPEG 화질), fps(최대 fps, 0=제한 없음). 값은 STREAM_WIDTHS/QUALITIES/FPS 중 가장 가까운 것으로
 @app.get("/video_feed")
-def video_feed(): return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+async def video_feed(width: int = Query(0, ge=0, le=3840), quality: int = Query(STREAM_DEFAULT_QUALITY, ge=10, le=100),
+                     fps: int = Query(0, ge=0, le=60)):
+    return open_feed(primary_cam, width, quality, fps)
+@app.get("/video_feed/{camera}")
+async def camera_feed(camera: str, width: int = Query(0, ge=0, le=3840), quality: int = Query(STREAM_DEFAULT_QUALITY, ge=10, le=100),
+                      fps: int = Query(0, ge=0, le=60)):
+    if camera not in cameras: raise HTTPException(status_code=404, detail=f"알 수 없는 카메라: {camera}")
+    return open_feed(cameras[camera], width, quality, fps)
+@app.get("/clips/{event_id}")
+def get_clip(event_id: int):
+    # 이벤트에 연결된 위반 클립 (앞뒤 CLIP_PRE/POST_SECONDS 초)
+    if event_id in clip_writer.pending_ids: raise HTTPException(status_code=409, detail="클립 녹화/저장 중입니다. 잠시 후 다시 시도하세요")
+    event = store.get(event_id)
+    if event is None: raise HTTPException(status_code=404, detail=f"이벤트 없음: {event_id}")
+    if not event["clip"] or not os.path.exists(event["clip"]): raise HTTPException(status_code=404, detail="이 이벤트에는 클립이 없습니다")
+    return FileResponse(event["clip"], media_type="video/mp4", filename=os.path.basename(event["clip"]))
+@app.post("/ingest")
+async def ingest(request: Request):
+    # 중앙 서버: 엣지 이벤트 배치 수신 (gzip JSON). DB 에 저장한 뒤 응답 -> 엣지는 응답을 받아야 커서를 옮김
+    if ROLE != "central": raise HTTPException(status_code=404, detail="ROLE=central 서버에서만 받습니다")
+    if INGEST_TOKEN and request.headers.get("x-ingest-token") != INGEST_TOKEN: raise HTTPException(status_code=401, detail="잘못된 X-Ingest-Token")
+    try: site, events, locations = parse_ingest(await request.body(), request.headers.get("content-encoding"))
+    except (zlib.error, ValueError, KeyError, TypeError, AttributeError) as e: raise HTTPException(status_code=400, detail=f"잘못된 배치: {e}")
+    try: return await asyncio.get_running_loop().run_in_executor(None, ingest_batch, site, events, locations)
+    except TimeoutError as e: raise HTTPException(status_code=503, detail=str(e))
+@app.get("/sites")
+def get_sites():
+    # 중앙: 엣지별 마지막 수신 시각/이벤트 수, 엣지: 전송 상태
+    if forwarder is not None:
+        return {"role": ROLE, "site": SITE_ID, "central": CENTRAL_URL, "cursor": forwarder.cursor, "sent": forwarder.sent, "quarantined": forwarder.quarantined,
+                "backlog": forwarder.backlog, "failures": forwarder.failures, "last_error": forwarder.last_error}
+    now = time.time()
+    return {"role": ROLE, "sites": {site: {**info, "age_s": round(now - info["last_seen"], 1)} for site, info in list(sites.items())}}
 @app.get("/", response_class=HTMLResponse)
 def read_root():
     return """
@@ -383,6 +2703,8 @@ def read_root():
                     <div class="insight-summary">
                         <div class="summary-item"><div class="summary-val" id="total-count" style="color:#fff">0</div><div class="summary-label">전체 감지</div></div>
                         <div class="summary-item"><div class="summary-val" id="top-type" style="color:var(--accent-orange)">-</div><div class="summary-label">최다 발생</div></div>
+                        <div class="summary-item"><div class="summary-val" id="top-place" style="color:var(--accent-yellow)">-</div><div class="summary-label">최다 장소</div></div>
+                        <div class="summary-item"><div class="summary-val" id="peak-time" style="color:var(--accent-green); font-size:16px;">-</div><div class="summary-label">피크 시간</div></div>
                     </div>
                 </div>
             </div>
@@ -409,7 +2731,7 @@ def read_root():
                         <span><i class="fas fa-bullseye"></i> 정확도: <span id="monitor-conf">--%</span></span>
                     </div>
                     <div class="action-buttons">
-                        <button class="btn btn-secondary">알림 해제</button>
+                        <button class="btn btn-secondary" onclick="resetAlert()">알림 해제</button>
                         <button class="btn btn-primary">증거 저장</button>
                     </div>
                 </div>
@@ -427,6 +2749,7 @@ def read_root():
                     오늘의 알림 <br><span class="summary-count" id="alert-count">0</span> <span style="font-size:18px; font-weight:700;">건</span>
                 </div>
                 <div id="alert-list"></div>
+                <button class="btn btn-secondary" id="alert-more" style="width:100%; display:none;" onclick="loadMoreAlerts()">더보기</button>
             </div>
         </main>
 
@@ -441,6 +2764,8 @@ def read_root():
         <script>
             let currentPage = 'dashboard';
             let currentFilter = 'ALL';
+            let currentZone = null;
+            let cameraByLoc = {};
             let monitorZoneMap = {'정문': '정문', '공학관': '공학관', '도서관': '도서관', '학생회관': '학생회관', '기숙사': '기숙사'};
             let reverseZoneMap = Object.fromEntries(Object.entries(monitorZoneMap).map(a => a.reverse()));
             
@@ -484,7 +2809,7 @@ def read_root():
                 const feed = document.getElementById('cctv-feed');
                 const nav = document.querySelector('.bottom-nav');
                 if(page === 'monitoring') {
-                    feed.src = "/video_feed";
+                    feed.src = feedUrl();
                     nav.style.display = 'flex';
                 } else {
                     feed.src = ""; 
@@ -492,15 +2817,40 @@ def read_root():
                 }
             }
 
+            function feedProfile() {
+                // 화면 크기에 맞춰 폭을 줄이고, 데이터 절약/느린 회선이면 화질과 fps 도 낮춤 (같은 값끼리 서버 인코딩 공유)
+                let width = Math.min(1280, Math.ceil(window.innerWidth * (window.devicePixelRatio || 1) / 320) * 320);
+                let conn = navigator.connection || {};
+                let slow = conn.saveData || ['slow-2g', '2g', '3g'].includes(conn.effectiveType);
+                return slow ? `width=${Math.min(width, 640)}&quality=50&fps=8` : `width=${width}&quality=80&fps=0`;
+            }
+
+            function feedUrl() {
+                let cam = cameraByLoc[monitorZoneMap[currentZone]];
+                return (cam ? `/video_feed/${cam}` : "/video_feed") + "?" + feedProfile();
+            }
+
             function changeMonitorZone(shortZone) {
                 document.querySelectorAll('.bottom-nav .nav-item').forEach(el => el.classList.remove('active'));
                 event.currentTarget.classList.add('active');
+                currentZone = shortZone;
+                if(currentPage === 'monitoring') document.getElementById('cctv-feed').src = feedUrl();
+            }
+
+            async function resetAlert() {
+                // 관제 카드에 표시 중인(경고 중인) 카메라의 트리거 해제
+                let cam = cameraByLoc[document.getElementById('monitor-loc').innerText] || cameraByLoc[monitorZoneMap[currentZone]];
+                if(cam) await fetch(`/control/${cam}/reset`, {method: 'POST'});
+            }
+
+            function openClip(id) {
+                window.open(`/clips/${id}`, '_blank');
             }
 
             function filterAlerts(type) {
                 currentFilter = type;
                 document.querySelectorAll('.filter-chip').forEach(el => el.classList.toggle('active', el.innerText.includes(type) || (type==='ALL' && el.innerText==='전체')));
-                updateUI();
+                loadAlerts();
             }
 
             function getIcon(type) {
@@ -511,105 +2861,200 @@ def read_root():
                 return '<i class="fas fa-check-circle"></i>';
             }
 
-            async function updateUI() {
-                try {
-                    let res = await fetch('/status_json');
-                    let data = await res.json();
-
-                    let counts = {'흡연 감지':0, '무단 투기':0, '불법 주차':0, '전단지 부착':0};
-                    data.logs.forEach(log => {
-                        if(counts[log.type] !== undefined) counts[log.type]++;
-                    });
-                    
-                    if(statsChart) {
-                        statsChart.data.datasets[0].data = [
-                            counts['흡연 감지'], counts['무단 투기'], counts['불법 주차'], counts['전단지 부착']
-                        ];
-                        statsChart.update();
-                    }
-                    
-                    let total = data.logs.length;
-                    let maxType = Object.keys(counts).reduce((a, b) => counts[a] > counts[b] ? a : b);
-                    document.getElementById('total-count').innerText = total + "건";
-                    document.getElementById('top-type').innerText = maxType;
-
-                    let locHtml = "";
-                    for (const [loc, info] of Object.entries(data.locations)) {
-                        let badgeClass = info.status; 
-                        let icon = getIcon(info.type);
-                        locHtml += `
-                            <div class="card loc-card" onclick="changePage('monitoring');">
-                                <div class="loc-info">
-                                    <div class="loc-name">${loc}</div>
-                                    <div class="loc-desc">${info.status !== '정상' ? icon : ''} ${info.last_action}</div>
-                                </div>
-                                <span class="badge ${badgeClass}">${info.status}</span>
+            // 서버에서는 lastLogId 이후 새 로그만 받아서 붙임. 알림 목록(logs)은 현재 필터 기준으로 서버에서 조회
+            let logs = [];
+            let lastLogId = 0;
+            let statusEtag = null;
+            let polling = false;
+
+            function renderAlert(log) {
+                let badgeClass = log.status;
+                let iconColor = log.status === '경고' ? 'var(--accent-orange)' : 'var(--accent-yellow)';
+                return `
+                    <div class="alert-item">
+                        <div class="alert-icon-box" style="color:${iconColor}; background: ${iconColor}20;">${getIcon(log.type)}</div>
+                        <div class="alert-content">
+                            <div class="alert-header">
+                                <span class="alert-title">${log.type}</span>
+                                <span class="badge ${badgeClass}">${log.status}</span>
                             </div>
-                        `;
-                    }
-                    document.getElementById('location-list').innerHTML = locHtml;
-                    
-                    let m = data.monitor;
-                    document.getElementById('monitor-loc').innerText = m.location;
-                    document.getElementById('monitor-action').innerText = m.action;
-                    document.getElementById('monitor-time').innerText = m.time;
-                    document.getElementById('monitor-conf').innerText = m.conf + "%";
-                    
-                    let mBadge = document.getElementById('monitor-badge');
-                    mBadge.innerText = m.status;
-                    mBadge.className = `badge ${m.status}`;
-                    
-                    let color = 'var(--accent-green)';
-                    if(m.status === '경고') color = 'var(--accent-orange)';
-                    if(m.status === '주의') color = 'var(--accent-yellow)';
-                    document.getElementById('monitor-action').style.color = color;
-
-                    let overlay = document.getElementById('monitor-overlay');
-                    if(m.status !== '정상') {
-                        overlay.style.display = 'flex';
-                        document.getElementById('monitor-overlay-text').innerText = m.type + " 발생!";
-                        document.getElementById('monitor-overlay-icon').innerHTML = getIcon(m.type);
-                        overlay.style.color = color;
-                        overlay.style.borderColor = color;
-                    } else {
-                        overlay.style.display = 'none';
-                    }
-                    
-                    let shortZone = reverseZoneMap[m.location];
-                    if(shortZone) {
-                        document.querySelectorAll('.bottom-nav .nav-item').forEach(el => el.classList.toggle('active', el.innerText.includes(shortZone)));
-                    }
+                            <div class="alert-desc">${log.loc} · ${log.zone}<br>${log.date} ${log.time} · 정확도 ${log.conf}%</div>
+                        </div>
+                        ${clipButton(log)}
+                    </div>
+                `;
+            }
+
+            function clipButton(log) {
+                // 서버가 클립이 실제로 있을 때만 ready, 녹화/저장 중이면 pending
+                if(log.clip === 'ready') return `<button class="btn-view" onclick="openClip(${log.id})">영상</button>`;
+                if(log.clip === 'pending') return '<button class="btn-view" disabled>저장 중</button>';
+                return '<button class="btn-view" disabled>확인</button>';
+            }
+
+            async function refreshClips(pendingClips) {
+                // 저장 중이던 클립이 끝나면(또는 실패하면) 그 이벤트만 다시 받아서 버튼 갱신
+                let pending = new Set(pendingClips);
+                let done = logs.filter(log => log.clip === 'pending' && !pending.has(log.id));
+                if(done.length === 0) return;
+                done.forEach(log => log.clip = null); // 응답 전 중복 요청 방지
+                for(const log of done) {
+                    let data = await (await fetch(`/logs?before_id=${log.id + 1}&limit=1`)).json();
+                    if(data.logs.length && data.logs[0].id === log.id) log.clip = data.logs[0].clip;
+                }
+                renderAlertList();
+            }
+
+            function renderAlertList() {
+                document.getElementById('alert-list').innerHTML = logs
+                    .filter(log => currentFilter === 'ALL' || log.type === currentFilter)
+                    .map(renderAlert).join('');
+            }
+
+            function appendLogs(newLogs) {
+                newLogs = newLogs.filter(log => log.id > lastLogId); // 폴링/스트림 중복 방지
+                if(newLogs.length === 0) return;
+                lastLogId = newLogs[0].id;
+                newLogs = newLogs.filter(log => currentFilter === 'ALL' || log.type === currentFilter);
+                logs = newLogs.concat(logs);
+                document.getElementById('alert-list').insertAdjacentHTML('afterbegin', newLogs.map(renderAlert).join(''));
+            }
+
+            async function loadAlerts(beforeId) {
+                let query = `limit=100${currentFilter !== 'ALL' ? '&type=' + encodeURIComponent(currentFilter) : ''}`;
+                if(beforeId) query += `&before_id=${beforeId}`;
+                let data = await (await fetch('/logs?' + query)).json();
+                logs = beforeId ? logs.concat(data.logs) : data.logs;
+                renderAlertList();
+                document.getElementById('alert-more').style.display = logs.length < data.detailed ? 'block' : 'none';
+            }
+
+            function loadMoreAlerts() {
+                if(logs.length) loadAlerts(logs[logs.length - 1].id);
+            }
 
-                    document.getElementById('alert-count').innerText = data.logs.length;
-                    let alertHtml = "";
-                    data.logs.forEach(log => {
-                        if(currentFilter !== 'ALL' && log.type !== currentFilter) return;
-                        let badgeClass = log.status;
-                        let iconColor = log.status === '경고' ? 'var(--accent-orange)' : 'var(--accent-yellow)';
-                        
-                        alertHtml += `
-                            <div class="alert-item">
-                                <div class="alert-icon-box" style="color:${iconColor}; background: ${iconColor}20;">${getIcon(log.type)}</div>
-                                <div class="alert-content">
-                                    <div class="alert-header">
-                                        <span class="alert-title">${log.type}</span>
-                                        <span class="badge ${badgeClass}">${log.status}</span>
-                                    </div>
-                                    <div class="alert-desc">${log.loc} · ${log.zone}<br>${log.date} ${log.time} · 정확도 ${log.conf}%</div>
-                                </div>
-                                <button class="btn-view">확인</button>
+            function applyStatus(data) {
+                cameraByLoc = Object.fromEntries(Object.entries(data.cameras).map(a => a.reverse()));
+                appendLogs(data.logs);
+                refreshClips(data.pending_clips);
+                if(currentFilter === 'ALL') document.getElementById('alert-more').style.display = logs.length < data.detailed ? 'block' : 'none';
+
+                // 집계는 서버가 이벤트 추가 시점에 갱신해 둔 값을 그대로 사용
+                let insights = data.insights;
+                let counts = insights.by_type;
+                if(statsChart) {
+                    statsChart.data.datasets[0].data = [
+                        counts['흡연 감지'] || 0, counts['무단 투기'] || 0, counts['불법 주차'] || 0, counts['전단지 부착'] || 0
+                    ];
+                    statsChart.update();
+                }
+                document.getElementById('top-type').innerText = insights.most_action;
+                document.getElementById('top-place').innerText = insights.most_place;
+                document.getElementById('peak-time').innerText = insights.peak_time;
+                document.getElementById('total-count').innerText = data.total + "건";
+                document.getElementById('alert-count').innerText = data.total;
+
+                let locHtml = "";
+                for (const [loc, info] of Object.entries(data.locations)) {
+                    let badgeClass = info.status; 
+                    let icon = getIcon(info.type);
+                    locHtml += `
+                        <div class="card loc-card" onclick="changePage('monitoring');">
+                            <div class="loc-info">
+                                <div class="loc-name">${loc}</div>
+                                <div class="loc-desc">${info.status !== '정상' ? icon : ''} ${info.last_action}</div>
                             </div>
-                        `;
-                    });
-                    document.getElementById('alert-list').innerHTML = alertHtml;
+                            <span class="badge ${badgeClass}">${info.status}</span>
+                        </div>
+                    `;
+                }
+                document.getElementById('location-list').innerHTML = locHtml;
+                
+                let m = data.monitor;
+                document.getElementById('monitor-loc').innerText = m.location;
+                document.getElementById('monitor-action').innerText = m.action;
+                document.getElementById('monitor-time').innerText = m.time;
+                document.getElementById('monitor-conf').innerText = m.conf + "%";
+                
+                let mBadge = document.getElementById('monitor-badge');
+                mBadge.innerText = m.status;
+                mBadge.className = `badge ${m.status}`;
+                
+                let color = 'var(--accent-green)';
+                if(m.status === '경고') color = 'var(--accent-orange)';
+                if(m.status === '주의') color = 'var(--accent-yellow)';
+                document.getElementById('monitor-action').style.color = color;
+
+                let overlay = document.getElementById('monitor-overlay');
+                if(m.status !== '정상') {
+                    overlay.style.display = 'flex';
+                    document.getElementById('monitor-overlay-text').innerText = m.type + " 발생!";
+                    document.getElementById('monitor-overlay-icon').innerHTML = getIcon(m.type);
+                    overlay.style.color = color;
+                    overlay.style.borderColor = color;
+                } else {
+                    overlay.style.display = 'none';
+                }
+                
+                let shortZone = reverseZoneMap[m.location];
+                if(shortZone) {
+                    document.querySelectorAll('.bottom-nav .nav-item').forEach(el => el.classList.toggle('active', el.innerText.includes(shortZone)));
+                }
+            }
 
+            async function updateUI() {
+                if(polling) return;
+                polling = true;
+                try {
+                    let hasMore = true;
+                    while(hasMore) {
+                        let headers = statusEtag ? {'If-None-Match': statusEtag} : {};
+                        let res = await fetch(`/status_json?since_id=${lastLogId}&limit=500`, {headers: headers, cache: 'no-store'});
+                        if(res.status === 304) break; // 변화 없음
+                        statusEtag = res.headers.get('ETag');
+                        let data = await res.json();
+                        applyStatus(data);
+                        hasMore = data.has_more;
+                    }
                 } catch(e) { console.error(e); }
+                polling = false;
+            }
+
+            // 상태 변화는 서버가 SSE 로 푸시. 끊기면 재연결할 때까지 1초 폴링으로 대체
+            let statusSource = null;
+            let pollTimer = null;
+
+            function connectStatusStream() {
+                if(!window.EventSource) { pollTimer = setInterval(updateUI, 1000); return; }
+                statusSource = new EventSource(`/status_stream?since_id=${lastLogId}`);
+                statusSource.onmessage = e => applyStatus(JSON.parse(e.data));
+                statusSource.onerror = () => {
+                    statusSource.close(); // 자동 재연결은 예전 커서로 붙으므로 직접 재연결
+                    if(!pollTimer) pollTimer = setInterval(updateUI, 1000);
+                    setTimeout(() => { clearInterval(pollTimer); pollTimer = null; connectStatusStream(); }, 5000);
+                };
             }
 
             initChart();
             changePage('dashboard');
-            setInterval(updateUI, 1000);
+            connectStatusStream();
         </script>
     </body>
     </html>
-    """
\ No newline at end of file
+    """
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CityEye 통합 관제 서버")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--replay", help="녹화 영상/프레임 폴더로 헤드리스 실행 후 단계별 리포트 출력 (예: 공학관=videos/a.mp4;정문=frames/)")
+    parser.add_argument("--pace", choices=["max", "realtime"], default="max", help="리플레이 속도")
+    parser.add_argument("--preview", action="store_true", help="OpenCV 미리보기 창 + 키보드 트리거 사용 (PREVIEW_WINDOW=1 과 동일)")
+    args = parser.parse_args()
+    if args.preview: PREVIEW_WINDOW = True
+
+    if args.replay:
+        print(format_perf_report(*run_replay(args.replay, args.pace)))
+    else:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # real_server.py 를 저장소 루트에서 import
+os.environ.setdefault("AUDIO_BACKEND", "null")
+
+import threading
+import pytest
+import real_server as rs
+
+@pytest.fixture
+def store(tmp_path):
+    # 임시 DB + writer 스레드 (서버 startup_event 와 같은 구성), 끝나면 writer 를 멈춤
+    rs.stop_event.clear()
+    rs.store = rs.EventStore(str(tmp_path / "events.db"))
+    writer = threading.Thread(target=rs.store.writer_loop, daemon=True)
+    writer.start()
+    yield rs.store
+    rs.stop_event.set()
+    writer.join(5)
+    rs.stop_event.clear()
@@ -0,0 +1,92 @@
+# 이벤트 클립: 녹화 중 -> 저장 대기(pending) -> 저장(ready), 프레임이 끊겨도 pending 으로 남지 않음
+import threading
+import types
+import cv2
+import numpy as np
+import pytest
+import real_server as rs
+
+@pytest.fixture
+def clips(store, tmp_path, monkeypatch):
+    # 빈 클립 writer + 카메라 하나 (capture/AI 루프 없이 recorder 만)
+    monkeypatch.setattr(rs, "CLIP_DIR", str(tmp_path / "clips"))
+    monkeypatch.setattr(rs, "clip_writer", rs.ClipWriter())
+    rec = rs.PreEventRecorder("cam0")
+    monkeypatch.setattr(rs, "cameras", {"cam0": types.SimpleNamespace(recorder=rec)})
+    writer = threading.Thread(target=rs.clip_writer.run, daemon=True)
+    writer.start()
+    yield rec
+    rs.stop_event.set()
+    writer.join(5)
+
+def jpeg(i):
+    ok, buf = cv2.imencode(".jpg", np.full((48, 64, 3), i * 10 % 255, np.uint8))
+    return buf.tobytes()
+
+def event(store, rec, ts):
+    e = store.append({"type": "흡연 감지", "loc": "공학관", "camera": "cam0"}, ts=ts, on_id=rec.trigger)
+    store.flush()
+    return e["id"]
+
+def state(store, event_id):
+    e = store.query(since_id=event_id - 1, limit=1, newest_first=False)[0]
+    return rs.clip_state(e["id"], e["clip"])
+
+def wait_until(cond, timeout=5.0):
+    deadline = rs.time.time() + timeout
+    while not cond():
+        assert rs.time.time() < deadline
+        rs.time.sleep(0.02)
+
+def wait_written(n):
+    wait_until(lambda: rs.clip_writer.written >= n and not rs.clip_writer.pending_ids)
+
+def test_clip_is_ready_after_post_frames(store, clips):
+    t0 = rs.time.time()
+    for i in range(5): clips.add(t0 + i * 0.5, jpeg(i))
+    event_id = event(store, clips, t0 + 2)
+    assert state(store, event_id) == "pending"
+    for i in range(5, 5 + int(rs.CLIP_POST_SECONDS * 2) + 1): clips.add(t0 + i * 0.5, jpeg(i))
+    wait_written(1)
+    assert state(store, event_id) == "ready"
+
+def test_clip_is_saved_when_frames_stop(store, clips, monkeypatch):
+    # 트리거 후 카메라가 멈춤: add() 가 더 안 불려도 끝 시각 + CLIP_EXPIRE_SECONDS 가 지나면 있는 프레임으로 저장
+    now = rs.time.time()
+    monkeypatch.setattr(rs, "CLIP_EXPIRE_SECONDS", 0.0)
+    for i in range(3): clips.add(now - rs.CLIP_POST_SECONDS - 3 + i, jpeg(i))
+    event_id = event(store, clips, now - rs.CLIP_POST_SECONDS - 1)
+    wait_written(1)
+    assert clips.clip is None
+    assert state(store, event_id) == "ready"
+
+def test_recent_clip_is_not_expired_early(store, clips):
+    now = rs.time.time()
+    clips.add(now, jpeg(0))
+    event(store, clips, now)
+    clips.finish(now + 1)
+    assert clips.clip is not None
+    clips.finish() # 루프 종료: 끝 시각과 무관하게 마감
+    wait_written(1)
+    assert clips.clip is None
+
+def test_dropped_clip_is_not_pending(store, clips, monkeypatch):
+    monkeypatch.setattr(rs, "CLIP_PENDING_BYTES", 0)
+    clips.add(rs.time.time(), jpeg(0))
+    event_id = event(store, clips, rs.time.time())
+    assert rs.clip_writer.dropped == 1
+    assert state(store, event_id) is None
+
+def test_failed_write_is_not_pending(store, clips, monkeypatch):
+    def write(clip): raise OSError("disk full")
+    monkeypatch.setattr(rs.clip_writer, "write", write)
+    clips.add(rs.time.time(), jpeg(0))
+    event_id = event(store, clips, rs.time.time())
+    clips.finish()
+    wait_until(lambda: not rs.clip_writer.pending_ids)
+    assert state(store, event_id) is None
+
+def test_flush_waits_for_queued_events(store):
+    ids = [store.append({"type": "흡연 감지", "loc": "공학관", "camera": "cam0"})["id"] for _ in range(50)]
+    store.flush()
+    assert [e["id"] for e in store.query(since_id=ids[0] - 1, limit=100, newest_first=False)] == ids
@@ -0,0 +1,75 @@
+# 이벤트 메모리 창(RecentEvents) 과 보존 정책(원본 -> 시간별 -> 일별 집계)
+import pytest
+import real_server as rs
+
+def ev(i, type="흡연 감지", loc="공학관"):
+    return {"id": i, "ts": 1000.0 + i, "type": type, "loc": loc, "camera": "cam0"}
+
+def ids(page):
+    return [e["id"] for e in page]
+
+def test_recent_window_answers_polls():
+    recent = rs.RecentEvents(10)
+    recent.extend([ev(3), ev(1), ev(2, type="무단 투기")])
+    assert ids(recent.query()) == [3, 2, 1]
+    assert ids(recent.query(since_id=1, newest_first=False)) == [2, 3]
+    assert ids(recent.query(type="무단 투기")) == [2]
+    assert ids(recent.query(limit=2)) == [3, 2]
+
+def test_recent_window_defers_to_db_once_incomplete():
+    recent = rs.RecentEvents(3)
+    recent.extend([ev(i) for i in range(1, 6)]) # 1, 2 는 밀려남
+    assert not recent.complete
+    assert ids(recent.query(since_id=3, newest_first=False)) == [4, 5]
+    assert recent.query(since_id=1) is None # 창보다 오래된 since_id
+    assert recent.query(limit=10) is None # 창만으로는 limit 을 못 채움
+    assert recent.query(type="무단 투기") is None
+
+def test_recent_window_discard_and_clip():
+    recent = rs.RecentEvents(10)
+    recent.extend([ev(i) for i in range(1, 6)])
+    recent.set_clip({2, 4}, "clips/x.mp4")
+    recent.discard(3)
+    assert [(e["id"], e["clip"]) for e in recent.query(newest_first=False)] == [(4, "clips/x.mp4"), (5, None)]
+
+@pytest.fixture
+def aged(store, monkeypatch):
+    # 시드 이벤트 위에 3일 전부터 한 시간 간격으로 20건
+    monkeypatch.setattr(rs, "EVENT_RETENTION", 5)
+    now = rs.time.time()
+    for k in range(20):
+        store.append({"type": "무단 투기" if k % 4 == 0 else "흡연 감지", "loc": "정문", "camera": "cam0"}, ts=now - 3 * 86400 + k * 3600)
+    store.flush()
+    return now
+
+def totals(store):
+    return (store.total, store.count(type="무단 투기"), store.count(loc="정문"), store.count(type="무단 투기", loc="정문"),
+            sum(n for _, n in store.history("day", days=10, loc="정문")))
+
+def test_retention_rolls_up_without_changing_counts(store, aged):
+    before = totals(store)
+    rolled, _ = store.compact(now=aged)
+    assert rolled == store.compacted > 0
+    assert store.detailed == rs.EVENT_RETENTION
+    assert totals(store) == before
+    assert len(store.recent) <= rs.EVENT_RETENTION # 창에서도 지움
+
+def test_hourly_rollups_merge_into_days(store, aged, monkeypatch):
+    monkeypatch.setattr(rs, "ROLLUP_HOURLY_DAYS", 1)
+    before = totals(store)
+    _, merged = store.compact(now=aged)
+    conn = store._conn()
+    assert merged > 0
+    assert conn.execute("SELECT COUNT(*) FROM event_rollups WHERE period = 'hour' AND start < ?", (aged - 86400,)).fetchone()[0] == 0
+    assert conn.execute("SELECT SUM(count) FROM event_rollups WHERE period = 'day' AND loc = '정문'").fetchone()[0] > 0
+    assert totals(store) == before
+    fresh = rs.Insights() # 재시작: 원본 + 집계에서 다시 읽어도 같은 합계와 피크 시간대
+    fresh.load(conn)
+    assert fresh.total == store.total and fresh.snapshot()["peak_time"] == store.insights.snapshot()["peak_time"]
+
+def test_ids_are_not_reused_after_compaction(store, aged):
+    last = store.query(limit=1)[0]["id"]
+    store.compact(now=aged)
+    assert store.append({"type": "흡연 감지", "loc": "정문", "camera": "cam0"})["id"] > last
+    store.flush()
+    assert rs.EventStore(store.path).next_id > last + 1
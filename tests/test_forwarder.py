@@ -0,0 +1,52 @@
+# 엣지 -> 중앙 전송: 중앙이 거부한 이벤트만 격리하고 커서는 앞으로, 아직 못 보낸 이벤트는 보존 정책으로 지우지 않음
+import io
+import urllib.error
+import pytest
+import real_server as rs
+
+def http_error(code):
+    return urllib.error.HTTPError("http://central/ingest", code, "rejected", {}, io.BytesIO(b"{}"))
+
+@pytest.fixture
+def forwarder(store, monkeypatch):
+    fw = rs.EventForwarder(store, "http://central", "edgeA")
+    fw.posted = []
+    def post(events):
+        if any(e["type"] == "bad" for e in events): raise http_error(400)
+        fw.posted += [e["id"] for e in events]
+        return {"accepted": len(events)}
+    monkeypatch.setattr(fw, "post", post)
+    return fw
+
+def add(store, n, bad=()):
+    events = [store.append({"type": "bad" if i in bad else "흡연 감지", "loc": "공학관", "camera": "cam0"}) for i in range(n)]
+    store.flush()
+    return [e["id"] for e in events]
+
+def test_rejected_events_are_quarantined_and_rest_forwarded(store, forwarder):
+    ids = add(store, 9, bad=(2, 7))
+    forwarder.send(store.query(since_id=forwarder.cursor, limit=100, newest_first=False))
+    assert forwarder.posted == [i for k, i in enumerate(ids) if k not in (2, 7)]
+    assert forwarder.quarantined == [ids[2], ids[7]]
+    assert rs.EventForwarder(store, "http://central", "edgeA").quarantined == forwarder.quarantined # 재시작 후에도 기록 유지
+
+@pytest.mark.parametrize("code", [401, 404, 500])
+def test_config_and_server_errors_are_retried_not_skipped(store, forwarder, monkeypatch, code):
+    add(store, 3)
+    def post(events): raise http_error(code)
+    monkeypatch.setattr(forwarder, "post", post)
+    with pytest.raises(urllib.error.HTTPError):
+        forwarder.send(store.query(since_id=forwarder.cursor, limit=100, newest_first=False))
+    assert forwarder.quarantined == []
+
+def test_compaction_keeps_unforwarded_events(store, forwarder, monkeypatch):
+    monkeypatch.setattr(rs, "EVENT_RETENTION", 5)
+    ids = add(store, 20)
+    store.compact()
+    assert store.get(ids[0]) is not None # 커서 이후는 하나도 안 지움
+    assert store.detailed >= 20
+    total = store.count(type="흡연 감지", loc="공학관")
+    store.pinned = ids[9] # 10건 전송 완료
+    store.compact()
+    assert store.get(ids[9]) is None and store.get(ids[10]) is not None
+    assert store.count(type="흡연 감지", loc="공학관") == total # 집계로 옮겨도 건수는 그대로
@@ -0,0 +1,50 @@
+# 중앙 서버 /ingest: 잘못된 배치는 400 으로 거부되고, writer 스레드는 어떤 배치 뒤에도 계속 동작
+import gzip
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+import real_server as rs
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(rs, "ROLE", "central")
+    monkeypatch.setattr(rs, "INGEST_TOKEN", "")
+    monkeypatch.setattr(rs, "sites", {})
+    return TestClient(rs.app) # with 없이: startup(AI 루프) 은 실행하지 않음
+
+def post(client, payload):
+    return client.post("/ingest", content=gzip.compress(json.dumps(payload).encode()), headers={"Content-Encoding": "gzip"})
+
+def event(src_id, **fields):
+    return {"id": src_id, "ts": time.time(), "date": "2025-01-03", "time": "10:00", "type": "흡연 감지", "loc": "공학관",
+            "zone": "Live", "conf": 98, "status": "경고", "camera": "cam0", **fields}
+
+@pytest.mark.parametrize("bad", [
+    {"type": ["x"]}, {"loc": {"a": 1}}, {"conf": "98"}, {"conf": True}, {"id": 2**63}, {"id": -1}, {"id": "3"},
+    {"ts": 1e20}, {"ts": -5}, {"ts": "now"}, {"camera": "x" * 1000},
+])
+def test_malformed_event_is_rejected_and_writer_survives(client, store, bad):
+    before = store.detailed
+    assert post(client, {"site": "edgeA", "events": [event(3, **bad)]}).status_code == 400
+    ok = post(client, {"site": "edgeA", "events": [event(3), event(4)]})
+    assert ok.status_code == 200 and ok.json()["accepted"] == 2
+    assert store.detailed == before + 2
+    assert [e["src_id"] for e in store.query(limit=2, newest_first=False, since_id=store.next_id - 3)] == [3, 4]
+
+def test_writer_survives_unstorable_rows(store):
+    # 검증을 우회한 값이 writer 까지 가도 그 행만 버리고 같은 배치의 다른 행과 다음 배치는 저장
+    batch = store.ingest("edgeA", [event(1, type=["x"]), event(2), event(3, id=2**70)])
+    assert [e["src_id"] for e in batch.accepted] == [2]
+    bad = store.append({"type": "흡연 감지", "loc": "공학관", "conf": 2**70}) # 로컬 배치의 저장할 수 없는 행
+    good = store.append({"type": "흡연 감지", "loc": "공학관", "camera": "cam0"})
+    store.flush()
+    assert store.get(bad["id"]) is None and store.get(good["id"]) is not None
+    assert store.ingest("edgeA", [event(5)]).accepted
+
+def test_duplicate_events_are_ignored(client, store):
+    assert post(client, {"site": "edgeA", "events": [event(1), event(2)]}).json()["accepted"] == 2
+    again = post(client, {"site": "edgeA", "events": [event(2), event(3)]}).json()
+    assert (again["accepted"], again["duplicates"]) == (1, 1)
+    assert post(client, {"site": "edgeB", "events": [event(1)]}).json()["accepted"] == 1 # 다른 엣지는 같은 id 라도 별개
+    assert rs.sites["edgeA"]["events"] == 3
@@ -0,0 +1,111 @@
+# analyze_keypoints (NumPy 일괄 처리) 가 기존 사람별 파이썬 루프와 같은 결과를 내는지
+import math
+import numpy as np
+import pytest
+import real_server as rs
+
+W, H = 1280, 720
+
+def loop_keypoints(kps_batch, w, h, threshold=rs.SMOKING_THRESHOLD):
+    # 벡터화 이전 run_ai_loop 의 사람별 루프 (그리기 제외)
+    offender_idx = -1
+    for i, kps in enumerate(kps_batch):
+        nose, l_wrist, r_wrist = kps[0], kps[9], kps[10]
+        dist_l = math.dist(nose, l_wrist) if nose[0] != 0 and l_wrist[0] != 0 else 999
+        dist_r = math.dist(nose, r_wrist) if nose[0] != 0 and r_wrist[0] != 0 else 999
+        if dist_l < threshold or dist_r < threshold:
+            offender_idx = i
+            break
+
+    ml, mt, mr, mb = rs.HEAD_MARGIN
+    boxes = {}
+    for i, kps in enumerate(kps_batch):
+        head_x = [p[0] for p in kps[0:5] if p[0] != 0]
+        head_y = [p[1] for p in kps[0:5] if p[1] != 0]
+        if head_x and head_y:
+            boxes[i] = (max(0, int(min(head_x)) - ml), max(0, int(min(head_y)) - mt),
+                        min(w, int(max(head_x)) + mr), min(h, int(max(head_y)) + mb))
+    return offender_idx, boxes
+
+def vectorized(kps, w=W, h=H):
+    result = rs.analyze_keypoints(kps, w, h)
+    boxes = {int(i): tuple(result["boxes"][i].tolist()) for i in np.flatnonzero(result["has_box"])}
+    return result["offender"], boxes
+
+def random_poses(n, seed, missing=0.0):
+    rng = np.random.default_rng(seed)
+    kps = rng.uniform([1, 1], [W, H], size=(n, 17, 2)).astype(np.float32)
+    kps[rng.random((n, 17)) < missing] = 0
+    return kps
+
+@pytest.mark.parametrize("n", [1, 2, 5, 20, 50])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_loop_on_random_poses(n, seed):
+    kps = random_poses(n, seed)
+    if n > 1: kps[n // 2, 10] = kps[n // 2, 0] + [20, 30] # 가운데 사람은 흡연 자세
+    assert vectorized(kps) == loop_keypoints(kps, W, H)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_loop_with_missing_keypoints(seed):
+    # 신뢰도가 KEYPOINT_MIN_CONF 미만인 키포인트는 백엔드가 (0, 0) 으로 넘김
+    kps = random_poses(30, seed, missing=0.4)
+    assert vectorized(kps) == loop_keypoints(kps, W, H)
+
+def test_missing_nose_or_wrist_is_not_smoking():
+    kps = random_poses(3, 0)
+    kps[:, 9] = kps[:, 0] + [5, 5] # 모두 흡연 자세
+    kps[0, 0] = 0 # 코 미검출
+    kps[1, 9] = 0 # 손목 미검출 (오른손은 멀리)
+    kps[1, 10] = kps[1, 0] + [500, 500]
+    result = rs.analyze_keypoints(kps, W, H)
+    assert result["dist"][0].tolist() == [999.0, 999.0]
+    assert result["dist"][1, 0] == 999.0
+    assert result["offender"] == 2
+
+def test_person_without_head_keypoints_has_no_box():
+    kps = random_poses(2, 1)
+    kps[0, 0:5] = 0
+    kps[1, 0:5, 1] = 0 # x 만 있고 y 가 모두 미검출
+    offender, boxes = vectorized(kps)
+    assert boxes == {}
+    assert (offender, boxes) == loop_keypoints(kps, W, H)
+
+def test_all_keypoints_missing():
+    kps = np.zeros((4, 17, 2), dtype=np.float32)
+    result = rs.analyze_keypoints(kps, W, H)
+    assert result["offender"] == -1
+    assert not result["has_box"].any()
+    assert (result["dist"] == 999.0).all()
+
+@pytest.mark.parametrize("empty", [np.zeros((0, 17, 2), dtype=np.float32), []])
+def test_no_persons(empty):
+    result = rs.analyze_keypoints(empty, W, H)
+    assert result["offender"] == -1
+    assert result["dist"].shape == (0, 2)
+    assert result["boxes"].shape == (0, 4)
+    assert result["has_box"].shape == (0,)
+
+def test_boxes_are_clamped_to_frame():
+    kps = random_poses(4, 2)
+    kps[0, 0:5] = [[5, 5], [10, 8], [2, 12], [15, 3], [8, 9]] # 왼쪽 위 모서리
+    kps[1, 0:5] = [[W - 5, H - 5], [W - 2, H - 8], [W - 10, H - 3], [W - 1, H - 1], [W - 6, H - 4]] # 오른쪽 아래
+    kps[2, 0:5] = [[W + 200, H + 100], [W + 150, H + 120], [W + 300, H + 50], [W + 100, H + 80], [W + 250, H + 90]] # 화면 밖
+    kps[3, 0:5] = [[-50, -30], [-20, -60], [-40, -10], [-70, -20], [-30, -40]] # 음수 좌표
+    result = rs.analyze_keypoints(kps, W, H)
+    boxes = result["boxes"][result["has_box"]]
+    assert result["has_box"].all()
+    assert (boxes[:, [0, 1]] >= 0).all()
+    assert (boxes[:, 2] <= W).all() and (boxes[:, 3] <= H).all()
+    assert (boxes[:, 2] >= boxes[:, 0]).all() and (boxes[:, 3] >= boxes[:, 1]).all() # 뒤집힌 박스 없음
+    assert tuple(result["boxes"][0, :2].tolist()) == (0, 0)
+    assert tuple(result["boxes"][1, 2:].tolist()) == (W, H)
+    assert result["boxes"][2, 0] == result["boxes"][2, 2] == W # 완전히 화면 밖이면 폭 0 (anonymize_regions 가 건너뜀)
+    assert vectorized(kps[:2])[1] == loop_keypoints(kps[:2], W, H)[1] # 가장자리에 걸친 경우는 기존 루프와 같음
+
+def test_first_offender_wins():
+    kps = random_poses(6, 3)
+    for i in (2, 4):
+        kps[i, 9] = kps[i, 0] + [10, 10]
+    kps[:2, 9:11] = kps[:2, 0:1] + 1000 # 앞 두 사람은 확실히 멀리
+    offender, _ = vectorized(kps)
+    assert offender == loop_keypoints(kps, W, H)[0] == 2
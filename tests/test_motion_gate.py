@@ -0,0 +1,35 @@
+# MotionGate: 정적인 장면은 건너뛰고, 프레임당 조금씩 움직이는 사람도 결국 추론
+import numpy as np
+import pytest
+import real_server as rs
+
+W, H = 1280, 720
+
+def frame_with_person(x):
+    frame = np.full((H, W, 3), 90, dtype=np.uint8)
+    frame[200:560, x:x + 120] = 250 # 밝은 사람 크기 사각형
+    return frame
+
+def test_static_scene_is_skipped_until_keepalive():
+    gate = rs.MotionGate(threshold=0.003, keepalive=2.0)
+    frame = frame_with_person(300)
+    runs = [gate.should_run(frame, now=t / 30) for t in range(90)] # 3초, 30fps
+    assert runs[0] # 첫 프레임은 항상
+    assert sum(runs) == 2 # 이후에는 keepalive(2초) 한 번만
+    assert gate.skipped == 88
+
+@pytest.mark.parametrize("speed", [1, 2, 4])
+def test_slow_drift_accumulates_until_inference(speed):
+    # 직전 프레임과만 비교하면 1~4px/frame 은 변화 0 -> keepalive 로만 추론 (그 사이 ~240px 이동)
+    gate = rs.MotionGate(threshold=0.003, keepalive=2.0)
+    runs = [t for t in range(120) if gate.should_run(frame_with_person(100 + speed * t), now=t / 30)]
+    gaps = np.diff(runs)
+    assert len(runs) > 5
+    assert gaps.max() * speed <= 40 # 추론 사이 이동 거리가 블러 박스 여백 안
+    assert gaps.max() < 2.0 * 30 # keepalive 보다 훨씬 자주
+
+def test_reference_resets_after_inference():
+    gate = rs.MotionGate(threshold=0.003, keepalive=100)
+    assert gate.should_run(frame_with_person(100), now=0)
+    assert gate.should_run(frame_with_person(400), now=0.1) # 크게 이동
+    assert not gate.should_run(frame_with_person(400), now=0.2) # 새 기준 프레임과 같음
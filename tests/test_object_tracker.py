@@ -0,0 +1,80 @@
+# ObjectTracker: 물건 주인 연결 (지나가는 사람은 주인이 아님), 방치/주차 시간은 프레임 시각 기준
+import numpy as np
+import real_server as rs
+
+W, H = 1280, 720
+BAG = rs.LITTER_CLASSES[0]
+BIKE = rs.KICKBOARD_CLASSES[0]
+
+def obj(x, y, cls=BAG, size=40):
+    return [x - size / 2, y - size / 2, x + size / 2, y + size / 2, 0.9, cls]
+
+def person(x, y):
+    kps = np.zeros((17, 2), dtype=np.float32)
+    kps[rs.LINK_KEYPOINTS] = (x, y) # 손목/골반을 (x, y) 에
+    return kps
+
+def step(tracker, now, objects, people=()):
+    # people: [(트랙 id, x, y)]
+    kps = np.array([person(x, y) for _, x, y in people], dtype=np.float32).reshape(-1, 17, 2)
+    ids = np.array([pid for pid, _, _ in people], dtype=np.int64)
+    return tracker.update(np.array(objects, dtype=np.float32).reshape(-1, 6), kps, ids, W, H, now)
+
+def test_carried_bag_left_behind_is_littering():
+    tracker, fired = rs.ObjectTracker(), []
+    t = 0.0
+    for x in range(300, 601, 30): # 들고 걸어옴
+        fired += step(tracker, t, [obj(x, 400)], [(7, x, 400)]); t += 0.1
+    assert tracker.objects[0].owner == 7
+    for k in range(60): # 두고 멀어짐 (프레임 시각 기준 6초)
+        fired += step(tracker, t, [obj(600, 400)], [(7, 600 - 20 * (k + 1), 400)]); t += 0.1
+    assert fired == ["littering"]
+    assert tracker.alerts == {"littering"}
+
+def test_passerby_does_not_become_owner():
+    tracker, fired = rs.ObjectTracker(), []
+    t = 0.0
+    for _ in range(10): # 아무도 없는 곳에 놓여 있던 가방
+        fired += step(tracker, t, [obj(600, 400)]); t += 0.1
+    for x in range(300, 1000, 20): # 옆을 지나감
+        fired += step(tracker, t, [obj(600, 400)], [(3, x, 400)]); t += 0.1
+    for _ in range(60):
+        fired += step(tracker, t, [obj(600, 400)]); t += 0.1
+    assert tracker.objects[0].owner is None
+    assert fired == []
+
+def test_bag_picked_up_gets_new_owner():
+    tracker = rs.ObjectTracker()
+    step(tracker, 0.0, [obj(600, 400)])
+    step(tracker, 0.1, [obj(600, 400)], [(5, 600, 400)]) # 옆에 서기만 함
+    assert tracker.objects[0].owner is None
+    for k, x in enumerate(range(630, 800, 30)): # 들고 이동
+        step(tracker, 0.2 + k * 0.1, [obj(x, 400)], [(5, x, 400)])
+    assert tracker.objects[0].owner == 5
+
+def test_owner_returning_clears_alert():
+    tracker, t = rs.ObjectTracker(), 0.0
+    step(tracker, t, [obj(600, 400)], [(1, 600, 400)])
+    for _ in range(40):
+        t += 0.1; step(tracker, t, [obj(600, 400)], [(1, 100, 400)])
+    assert tracker.alerts == {"littering"}
+    step(tracker, t + 0.1, [obj(600, 400)], [(2, 600, 400)]) # 다른 사람이 와서 서 있는 것만으로는 해제 X
+    assert tracker.alerts == {"littering"}
+    step(tracker, t + 0.2, [obj(600, 400)], [(1, 600, 400)])
+    assert tracker.alerts == set()
+
+def test_durations_use_frame_time_not_wall_clock():
+    # 최대 속도 리플레이: 실제로는 몇 ms 만에 지나가도 프레임 시각으로 ABANDON_SECONDS 가 지나면 판정
+    tracker = rs.ObjectTracker()
+    step(tracker, 100.0, [obj(600, 400)], [(1, 600, 400)])
+    assert step(tracker, 100.0 + rs.ABANDON_SECONDS / 2, [obj(600, 400)], [(1, 100, 400)]) == []
+    assert step(tracker, 100.0 + rs.ABANDON_SECONDS + 0.1, [obj(600, 400)], [(1, 100, 400)]) == ["littering"]
+
+def test_kickboard_parked_in_zone():
+    tracker = rs.ObjectTracker()
+    x1, y1, x2, y2 = rs.zone_rect(rs.PM_ZONE, W, H)
+    spot = obj((x1 + x2) / 2, (y1 + y2) / 2, BIKE)
+    assert step(tracker, 0.0, [spot], [(1, (x1 + x2) / 2, (y1 + y2) / 2)]) == []
+    assert step(tracker, rs.PARK_SECONDS - 0.1, [spot]) == []
+    assert step(tracker, rs.PARK_SECONDS + 0.1, [spot]) == ["kickboard"]
+    assert step(tracker, rs.PARK_SECONDS + 0.2, [spot]) == [] # 물건당 한 번
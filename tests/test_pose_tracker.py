@@ -0,0 +1,73 @@
+# PoseTracker: ID 유지, 예측, 유령 트랙(검출 없이 예측만으로 유지) 표시 / 수동 트리거 범인 지정
+import types
+import numpy as np
+import real_server as rs
+
+W, H = 1280, 720
+RED = (0, 0, 255)
+
+def pose(x, y):
+    # (x, y) 중심의 사람 한 명 (얼굴 0~4, 손목 9/10 은 얼굴에서 멀리)
+    kps = np.zeros((17, 2), dtype=np.float32)
+    kps[0:5] = [(x, y), (x - 5, y - 5), (x + 5, y - 5), (x - 10, y), (x + 10, y)]
+    kps[5:17] = [(x, y + 60 + 10 * k) for k in range(12)]
+    kps[9:11] = [(x - 300, y + 300), (x + 300, y + 300)]
+    return kps
+
+def test_ids_follow_people_across_updates():
+    tracker = rs.PoseTracker()
+    tracker.update([pose(300, 300), pose(900, 300)], W, H)
+    assert tracker.ids.tolist() == [1, 2]
+    tracker.update([pose(910, 305), pose(310, 305)], W, H) # 검출 순서가 바뀌어도 트랙 순서/ID 유지
+    assert tracker.ids.tolist() == [1, 2]
+    assert tracker.kps[0, 0].tolist() == [310, 305]
+
+def test_predict_extrapolates_velocity():
+    tracker = rs.PoseTracker()
+    tracker.update([pose(300, 300)], W, H)
+    tracker.update([pose(320, 300)], W, H)
+    x = tracker.kps[0, 0, 0]
+    tracker.predict(W, H)
+    assert tracker.kps[0, 0, 0] > x
+
+def test_unmatched_track_is_ghost_until_expired():
+    tracker = rs.PoseTracker(max_age=3)
+    tracker.update([pose(300, 300), pose(900, 300)], W, H)
+    assert tracker.matched.tolist() == [True, True]
+    tracker.update([pose(900, 300)], W, H)
+    assert tracker.ids.tolist() == [1, 2]
+    assert tracker.matched.tolist() == [False, True]
+    tracker.predict(W, H) # 추론 사이 예측 프레임: 마지막 추론 결과 유지
+    assert tracker.matched.tolist() == [False, True]
+    tracker.update([pose(300, 300), pose(900, 300)], W, H) # 다시 검출되면 같은 ID 로 복귀
+    assert tracker.ids.tolist() == [1, 2] and tracker.matched.all()
+    for _ in range(4): tracker.update([pose(900, 300)], W, H)
+    assert tracker.ids.tolist() == [2]
+
+def camera(**state):
+    flags = {"state_littering": False, "state_kickboard": False, "state_flyer": False, **state}
+    return types.SimpleNamespace(id="cam9", objects=rs.ObjectTracker(), last_audio_time=0,
+                                 manual_event=any(flags.values()), **flags)
+
+def has_red(frame, x, y, r=80):
+    return (frame[y - r:y + r, x - r:x + r] == RED).all(axis=2).any()
+
+def test_manual_trigger_marks_first_matched_track():
+    tracker = rs.PoseTracker()
+    tracker.update([pose(300, 360), pose(900, 360)], W, H)
+    tracker.update([pose(900, 360)], W, H) # 트랙 순서상 첫 번째(왼쪽) 사람은 유령
+    frame = np.zeros((H, W, 3), dtype=np.uint8)
+    rs.process_frame(camera(state_flyer=True), frame, tracker.kps, tracker.matched)
+    assert has_red(frame, 900, 360)
+    assert not has_red(frame, 300, 360)
+
+def test_ghost_tracks_are_not_drawn_or_smoking():
+    tracker = rs.PoseTracker()
+    smoker = pose(300, 360)
+    smoker[9] = smoker[0] + 20 # 코 옆 손목
+    tracker.update([smoker, pose(900, 360)], W, H)
+    tracker.update([pose(900, 360)], W, H)
+    frame = np.zeros((H, W, 3), dtype=np.uint8)
+    assert rs.process_frame(camera(), frame, tracker.kps, tracker.matched) is None # 유령 트랙으로는 흡연 판정 X
+    assert not frame[200:520, 150:450].any() # 박스/가이드 라인 없음
+    assert frame[200:520, 750:1050].any() # 검출된 사람은 초록 박스
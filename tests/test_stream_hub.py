@@ -0,0 +1,57 @@
+# StreamHub: 요청 값 맞춤, 프로필 수 상한, 시청자가 붙을 때 등록 / 마지막 시청자가 나가면 해제
+import asyncio
+import threading
+import numpy as np
+import pytest
+import real_server as rs
+
+@pytest.fixture
+def hub():
+    rs.stop_event.clear()
+    hub = rs.StreamHub("cam9")
+    encoder = threading.Thread(target=hub.encode_loop, daemon=True)
+    encoder.start()
+    yield hub
+    rs.stop_event.set()
+    encoder.join(5)
+    rs.stop_event.clear()
+
+def frame():
+    return np.full((120, 160, 3), 128, dtype=np.uint8)
+
+def test_admit_snaps_to_allowed_values(hub):
+    assert hub.admit(700, 70, 12) == (640, 60, 10)
+    assert hub.admit() == (0, rs.STREAM_DEFAULT_QUALITY, 0)
+    assert hub.profiles == {} # admit 은 등록하지 않음
+
+def test_profile_lives_while_viewers_are_connected(hub):
+    async def watch():
+        key = hub.admit(320, 50, 0)
+        first, second = hub.stream(key), hub.stream(key)
+        hub.publish(frame())
+        chunk = await asyncio.wait_for(first.__anext__(), 5)
+        assert chunk.startswith(rs.MJPEG_HEADER)
+        assert await asyncio.wait_for(second.__anext__(), 5) == chunk # 같은 프로필은 한 번 인코딩한 바이트 공유
+        profile = hub.profiles[key]
+        assert hub.viewers == 2 and profile.encoded_frames == 1
+        await first.aclose()
+        assert hub.profiles[key] is profile
+        await second.aclose()
+        assert key not in hub.profiles and profile.latest[1] is None
+    asyncio.run(watch())
+
+def test_profile_limit(hub, monkeypatch):
+    monkeypatch.setattr(rs, "MAX_STREAM_PROFILES", 2)
+    async def watch():
+        streams = [hub.stream(hub.admit(w)) for w in (320, 640)]
+        hub.publish(frame())
+        for s in streams: await asyncio.wait_for(s.__anext__(), 5)
+        assert hub.admit(960) is None # 새 프로필 자리 없음
+        assert hub.admit(640) == (640, rs.STREAM_DEFAULT_QUALITY, 0) # 이미 있는 프로필은 허용
+        late = hub.stream((960, rs.STREAM_DEFAULT_QUALITY, 0)) # admit 이후 자리가 찬 경우: 바로 끝남
+        with pytest.raises(StopAsyncIteration): await late.__anext__()
+        await streams[0].aclose()
+        assert hub.admit(960) == (960, rs.STREAM_DEFAULT_QUALITY, 0)
+        await streams[1].aclose()
+        assert hub.profiles == {}
+    asyncio.run(watch())